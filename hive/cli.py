@@ -7,7 +7,7 @@ import logging
 import time
 from hive.conf import Conf
 from hive.db.adapter import Db
-from hive.utils.stats import PrometheusClient
+from hive.utils.stats import PrometheusClient, OPStatusManager
 
 
 def setup_logging(conf):
@@ -53,6 +53,9 @@ def run():
       Db.set_max_connections(conf.db())
       conf.disconnect()
 
+      Db.configure_statement_cache(conf.get('sql_statement_cache_size'), conf.get('sql_prepared_statements'))
+      OPStatusManager.configure_timing(conf.get('op_stats_timing_interval'))
+
       Db.set_shared_instance(conf.db())
 
       pid_file_name = conf.pid_file()
@@ -84,6 +87,19 @@ def launch_mode(mode, conf):
         with Sync(conf=conf) as sync:
           sync.run()
 
+    elif mode == 'bench-sync':
+        from hive.indexer.bench_sync import BenchSync
+        with BenchSync(conf=conf) as sync:
+          sync.run()
+
+    elif mode == 'snapshot/export':
+        from hive.db.snapshot import export_snapshot
+        export_snapshot(conf)
+
+    elif mode == 'snapshot/import':
+        from hive.db.snapshot import import_snapshot
+        import_snapshot(conf)
+
     elif mode == 'status':
         from hive.db.db_state import DbState
         print(DbState.status())
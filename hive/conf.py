@@ -35,7 +35,7 @@ class Conf():
             **kwargs)
         add = parser.add
 
-        # runmodes: sync, server, status
+        # runmodes: sync, server, status, bench-sync, snapshot export, snapshot import
         add('mode', nargs='*', default=['sync'])
 
         # common
@@ -47,12 +47,30 @@ class Conf():
         # server
         add('--http-server-port', type=int, env_var='HTTP_SERVER_PORT', default=8080)
         add('--prometheus-port', type=int, env_var='PROMETHEUS_PORT', required=False, help='if specified, runs prometheus deamon on specified port, which provide statistic and performance data')
+        add('--max-batch-request-size', type=int, env_var='MAX_BATCH_REQUEST_SIZE', help='maximum number of calls accepted in single JSON-RPC batch request', default=100)
+        add('--batch-request-concurrency', type=int, env_var='BATCH_REQUEST_CONCURRENCY', help='maximum number of calls from single JSON-RPC batch request executed concurrently', default=8)
+        add('--request-coalescing', type=strtobool, env_var='REQUEST_COALESCING', help='share single execution between identical concurrent API calls', default=True)
+        add('--log-slow-requests-ms', type=int, env_var='LOG_SLOW_REQUESTS_MS', help='log API calls slower than given time (ms) with SQL statements they executed (0 disables)', default=0)
+        add('--explain-slow-requests', type=strtobool, env_var='EXPLAIN_SLOW_REQUESTS', help='log EXPLAIN (ANALYZE, BUFFERS) of slowest statement of every logged slow API call', default=False)
 
         # sync
         add('--max-workers', type=int, env_var='MAX_WORKERS', help='max workers for batch requests', default=6)
         add('--max-batch', type=int, env_var='MAX_BATCH', help='max chunk size for batch requests', default=35)
         add('--trail-blocks', type=int, env_var='TRAIL_BLOCKS', help='number of blocks to trail head by', default=2)
         add('--sync-to-s3', type=strtobool, env_var='SYNC_TO_S3', help='alternative healthcheck for background sync service', default=False)
+        add('--sql-statement-cache-size', type=int, env_var='SQL_STATEMENT_CACHE_SIZE', help='number of parameterized SQL statements cached by each sync database connection (0 disables)', default=1000)
+        add('--sql-prepared-statements', type=strtobool, env_var='SQL_PREPARED_STATEMENTS', help='prepare cached SQL statements on server side, so they are not planned again', default=False)
+        add('--op-stats-timing-interval', type=int, env_var='OP_STATS_TIMING_INTERVAL', help='time every n-th processed operation for operation stats; time of others is estimated (1 times all of them)', default=100)
+        add('--sync-memory-budget-mb', type=int, env_var='SYNC_MEMORY_BUDGET_MB', help='initial sync flushes processed blocks once data staged by indexer caches take approximately given memory (0 disables)', default=0)
+        add('--sync-max-batch-rows', type=int, env_var='SYNC_MAX_BATCH_ROWS', help='initial sync flushes processed blocks once indexer caches stage given number of rows (0 disables)', default=0)
+        add('--sync-max-batch-blocks', type=int, env_var='SYNC_MAX_BATCH_BLOCKS', help='initial sync flushes processed blocks at least every given number of blocks', default=1000)
+        add('--sync-fetch-processes', type=strtobool, env_var='SYNC_FETCH_PROCESSES', help='initial/fast sync fetches and decodes blocks and virtual operations in separate processes, handing them to indexer through shared memory', default=False)
+        add('--sync-fetch-buffer-mb', type=int, env_var='SYNC_FETCH_BUFFER_MB', help='size of each shared memory buffer used with --sync-fetch-processes', default=256)
+
+        # snapshot
+        add('--snapshot-dir', env_var='SNAPSHOT_DIR', help='directory of snapshot written by `snapshot export` and read by `snapshot import` mode', default=None)
+        add('--snapshot-jobs', type=int, env_var='SNAPSHOT_JOBS', help='number of database sessions exporting/importing snapshot files in parallel', default=4)
+        add('--snapshot-chunk-size', type=int, env_var='SNAPSHOT_CHUNK_SIZE', help='number of ids of a table exported to single snapshot file', default=5000000)
 
         # test/debug
         add('--log-level', env_var='LOG_LEVEL', default='INFO')
@@ -60,11 +78,16 @@ class Conf():
         add('--test-max-block', type=int, env_var='TEST_MAX_BLOCK', help='(debug) only sync to given block, for running sync test', default=None)
         add('--test-skip-ais-phase', env_var='TEST_SKIP_AIS_PHASE', help='(debug) Allows to skip After-Initial-Sync phase. Useful to go into live sync or exit if TEST_MAX_BLOCK is used', action='store_true')
         add('--test-profile', type=strtobool, env_var='TEST_PROFILE', help='(debug) profile execution', default=False)
+        add('--sampling-profiler', type=strtobool, env_var='SAMPLING_PROFILER', help='allow starting/stopping sampling profiler at runtime (SIGUSR2 in sync, /admin/profiler/start and /admin/profiler/stop on server admin port)', default=False)
+        add('--sampling-profiler-port', type=int, env_var='SAMPLING_PROFILER_PORT', help='admin port of server (bound to 127.0.0.1) serving sampling profiler endpoints', default=8089)
+        add('--sampling-profiler-interval-ms', type=float, env_var='SAMPLING_PROFILER_INTERVAL_MS', help='interval between stack samples of sampling profiler', default=10.0)
+        add('--sampling-profiler-format', type=str, env_var='SAMPLING_PROFILER_FORMAT', choices=['collapsed', 'speedscope'], help='output of sampling profiler: collapsed stacks (flame graphs) or speedscope JSON', default='collapsed')
         add('--log-request-times', env_var='LOG_REQUEST_TIMES', help='(debug) allows to generate log containing request processing times', action='store_true')
         add('--log-virtual-op-calls', env_var='LOG_VIRTUAL_OP_CALLS', help='(debug) log virtual op calls and responses', default=False)
         add('--mock-block-data-path', type=str, nargs='+', env_var='MOCK_BLOCK_DATA_PATH', help='(debug/testing) load additional data from block data file')
         add('--mock-vops-data-path', type=str, env_var='MOCK_VOPS_DATA_PATH', help='(debug/testing) load additional data from virtual operations data file')
         add('--community-start-block', type=int, env_var='COMMUNITY_START_BLOCK', default=37500000)
+        add('--bench-sync-report', type=str, env_var='BENCH_SYNC_REPORT', help='(debug/testing) file for JSON report of bench-sync mode (printed to stdout when not given)', default=None)
 
         # logging
         add('--log-timestamp', help='Output timestamp in log', action='store_true')
@@ -137,13 +160,16 @@ class Conf():
     def steem(self):
         """Get a SteemClient instance, lazily initialized"""
         if not self._steem:
-            from json import loads
-            self._steem = SteemClient(
-                url=loads(self.get('steemd_url')),
-                max_batch=self.get('max_batch'),
-                max_workers=self.get('max_workers'))
+            self._steem = SteemClient(**self.steem_args())
         return self._steem
 
+    def steem_args(self):
+        """Get SteemClient arguments, e.g. to make client in other process"""
+        from json import loads
+        return dict(url=loads(self.get('steemd_url')),
+                    max_batch=self.get('max_batch'),
+                    max_workers=self.get('max_workers'))
+
     def db(self):
         """Get a configured instance of Db."""
         if self._db is None:
@@ -165,6 +191,9 @@ class Conf():
         - `server`: API server
         - `sync`: db sync process
         - `status`: status info dump
+        - `bench-sync`: sync of mock data with throughput report
+        - `snapshot/export`: dump of indexed state to snapshot files
+        - `snapshot/import`: load of snapshot files into fresh database
         """
         return '/'.join(self.get('mode'))
 
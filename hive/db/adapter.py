@@ -4,6 +4,7 @@ import logging
 from time import perf_counter as perf
 from collections import OrderedDict
 from funcy.seqs import first
+import re
 import sqlalchemy
 import os
 
@@ -13,6 +14,12 @@ logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 
 log = logging.getLogger(__name__)
 
+# same as bind parameter syntax recognized by `sqlalchemy.text`
+BIND_PARAM_RE = re.compile(r'(?<![:\w\x5c]):(\w+)(?!:)')
+
+# longer statements are assumed to be generated (e.g. with inlined VALUES) and not worth caching
+MAX_CACHED_STATEMENT_LENGTH = 4096
+
 class Db:
     """RDBMS adapter for hive. Handles connecting and querying."""
 
@@ -22,6 +29,11 @@ class Db:
     necessary_connections = 15
     max_connections = 1
 
+    #number of parameterized statements cached (parsed and compiled) per instance; 0 disables the cache
+    statement_cache_size = 1000
+    #when set, cached statements are also prepared on server side (PREPARE/EXECUTE), so they are not planned every time
+    prepared_statements = False
+
     @classmethod
     def instance(cls):
         """Get the shared instance."""
@@ -33,6 +45,13 @@ class Db:
         """Set the global/shared db instance. Do not use."""
         cls._instance = db
 
+    @classmethod
+    def configure_statement_cache(cls, size, prepared):
+        """Set size of statement cache and whether cached statements are prepared on server side."""
+        cls.statement_cache_size = max(0, size)
+        cls.prepared_statements = prepared and cls.statement_cache_size > 0
+        log.info("Statement cache size: %d, server side prepared statements: %s", cls.statement_cache_size, cls.prepared_statements)
+
     @classmethod
     def set_max_connections(cls, db):
         """Remember maximum connections offered by postgres database."""
@@ -55,7 +74,8 @@ class Db:
         self._conn = []
         self._engine = None
         self._trx_active = False
-        self._prep_sql = {}
+        self._prep_sql = OrderedDict()
+        self._prepared_count = 0
 
         self.name = name
 
@@ -65,6 +85,9 @@ class Db:
         # is always in progress, this COMMIT is a workaround to get
         # back control (and used with autocommit=False query exec).
         self._exec = self.get_connection(0).execute
+        # cached statements are executed with compiled form cached too
+        self._exec_cached = self.get_connection(0).execution_options(
+            compiled_cache=sqlalchemy.util.LRUCache(max(self.statement_cache_size, 1))).execute
         self._exec(sqlalchemy.text("COMMIT"))
 
     def clone(self, name):
@@ -217,14 +240,54 @@ class Db:
 
         return (sql, values)
 
-    def _sql_text(self, sql):
-#        if sql in self._prep_sql:
-#            query = self._prep_sql[sql]
-#        else:
-#            query = sqlalchemy.text(sql).execution_options(autocommit=False)
-#            self._prep_sql[sql] = query
-        query = sqlalchemy.text(sql).execution_options(autocommit=False)
-        return query
+    def _sql_text(self, sql, params=None):
+        """Get statement object for given sql text and executor to be used with it.
+
+        Parameterized statements are kept in bounded LRU cache (optionally as server side
+        prepared statements), other ones are always created again."""
+        if not params or not self.statement_cache_size or len(sql) > MAX_CACHED_STATEMENT_LENGTH:
+            return (sqlalchemy.text(sql).execution_options(autocommit=False), self._exec)
+
+        query = self._prep_sql.get(sql)
+        if query is not None:
+            self._prep_sql.move_to_end(sql)
+            return (query, self._exec_cached)
+
+        query = self._prepare(sql) if self.prepared_statements else None
+        if query is None:
+            query = sqlalchemy.text(sql).execution_options(autocommit=False)
+        self._prep_sql[sql] = query
+        if len(self._prep_sql) > self.statement_cache_size:
+            (_, evicted) = self._prep_sql.popitem(last=False)
+            if evicted.text.startswith('EXECUTE '):
+                self._exec(sqlalchemy.text("DEALLOCATE " + evicted.text.split()[1].split('(')[0]))
+        return (query, self._exec_cached)
+
+    def _prepare(self, sql):
+        """Prepare statement on server side; returns EXECUTE statement or None when not possible."""
+        if sql.lstrip()[0:6].upper() not in ['SELECT', 'INSERT', 'UPDATE', 'DELETE'] or '\\:' in sql:
+            return None
+        names = []
+        def placeholder(match):
+            if match.group(1) not in names:
+                names.append(match.group(1))
+            return '$' + str(names.index(match.group(1)) + 1)
+        body = BIND_PARAM_RE.sub(placeholder, sql)
+        name = "hive_stmt_{}".format(self._prepared_count)
+        self._prepared_count += 1
+
+        # failed PREPARE must not abort current transaction
+        self._exec(sqlalchemy.text("SAVEPOINT hive_prepare"))
+        try:
+            self._exec(sqlalchemy.text("PREPARE {} AS {}".format(name, body)))
+        except sqlalchemy.exc.DBAPIError as ex:
+            self._exec(sqlalchemy.text("ROLLBACK TO SAVEPOINT hive_prepare"))
+            log.info("Statement cannot be prepared (%s): %s", ex.orig, sql)
+            return None
+        finally:
+            self._exec(sqlalchemy.text("RELEASE SAVEPOINT hive_prepare"))
+        args = ', '.join(':' + param for param in names)
+        return sqlalchemy.text("EXECUTE {}({})".format(name, args) if names else "EXECUTE " + name).execution_options(autocommit=False)
 
     def _query(self, sql, **kwargs):
         """Send a query off to SQLAlchemy."""
@@ -237,10 +300,10 @@ class Db:
 
         try:
             start = perf()
-            query = self._sql_text(sql)
+            (query, execute) = self._sql_text(sql, kwargs)
             if 'log_query' in kwargs and kwargs['log_query']:
                 log.info("QUERY: {}".format(query))
-            result = self._exec(query, **kwargs)
+            result = execute(query, **kwargs)
             if 'log_result' in kwargs and kwargs['log_result']:
                 log.info("RESULT: {}".format(result))
             Stats.log_db(sql, perf() - start)
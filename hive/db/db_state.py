@@ -2,6 +2,7 @@
 
 #pylint: disable=too-many-lines
 
+import os
 import time
 from time import perf_counter
 
@@ -21,10 +22,13 @@ from hive.utils.communities_rank import update_communities_posts_and_rank
 from hive.server.common.payout_stats import PayoutStats
 
 from hive.utils.stats import FinalOperationStatusManager as FOSM
+from hive.utils.task_graph import TaskGraph
 
 log = logging.getLogger(__name__)
 
 SYNCED_BLOCK_LIMIT = 7*24*1200 # 7 days
+POSTS_CHUNK_SIZE = 2000000 # ids of hive_posts updated by single task while finishing massive sync
+INDEX_MAINTENANCE_WORK_MEM = '1GB' # per session building an index
 
 class DbState:
     """Manages database state: sync status, migrations, etc."""
@@ -212,19 +216,125 @@ class DbState:
                         log.info("Index %s created in time %.4f s", index.name, elapsed_time)
                         any_index_created = True
             if any_index_created:
-                cls._execute_query(db_mgr.db,"ANALYZE")
+                cls._execute_query(db_mgr.db, "ANALYZE {}".format(table_name))
         log.info("[INIT] End %s-initial sync hooks for table %s", "pre" if is_pre_process else "post", table_name)
 
+    @classmethod
+    def _table_partitions(cls, db, table_name):
+        """Names of partitions of given table (empty for not partitioned tables)."""
+        sql = """SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                 WHERE i.inhparent = CAST(:table_name AS regclass) ORDER BY c.relname"""
+        return db.query_col(sql, table_name=table_name)
+
+    @classmethod
+    def _partition_index_name(cls, index, partition):
+        # partitions are named <table>_p<first block>, see prepare_range_partitions
+        return index.name + partition[len(index.table.name):]
+
+    @classmethod
+    def _index_ddl(cls, engine, index):
+        return str(sqlalchemy.schema.CreateIndex(index).compile(dialect=engine.dialect))
+
+    @classmethod
+    def _build_index(cls, db, index, relation, name, parallel_workers):
+        """Creates `index` (of partitioned or regular table) on `relation` under given `name`."""
+        with AutoDbDisposer(db, name) as db_mgr:
+            # settings are local to the session, so concurrent builds don't affect each other nor other clients
+            db_mgr.db.query_no_return("SET maintenance_work_mem = '{}'".format(INDEX_MAINTENANCE_WORK_MEM))
+            db_mgr.db.query_no_return("SET max_parallel_maintenance_workers = {}".format(parallel_workers))
+            prefix = "CREATE INDEX {} ON {} ".format(index.name, index.table.name)
+            ddl = cls._index_ddl(db_mgr.db.engine(), index).replace(prefix, "CREATE INDEX {} ON {} ".format(name, relation), 1)
+            time_start = perf_counter()
+            db_mgr.db.query_no_return(ddl)
+            log.info("Index %s created in time %.4f s", name, perf_counter() - time_start)
+
+    @classmethod
+    def attach_partition_indexes(cls, db, table_name, indexes, partitions):
+        """Creates parent indexes of partitioned table from indexes built separately on its partitions."""
+        engine = db.engine()
+        for index in indexes:
+            prefix = "CREATE INDEX {} ON {} ".format(index.name, table_name)
+            db.query_no_return(cls._index_ddl(engine, index).replace(prefix, "CREATE INDEX {} ON ONLY {} ".format(index.name, table_name), 1))
+            for partition in partitions:
+                db.query_no_return("ALTER INDEX {} ATTACH PARTITION {}".format(index.name, cls._partition_index_name(index, partition)))
+            log.info("Index %s attached to %d partitions", index.name, len(partitions))
+
+    @classmethod
+    def _analyze_table(cls, db, table_name):
+        with AutoDbDisposer(db, "analyze_" + table_name) as db_mgr:
+            time_start = perf_counter()
+            db_mgr.db.query_no_return("ANALYZE {}".format(table_name))
+            log.info("[INIT] ANALYZE %s executed in %.4fs", table_name, perf_counter() - time_start)
+
+    @classmethod
+    def _index_build_plan(cls, db, indexes_per_table):
+        """Missing indexes as (index, relation, name, cost) plus parent indexes to attach (per partitioned table).
+
+        Cost of a build is estimated from size of the indexed relation (heap pages to scan and rows to sort),
+        so partitioned tables are planned per partition."""
+        builds = []
+        attachments = {}
+        for table, indexes in indexes_per_table.items():
+            missing = [index for index in indexes if not cls.has_index(db, index.name)]
+            if not missing:
+                continue
+            partitions = cls._table_partitions(db, table.name)
+            if partitions:
+                attachments[table.name] = (missing, partitions)
+            for relation in partitions or [table.name]:
+                size = db.query_one("SELECT pg_relation_size(CAST(:relation AS regclass))", relation=relation)
+                for index in missing:
+                    name = cls._partition_index_name(index, relation) if partitions else index.name
+                    if not partitions or not cls.has_index(db, name):
+                        # wider indexes have more to sort and write
+                        builds.append((index, relation, name, size * len(index.expressions)))
+        builds.sort(key=lambda build: -build[3])
+        return builds, attachments
+
+    @classmethod
+    def _create_indexes(cls, indexes_per_table):
+        """Creates missing indexes: longest builds go first on a pool of sessions, then affected tables are analyzed."""
+        db = cls.db()
+        builds, attachments = cls._index_build_plan(db, indexes_per_table)
+        if not builds and not attachments:
+            log.info("[INIT] All indexes already exist")
+            return
+
+        workers = max(1, min(Db.max_connections, os.cpu_count() or 1, len(builds)))
+        parallel_workers = db.query_one("SELECT setting::int FROM pg_settings WHERE name = 'max_parallel_workers'") // workers
+
+        log.info("[INIT] Index build plan: %d indexes, %d sessions, %d parallel workers each, %s maintenance_work_mem",
+                 len(builds), workers, parallel_workers, INDEX_MAINTENANCE_WORK_MEM)
+        tasks = TaskGraph(workers)
+        tables = set()
+        for (index, relation, name, cost) in builds:
+            log.info("[INIT] Plan: index %s on %s, estimated cost %d", name, relation, cost)
+            tables.add(index.table.name)
+            resource = index.table.name + '.indexes'
+            tasks.add(name, cls._build_index, [db, index, relation, name, parallel_workers], writes=[resource], group=resource, cost=cost)
+        for table_name, (indexes, partitions) in attachments.items():
+            tables.add(table_name)
+            tasks.add(table_name + '.attach', cls.attach_partition_indexes, [db, table_name, indexes, partitions],
+                      reads=[table_name + '.indexes'], writes=[table_name + '.attached'])
+        for table_name in sorted(tables):
+            tasks.add('ANALYZE ' + table_name, cls._analyze_table, [db, table_name], reads=[table_name + '.indexes', table_name + '.attached'])
+
+        finished = tasks.run(FOSM.final_stat)
+        log.info("[INIT] %i index tasks finished.", finished)
+
     @classmethod
     def processing_indexes(cls, is_pre_process, drop, create):
         start_time = FOSM.start()
         _indexes = cls._disableable_indexes()
 
-        methods = []
-        for _key_table, indexes in _indexes.items():
-          methods.append( (_key_table.name, cls.processing_indexes_per_table, [cls.db(), _key_table.name, indexes, is_pre_process, drop, create]) )
+        if drop:
+            methods = []
+            for _key_table, indexes in _indexes.items():
+              methods.append( (_key_table.name, cls.processing_indexes_per_table, [cls.db(), _key_table.name, indexes, is_pre_process, True, False]) )
+            cls.process_tasks_in_threads("[INIT] %i threads finished dropping indexes.", methods)
 
-        cls.process_tasks_in_threads("[INIT] %i threads finished creating indexes.", methods)
+        if create:
+            cls._create_indexes(_indexes)
 
         real_time = FOSM.stop(start_time)
 
@@ -276,28 +386,30 @@ class DbState:
         return current_work_mem
 
     @classmethod
-    def _finish_hive_posts(cls, db, massive_sync_preconditions, last_imported_block, current_imported_block):
-        with AutoDbDisposer(db, "finish_hive_posts") as db_mgr:
-            def vacuum_hive_posts(cls):
-              if massive_sync_preconditions:
-                  cls._execute_query(db_mgr.db, "VACUUM ANALYZE hive_posts")
+    def _post_id_chunks(cls, db):
+        """Ranges of post ids splitting updates of whole hive_posts into parts processed concurrently."""
+        (first_id, last_id) = db.query_row("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM hive_posts")
+        return [(start, min(start + POSTS_CHUNK_SIZE - 1, last_id)) for start in range(first_id, last_id + 1, POSTS_CHUNK_SIZE)]
 
-            #UPDATE: `children`
+    @classmethod
+    def _finish_hive_posts_children_count(cls, db, massive_sync_preconditions, last_imported_block, current_imported_block, first_id=None, last_id=None):
+        with AutoDbDisposer(db, "finish_hive_posts_children_count") as db_mgr:
             time_start = perf_counter()
-            if massive_sync_preconditions:
+            if first_id is not None:
+                # Update count of child posts in discussions of given chunk of root posts (what was hold during initial sync)
+                sql = "select update_hive_posts_children_count_for_roots({}, {})".format(first_id, last_id)
+            elif massive_sync_preconditions:
                 # Update count of all child posts (what was hold during initial sync)
-                cls._execute_query(db_mgr.db, "select update_all_hive_posts_children_count()")
+                sql = "select update_all_hive_posts_children_count()"
             else:
                 # Update count of child posts processed during partial sync (what was hold during initial sync)
                 sql = "select update_hive_posts_children_count({}, {})".format(last_imported_block, current_imported_block)
-                cls._execute_query(db_mgr.db, sql)
+            cls._execute_query(db_mgr.db, sql)
             log.info("[INIT] update_hive_posts_children_count executed in %.4fs", perf_counter() - time_start)
 
-            time_start = perf_counter()
-            vacuum_hive_posts(cls)
-            log.info("[INIT] VACUUM ANALYZE hive_posts executed in %.4fs", perf_counter() - time_start)
-
-            #UPDATE: `root_id`
+    @classmethod
+    def _finish_hive_posts_root_id(cls, db, last_imported_block, current_imported_block):
+        with AutoDbDisposer(db, "finish_hive_posts_root_id") as db_mgr:
             # Update root_id all root posts
             time_start = perf_counter()
             sql = """
@@ -306,29 +418,29 @@ class DbState:
             cls._execute_query(db_mgr.db, sql)
             log.info("[INIT] update_hive_posts_root_id executed in %.4fs", perf_counter() - time_start)
 
-            time_start = perf_counter()
-            vacuum_hive_posts(cls)
-            log.info("[INIT] VACUUM ANALYZE hive_posts executed in %.4fs", perf_counter() - time_start)
-
-            #UPDATE: `active`
-            time_start = perf_counter()
-            update_active_starting_from_posts_on_block(last_imported_block, current_imported_block)
-            log.info("[INIT] update_all_posts_active executed in %.4fs", perf_counter() - time_start)
-
-            time_start = perf_counter()
-            vacuum_hive_posts(cls)
-            log.info("[INIT] VACUUM ANALYZE hive_posts executed in %.4fs", perf_counter() - time_start)
+    @classmethod
+    def _finish_hive_posts_active(cls, last_imported_block, current_imported_block):
+        time_start = perf_counter()
+        update_active_starting_from_posts_on_block(last_imported_block, current_imported_block)
+        log.info("[INIT] update_all_posts_active executed in %.4fs", perf_counter() - time_start)
 
+    @classmethod
+    def _finish_hive_posts_rshares(cls, db, last_imported_block, current_imported_block, first_id=None, last_id=None):
+        with AutoDbDisposer(db, "finish_hive_posts_rshares") as db_mgr:
             #UPDATE: `abs_rshares`, `vote_rshares`, `sc_hot`, ,`sc_trend`, `total_votes`, `net_votes`
             time_start = perf_counter()
-            sql = """
-                  SELECT update_posts_rshares({}, {});
-                  """.format(last_imported_block, current_imported_block)
+            if first_id is not None:
+                sql = "SELECT update_posts_rshares({}, {}, {}, {});".format(last_imported_block, current_imported_block, first_id, last_id)
+            else:
+                sql = "SELECT update_posts_rshares({}, {});".format(last_imported_block, current_imported_block)
             cls._execute_query(db_mgr.db, sql)
             log.info("[INIT] update_posts_rshares executed in %.4fs", perf_counter() - time_start)
 
+    @classmethod
+    def _vacuum_hive_posts(cls, db):
+        with AutoDbDisposer(db, "vacuum_hive_posts") as db_mgr:
             time_start = perf_counter()
-            vacuum_hive_posts(cls)
+            cls._execute_query(db_mgr.db, "VACUUM ANALYZE hive_posts")
             log.info("[INIT] VACUUM ANALYZE hive_posts executed in %.4fs", perf_counter() - time_start)
 
     @classmethod
@@ -436,24 +548,49 @@ class DbState:
 
         log.info("#############################################################################")
 
-        methods = []
-        methods.append( ('hive_posts', cls._finish_hive_posts, [cls.db(), massive_sync_preconditions, last_imported_block, current_imported_block]) )
-        methods.append( ('hive_feed_cache', cls._finish_hive_feed_cache, [cls.db(), last_imported_block, current_imported_block]) )
-        methods.append( ('hive_mentions', cls._finish_hive_mentions, [cls.db(), last_imported_block, current_imported_block]) )
-        methods.append( ('payout_stats_view', cls._finish_payout_stats_view, []) )
-        methods.append( ('account_reputations', cls._finish_account_reputations, [cls.db(), last_imported_block, current_imported_block]) )
-        methods.append( ('communities_posts_and_rank', cls._finish_communities_posts_and_rank, [cls.db()]) )
-        cls.process_tasks_in_threads("[INIT] %i threads finished filling tables. Part nr 0", methods)
+        # Tasks declare resources they read/write: all `hive_posts` updaters write `hive_posts` itself, so they never
+        # run concurrently (row locks), while chunks of one update (same group) touch disjoint rows and run in parallel.
+        # Column resources (`table.column`) are used when other tasks depend only on part of the data.
+        db = cls.db()
+        blocks = (last_imported_block, current_imported_block)
+        chunks = cls._post_id_chunks(db) if massive_sync_preconditions else []
+        tasks = TaskGraph(Db.max_connections)
+
+        #hive_posts_api_helper and children count by discussions are dependent on `hive_posts/root_id` filling
+        tasks.add('hive_posts_root_id', cls._finish_hive_posts_root_id, [db, *blocks], writes=['hive_posts', 'hive_posts.root_id'])
+        if chunks:
+            for (first_id, last_id) in chunks:
+                tasks.add('hive_posts_children_count', cls._finish_hive_posts_children_count, [db, massive_sync_preconditions, *blocks, first_id, last_id],
+                          reads=['hive_posts.root_id'], writes=['hive_posts', 'hive_posts.children'], group='hive_posts_children_count')
+            tasks.add('vacuum_hive_posts', cls._vacuum_hive_posts, [db], writes=['hive_posts'])
+        else:
+            tasks.add('hive_posts_children_count', cls._finish_hive_posts_children_count, [db, massive_sync_preconditions, *blocks],
+                      writes=['hive_posts', 'hive_posts.children'])
+        tasks.add('hive_posts_active', cls._finish_hive_posts_active, [*blocks], writes=['hive_posts', 'hive_posts.active'])
+        if chunks:
+            for (first_id, last_id) in chunks:
+                tasks.add('hive_posts_rshares', cls._finish_hive_posts_rshares, [db, *blocks, first_id, last_id],
+                          reads=['hive_votes'], writes=['hive_posts', 'hive_posts.rshares'], group='hive_posts_rshares')
+            tasks.add('vacuum_hive_posts', cls._vacuum_hive_posts, [db], writes=['hive_posts'])
+        else:
+            tasks.add('hive_posts_rshares', cls._finish_hive_posts_rshares, [db, *blocks], reads=['hive_votes'], writes=['hive_posts', 'hive_posts.rshares'])
 
-        methods = []
-        #Notifications are dependent on many tables, therefore it's necessary to calculate it at the end
-        methods.append( ('notification_cache', cls._finish_notification_cache, [cls.db()]) )
-        #hive_posts_api_helper is dependent on `hive_posts/root_id` filling
-        methods.append( ('hive_posts_api_helper', cls._finish_hive_posts_api_helper, [cls.db(), last_imported_block, current_imported_block]) )
+        tasks.add('hive_feed_cache', cls._finish_hive_feed_cache, [db, *blocks], writes=['hive_feed_cache'])
+        tasks.add('hive_mentions', cls._finish_hive_mentions, [db, *blocks], writes=['hive_mentions'])
+        tasks.add('payout_stats_view', cls._finish_payout_stats_view, [], writes=['hive_payout_stats'])
         #methods `_finish_follow_count` and `_finish_account_reputations` update the same table: `hive_accounts`.
         #It can cause deadlock, therefore these functions can't be processed concurrently
-        methods.append( ('follow_count', cls._finish_follow_count, [cls.db(), last_imported_block, current_imported_block]) )
-        cls.process_tasks_in_threads("[INIT] %i threads finished filling tables. Part nr 1", methods)
+        tasks.add('account_reputations', cls._finish_account_reputations, [db, *blocks], writes=['hive_accounts', 'hive_accounts.reputation'])
+        tasks.add('follow_count', cls._finish_follow_count, [db, *blocks], writes=['hive_accounts', 'hive_accounts.follows'])
+        tasks.add('hive_posts_api_helper', cls._finish_hive_posts_api_helper, [db, *blocks], reads=['hive_posts.root_id'], writes=['hive_posts_api_helper'])
+        #communities rank is computed from community totals filled together with payout stats
+        tasks.add('communities_posts_and_rank', cls._finish_communities_posts_and_rank, [db], reads=['hive_payout_stats'], writes=['hive_communities'])
+        #Notifications are dependent on many tables, therefore it's necessary to calculate it at the end
+        tasks.add('notification_cache', cls._finish_notification_cache, [db],
+                  reads=['hive_posts', 'hive_mentions', 'hive_accounts.reputation', 'hive_communities'], writes=['hive_notification_cache'])
+
+        finished = tasks.run(FOSM.final_stat)
+        log.info("[INIT] %i tasks finished filling tables (%i connections).", finished, Db.max_connections)
 
         real_time = FOSM.stop(start_time)
 
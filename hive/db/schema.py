@@ -52,17 +52,20 @@ def build_metadata():
         sa.Index('hive_accounts_ix6', 'reputation')
     )
 
+    # partitioned by block range (see prepare_reputation_data_partitions), expired partitions are dropped as a whole
     sa.Table(
         'hive_reputation_data', metadata,
-        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
         sa.Column('author_id', sa.Integer, nullable=False),
         sa.Column('voter_id', sa.Integer, nullable=False),
         sa.Column('permlink', sa.String(255, collation='C'), nullable=False),
         sa.Column('rshares', sa.BigInteger, nullable=False),
-        sa.Column('block_num', sa.Integer,  nullable=False),
+        sa.Column('block_num', sa.Integer, primary_key=True, autoincrement=False),
 
         sa.Index('hive_reputation_data_author_permlink_voter_idx', 'author_id', 'permlink', 'voter_id'),
-        sa.Index('hive_reputation_data_block_num_idx', 'block_num')
+        sa.Index('hive_reputation_data_block_num_idx', 'block_num'),
+
+        postgresql_partition_by='RANGE (block_num)'
     )
 
     sa.Table(
@@ -316,6 +319,26 @@ def build_metadata():
         sa.UniqueConstraint('post_id', 'account_id', 'block_num', name='hive_mentions_ux1')
     )
 
+    sa.Table(
+        'hive_payout_stats', metadata,
+        sa.Column('community_id', sa.Integer, nullable=False), # 0 for posts outside of communities
+        sa.Column('author_id', sa.Integer, nullable=False),
+        sa.Column('payout', sa.types.DECIMAL(14, 3), nullable=False),
+        sa.Column('pending_payout', sa.types.DECIMAL(14, 3), nullable=False),
+        sa.Column('posts', sa.Integer, nullable=False),
+
+        sa.PrimaryKeyConstraint('author_id', 'community_id', name='hive_payout_stats_pk')
+    )
+
+    sa.Table(
+        'hive_payout_stats_communities', metadata,
+        sa.Column('community_id', sa.Integer, primary_key=True, autoincrement=False), # 0 for posts outside of communities
+        sa.Column('payout', sa.types.DECIMAL(14, 3), nullable=False),
+        sa.Column('pending_payout', sa.types.DECIMAL(14, 3), nullable=False),
+        sa.Column('posts', sa.Integer, nullable=False),
+        sa.Column('authors', sa.Integer, nullable=False)
+    )
+
     metadata = build_metadata_community(metadata)
 
     return metadata
@@ -400,9 +423,10 @@ def build_metadata_community(metadata=None):
         sa.Index('hive_notifs_ix6', 'dst_id', 'created_at', 'score', 'id', postgresql_where=sql_text("dst_id IS NOT NULL")), # unread
     )
 
+    # partitioned by block range (see prepare_notification_cache_partitions), old partitions are dropped as a whole
     sa.Table('hive_notification_cache', metadata,
-        sa.Column('id', sa.BigInteger, primary_key=True),
-        sa.Column('block_num', sa.Integer, nullable = False),
+        sa.Column('id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('block_num', sa.Integer, primary_key=True, autoincrement=False),
         sa.Column('type_id', sa.Integer, nullable = False),
         sa.Column('dst', sa.Integer, nullable=True), # dst account id except persistent notifs from hive_notifs
         sa.Column('src', sa.Integer, nullable=True), # src account id
@@ -415,8 +439,9 @@ def build_metadata_community(metadata=None):
         sa.Column('payload', sa.String, nullable=True),
 
         sa.Index('hive_notification_cache_block_num_idx', 'block_num'),
-        sa.Index('hive_notification_cache_dst_score_idx', 'dst', 'score', postgresql_where=sql_text("dst IS NOT NULL"))
+        sa.Index('hive_notification_cache_dst_score_idx', 'dst', 'score', postgresql_where=sql_text("dst IS NOT NULL")),
 
+        postgresql_partition_by='RANGE (block_num)'
     )
 
     return metadata
@@ -654,8 +679,8 @@ def set_fillfactor(db):
     fillfactor_config = {
         'hive_posts': 70,
         'hive_post_data': 70,
-        'hive_votes': 70,
-        'hive_reputation_data': 50
+        'hive_votes': 70
+        # hive_reputation_data partitions get their FILLFACTOR when created (see prepare_reputation_data_partitions)
     }
 
     for table, fillfactor in fillfactor_config.items():
@@ -670,10 +695,19 @@ def set_logged_table_attribute(db, logged):
         'hive_permlink_data',
         'hive_posts',
         'hive_post_data',
-        'hive_votes',
+        'hive_votes'
+    ]
+    # partitioned tables can't have the attribute, it is set on their partitions (new partitions
+    # take it from existing ones, see prepare_range_partitions)
+    partitioned_config = [
         'hive_reputation_data'
     ]
 
+    for table in partitioned_config:
+        sql = """SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                 WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"""
+        logged_config.extend(db.query_col(sql, table=table))
+
     for table in logged_config:
         log.info("Setting {} attribute on a table: {}".format('LOGGED' if logged else 'UNLOGGED', table))
         sql = """ALTER TABLE {} SET {}"""
@@ -0,0 +1,247 @@
+"""Export/import of indexed state snapshots (`hive snapshot export|import`).
+
+Snapshot is a directory of gzipped binary COPY files, one per table chunk
+(id range) or partition, plus `manifest.json` describing them together
+with head block and schema patch level. Export runs in parallel sessions
+sharing one exported transaction snapshot, so files are consistent even
+when sync is running. Import loads files in parallel into fresh database,
+with FKs and disableable indexes dropped for the time of loading; sync
+started afterwards resumes from the snapshot's head block.
+
+Binary COPY format is only guaranteed to be read by the same (or newer)
+major version of PostgreSQL, and snapshot can be imported only by
+hivemind of the same schema patch level.
+"""
+
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from time import perf_counter
+
+import sqlalchemy as sa
+
+from hive.db.adapter import Db
+from hive.db.db_state import DbState
+from hive.db.schema import build_metadata, drop_fk, create_fk
+from hive.utils.stats import FinalOperationStatusManager as FOSM
+from hive.utils.task_graph import TaskGraph
+
+log = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+COMPRESS_LEVEL = 3 # binary COPY data compresses well already on fast levels
+
+def _chunk_key(table):
+    """Single integer primary key column of table, used to split it into chunks; None if there is none."""
+    columns = list(table.primary_key.columns)
+    if len(columns) == 1 and isinstance(columns[0].type, sa.Integer):
+        return columns[0].name
+    return None
+
+def _patch_level(cursor):
+    cursor.execute("SELECT level, patched_to_revision FROM hive_db_patch_level ORDER BY level DESC LIMIT 1")
+    row = cursor.fetchone()
+    return dict(level=row[0], patched_to_revision=row[1]) if row else None
+
+def _columns(cursor, table_name):
+    cursor.execute("""SELECT column_name FROM information_schema.columns
+                      WHERE table_schema = 'public' AND table_name = %s ORDER BY ordinal_position""", (table_name,))
+    return [row[0] for row in cursor.fetchall()]
+
+def _partitions(cursor, table_name):
+    cursor.execute("""SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), array_to_string(c.reloptions, ', ')
+                      FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                      WHERE i.inhparent = CAST(%s AS regclass) ORDER BY c.relname""", (table_name,))
+    return [dict(name=name, bound=bound, options=options) for (name, bound, options) in cursor.fetchall()]
+
+def _relation_size(cursor, relation):
+    cursor.execute("SELECT pg_relation_size(CAST(%s AS regclass))", (relation,))
+    return cursor.fetchone()[0]
+
+def _plan_table(cursor, table, chunk_size):
+    """Files of one table: partitions of partitioned table or id ranges of `chunk_size` ids."""
+    columns = _columns(cursor, table.name)
+    partitions = _partitions(cursor, table.name)
+    files = []
+    if partitions:
+        for partition in partitions:
+            files.append(dict(file=partition['name'] + '.copy.gz', relation=partition['name'],
+                              cost=_relation_size(cursor, partition['name'])))
+        return dict(columns=columns, partitions=partitions, files=files)
+
+    size = _relation_size(cursor, table.name)
+    key = _chunk_key(table)
+    if key is not None:
+        cursor.execute("SELECT MIN({0}), MAX({0}) FROM {1}".format(key, table.name))
+        first_id, last_id = cursor.fetchone()
+        if first_id is not None and last_id - first_id >= chunk_size:
+            span = last_id - first_id + 1
+            for idx, start in enumerate(range(first_id, last_id + 1, chunk_size)):
+                end = min(start + chunk_size, last_id + 1)
+                files.append(dict(file='{}.{:04d}.copy.gz'.format(table.name, idx), relation=table.name,
+                                  where='{} >= {} AND {} < {}'.format(key, start, key, end),
+                                  cost=size * (end - start) // span))
+    if not files:
+        files.append(dict(file=table.name + '.copy.gz', relation=table.name, cost=size))
+    return dict(columns=columns, partitions=[], files=files)
+
+def _export_file(db, snapshot_id, directory, columns, entry):
+    """Dumps one chunk inside exported transaction snapshot."""
+    sql = "COPY (SELECT {} FROM {}{}) TO STDOUT WITH (FORMAT binary)".format(
+        ', '.join(columns), entry['relation'], " WHERE " + entry['where'] if 'where' in entry else '')
+    connection = db.engine().raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+        time_start = perf_counter()
+        with gzip.open(os.path.join(directory, entry['file']), 'wb', compresslevel=COMPRESS_LEVEL) as target:
+            cursor.copy_expert(sql, target)
+        entry['rows'] = cursor.rowcount # -1 when not reported by driver
+        connection.rollback()
+        log.info("[SNAPSHOT] %s: %d rows exported in %.4fs", entry['file'], entry['rows'], perf_counter() - time_start)
+    finally:
+        connection.close()
+
+def export_snapshot(conf):
+    """Dumps all hivemind tables to `--snapshot-dir`."""
+    directory = conf.get('snapshot_dir')
+    assert directory, "snapshot export needs --snapshot-dir"
+    os.makedirs(directory, exist_ok=True)
+    assert not os.path.exists(os.path.join(directory, MANIFEST)), "snapshot already exists in %s" % directory
+
+    start_time = FOSM.start()
+    db = Db.instance()
+    # transaction of this session stays open until export is finished, so its snapshot can be shared
+    coordinator = db.engine().raw_connection()
+    try:
+        cursor = coordinator.cursor()
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        cursor.execute("SELECT pg_export_snapshot()")
+        snapshot_id = cursor.fetchone()[0]
+
+        cursor.execute("SELECT num, hash, created_at FROM hive_blocks ORDER BY num DESC LIMIT 1")
+        num, block_hash, created_at = cursor.fetchone()
+        cursor.execute("SELECT current_setting('server_version_num')::int")
+        server_version = cursor.fetchone()[0]
+        manifest = dict(format=FORMAT_VERSION,
+                        created_at=datetime.now().isoformat(timespec='seconds'),
+                        server_version_num=server_version,
+                        head_block=dict(num=num, hash=block_hash, created_at=str(created_at)),
+                        db_patch_level=_patch_level(cursor),
+                        tables={})
+
+        tasks = TaskGraph(conf.get('snapshot_jobs'))
+        for table in build_metadata().sorted_tables:
+            plan = _plan_table(cursor, table, conf.get('snapshot_chunk_size'))
+            manifest['tables'][table.name] = plan
+            for entry in plan['files']:
+                tasks.add(entry['file'], _export_file, [db, snapshot_id, directory, plan['columns'], entry],
+                          group=table.name, cost=entry['cost'])
+        log.info("[SNAPSHOT] Exporting head block %d in %d files, %d sessions", num, len(tasks), conf.get('snapshot_jobs'))
+        tasks.run(FOSM.final_stat)
+        coordinator.rollback()
+    finally:
+        coordinator.close()
+
+    for plan in manifest['tables'].values():
+        for entry in plan['files']:
+            del entry['cost']
+    # manifest is written last, so only complete snapshot has it
+    path = os.path.join(directory, MANIFEST)
+    with open(path + '.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.rename(path + '.tmp', path)
+
+    real_time = FOSM.stop(start_time)
+    FOSM.log_current("Snapshot export times")
+    FOSM.clear()
+    log.info("[SNAPSHOT] Snapshot of head block %d exported to %s in %.4fs", num, directory, real_time)
+
+def _import_file(db, directory, table_name, columns, entry):
+    """Loads one chunk and checks it has all exported rows."""
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT binary)".format(table_name, ', '.join(columns))
+    connection = db.engine().raw_connection()
+    try:
+        cursor = connection.cursor()
+        time_start = perf_counter()
+        with gzip.open(os.path.join(directory, entry['file']), 'rb') as source:
+            cursor.copy_expert(sql, source)
+        assert min(cursor.rowcount, entry['rows']) < 0 or cursor.rowcount == entry['rows'], \
+            "%s: imported %d rows, expected %d" % (
+            entry['file'], cursor.rowcount, entry['rows'])
+        connection.commit()
+        log.info("[SNAPSHOT] %s: %d rows imported in %.4fs", entry['file'], entry['rows'], perf_counter() - time_start)
+    finally:
+        connection.close()
+
+def _reset_sequences(db, table_names):
+    """Moves serial sequences past imported ids."""
+    for table_name in table_names:
+        columns = db.query_col("""SELECT column_name FROM information_schema.columns
+                                  WHERE table_schema = 'public' AND table_name = :table_name
+                                    AND pg_get_serial_sequence(:table_name, column_name) IS NOT NULL""",
+                               table_name=table_name)
+        for column in columns:
+            db.query_one("SELECT setval(pg_get_serial_sequence(:table_name, :column), COALESCE(MAX({0}), 0) + 1, false) FROM {1}"
+                         .format(column, table_name), table_name=table_name, column=column)
+
+def import_snapshot(conf):
+    """Loads snapshot from `--snapshot-dir` into database without indexed blocks."""
+    directory = conf.get('snapshot_dir')
+    assert directory, "snapshot import needs --snapshot-dir"
+    with open(os.path.join(directory, MANIFEST), 'r') as manifest_file:
+        manifest = json.load(manifest_file)
+    assert manifest['format'] == FORMAT_VERSION, "unsupported snapshot format %s" % manifest['format']
+
+    DbState.initialize()
+    db = Db.instance()
+    head = db.query_one("SELECT MAX(num) FROM hive_blocks")
+    assert not head, "snapshot can be imported only into database without synced blocks (head block %d)" % head
+    server_version = db.query_one("SELECT current_setting('server_version_num')::int")
+    assert server_version // 10000 >= manifest['server_version_num'] // 10000, \
+        "snapshot made by PostgreSQL %d can't be loaded by older %d" % (manifest['server_version_num'], server_version)
+    patch_level = db.query_one("SELECT patched_to_revision FROM hive_db_patch_level ORDER BY level DESC LIMIT 1")
+    expected = (manifest['db_patch_level'] or {}).get('patched_to_revision')
+    assert patch_level == expected, "snapshot has schema patch level %s, database %s" % (expected, patch_level)
+
+    start_time = FOSM.start()
+    tables = manifest['tables']
+    log.info("[SNAPSHOT] Importing head block %d from %s", manifest['head_block']['num'], directory)
+
+    drop_fk(db)
+    #is_pre_process, drop, create
+    DbState.processing_indexes(True, True, False)
+    # rows seeded by schema setup are part of snapshot too
+    db.query_no_return("TRUNCATE {}".format(', '.join(tables)))
+    for table_name, plan in tables.items():
+        for partition in plan['partitions']:
+            db.query_no_return("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} {}{}".format(
+                partition['name'], table_name, partition['bound'],
+                " WITH ({})".format(partition['options']) if partition['options'] else ''))
+
+    tasks = TaskGraph(conf.get('snapshot_jobs'))
+    for table_name, plan in tables.items():
+        for entry in plan['files']:
+            size = os.path.getsize(os.path.join(directory, entry['file']))
+            tasks.add(entry['file'], _import_file, [db, directory, table_name, plan['columns'], entry],
+                      group=table_name, cost=size)
+    tasks.run(FOSM.final_stat)
+    _reset_sequences(db, tables)
+
+    FOSM.log_current("Snapshot import times")
+    FOSM.clear()
+
+    #is_pre_process, drop, create
+    DbState.processing_indexes(False, False, True)
+    log.info("Recreating foreign keys")
+    create_fk(db)
+    time_start = perf_counter()
+    db.query_no_return("VACUUM ANALYZE")
+    log.info("[SNAPSHOT] VACUUM ANALYZE executed in %.4fs", perf_counter() - time_start)
+
+    log.info("[SNAPSHOT] Snapshot of head block %d imported in %.4fs; sync will resume from block %d",
+             manifest['head_block']['num'], FOSM.stop(start_time), manifest['head_block']['num'] + 1)
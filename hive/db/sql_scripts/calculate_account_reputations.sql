@@ -254,6 +254,32 @@ END
 $BODY$
 ;
 
+DROP FUNCTION IF EXISTS reputation_data_partition_size;
+
+CREATE OR REPLACE FUNCTION reputation_data_partition_size()
+  RETURNS INT
+  LANGUAGE 'sql'
+  IMMUTABLE
+AS $BODY$
+  SELECT 288000; -- ten days of blocks
+$BODY$
+;
+
+DROP FUNCTION IF EXISTS prepare_reputation_data_partitions;
+
+CREATE OR REPLACE FUNCTION prepare_reputation_data_partitions(
+  in _first_block_num INTEGER,
+  in _last_block_num INTEGER)
+  RETURNS VOID
+  LANGUAGE 'plpgsql'
+  VOLATILE
+AS $BODY$
+BEGIN
+  PERFORM prepare_range_partitions('hive_reputation_data', _first_block_num, _last_block_num, reputation_data_partition_size(), 'fillfactor = 50');
+END
+$BODY$
+;
+
 DROP FUNCTION IF EXISTS truncate_account_reputation_data;
 
 CREATE OR REPLACE FUNCTION truncate_account_reputation_data(
@@ -267,6 +293,8 @@ DECLARE
 
 BEGIN
   __block_num_limit = block_before_head(_day_limit);
+  --- whole expired partitions are just dropped, only the partially expired one needs a DELETE
+  PERFORM drop_range_partitions('hive_reputation_data', __block_num_limit, reputation_data_partition_size());
   DELETE FROM hive_reputation_data hpd
   WHERE hpd.block_num < __block_num_limit
   ;
@@ -110,3 +110,30 @@ BEGIN
 END
 $function$
 language plpgsql STABLE;
+
+DROP FUNCTION IF EXISTS mutes_get_changed_observers;
+CREATE FUNCTION mutes_get_changed_observers( in _after_block INTEGER, in _last_block INTEGER )
+RETURNS TABLE(
+    observer hive_accounts.name%TYPE -- account which follows changed or which follows lists of such account
+)
+AS
+$function$
+BEGIN
+  RETURN QUERY SELECT -- mutes_get_changed_observers
+      ha.name
+  FROM (
+      SELECT hf.follower AS id
+      FROM hive_follows hf
+      WHERE hf.block_num > _after_block AND hf.block_num <= _last_block
+      UNION
+      SELECT hf_o.follower
+      FROM
+          hive_follows hf
+          JOIN hive_follows hf_o ON hf_o.following = hf.follower
+      WHERE
+          hf.block_num > _after_block AND hf.block_num <= _last_block AND ( hf_o.follow_blacklists OR hf_o.follow_muted )
+  ) AS changed
+  JOIN hive_accounts ha ON ha.id = changed.id;
+END
+$function$
+language plpgsql STABLE;
@@ -169,21 +169,80 @@ $function$
 LANGUAGE plpgsql STABLE
 ;
 
-DROP FUNCTION IF EXISTS update_notification_cache;
+DROP FUNCTION IF EXISTS notification_cache_partition_size;
+CREATE OR REPLACE FUNCTION notification_cache_partition_size()
+RETURNS INT
+LANGUAGE 'sql'
+IMMUTABLE
+AS
+$function$
+  SELECT 28800; -- one day of blocks
+$function$
 ;
-CREATE OR REPLACE FUNCTION update_notification_cache(in _first_block_num INT, in _last_block_num INT, in _prune_old BOOLEAN)
+
+DROP FUNCTION IF EXISTS prepare_notification_cache_partitions;
+CREATE OR REPLACE FUNCTION prepare_notification_cache_partitions(in _first_block_num INT, in _last_block_num INT)
+RETURNS VOID
+AS
+$function$
+BEGIN
+  PERFORM prepare_range_partitions( 'hive_notification_cache', _first_block_num, _last_block_num, notification_cache_partition_size() );
+END
+$function$
+LANGUAGE plpgsql VOLATILE
+;
+
+DROP FUNCTION IF EXISTS drop_notification_cache_partitions;
+CREATE OR REPLACE FUNCTION drop_notification_cache_partitions(in _limit_block_num INT)
 RETURNS VOID
 AS
 $function$
+BEGIN
+  -- drops partitions holding only blocks up to _limit_block_num (all partitions when NULL)
+  PERFORM drop_range_partitions( 'hive_notification_cache', _limit_block_num + 1, notification_cache_partition_size() );
+END
+$function$
+LANGUAGE plpgsql VOLATILE
+;
+
+DROP FUNCTION IF EXISTS prepare_notification_cache;
+CREATE OR REPLACE FUNCTION prepare_notification_cache(in _first_block_num INT, in _last_block_num INT, in _prune_old BOOLEAN)
+RETURNS INT
+AS
+$function$
 DECLARE
   __limit_block hive_blocks.num%TYPE = block_before_head( '90 days' );
 BEGIN
+  -- makes partitions for given blocks (whole cache is cleared when _first_block_num is NULL), returns last block not cached anymore
   IF _first_block_num IS NULL THEN
-    TRUNCATE TABLE hive_notification_cache;
-      ALTER SEQUENCE hive_notification_cache_id_seq RESTART WITH 1;
+    PERFORM drop_notification_cache_partitions( NULL );
+    ALTER SEQUENCE hive_notification_cache_id_seq RESTART WITH 1;
+    PERFORM prepare_notification_cache_partitions( __limit_block + 1, ( SELECT hb.num FROM hive_blocks hb ORDER BY hb.num DESC LIMIT 1 ) );
   ELSE
-    DELETE FROM hive_notification_cache nc WHERE _prune_old AND nc.block_num <= __limit_block;
+    IF _prune_old THEN
+      -- rows older than __limit_block left in partially expired partition are filtered out by all readers
+      PERFORM drop_notification_cache_partitions( __limit_block );
+    END IF;
+    PERFORM prepare_notification_cache_partitions( GREATEST( _first_block_num, __limit_block + 1 ), _last_block_num );
   END IF;
+  RETURN __limit_block;
+END
+$function$
+LANGUAGE plpgsql VOLATILE
+;
+
+DROP FUNCTION IF EXISTS update_notification_cache;
+;
+CREATE OR REPLACE FUNCTION update_notification_cache(in _first_block_num INT, in _last_block_num INT, in _prune_old BOOLEAN)
+RETURNS VOID
+AS
+$function$
+DECLARE
+  __limit_block hive_blocks.num%TYPE;
+BEGIN
+  -- live sync writes notifications of processed blocks directly (see Notify.flush_cache), the view is used
+  -- to fill whole cache once initial sync is finished
+  __limit_block = prepare_notification_cache( _first_block_num, _last_block_num, _prune_old );
 
   INSERT INTO hive_notification_cache
   (block_num, type_id, created_at, src, dst, dst_post_id, post_id, score, payload, community, community_title)
@@ -1,31 +1,121 @@
-DROP MATERIALIZED VIEW IF EXISTS payout_stats_view;
+DO $$
+BEGIN
+  -- payout_stats_view used to be materialized view refreshed every hour
+  IF EXISTS ( SELECT 1 FROM pg_matviews WHERE matviewname = 'payout_stats_view' ) THEN
+    DROP MATERIALIZED VIEW payout_stats_view;
+  END IF;
+END
+$$;
 
-CREATE MATERIALIZED VIEW payout_stats_view AS
+DROP VIEW IF EXISTS payout_stats_view;
+CREATE VIEW payout_stats_view AS
   SELECT
-      hp1.community_id,
+      NULLIF( hps.community_id, 0 ) AS community_id,
       ha.name AS author,
-      SUM( hp1.payout + hp1.pending_payout ) AS payout,
-      COUNT(*) AS posts,
-      NULL AS authors
-  FROM hive_posts hp1
-      JOIN hive_accounts ha ON ha.id = hp1.author_id
-  WHERE hp1.counter_deleted = 0 AND NOT hp1.is_paidout AND hp1.id != 0
-  GROUP BY community_id, author
+      hps.payout,
+      hps.posts,
+      NULL::BIGINT AS authors
+  FROM hive_payout_stats hps
+      JOIN hive_accounts ha ON ha.id = hps.author_id
 
   UNION ALL
 
   SELECT
-        hp2.community_id,
-        NULL AS author,
-        SUM( hp2.payout + hp2.pending_payout ) AS payout,
-        COUNT(*) AS posts,
-        COUNT(DISTINCT(author_id)) AS authors
-  FROM hive_posts hp2
-  WHERE hp2.counter_deleted = 0 AND NOT hp2.is_paidout AND hp2.id != 0
-  GROUP BY community_id
-
-WITH DATA
+      NULLIF( hpsc.community_id, 0 ) AS community_id,
+      NULL AS author,
+      hpsc.payout,
+      hpsc.posts,
+      hpsc.authors
+  FROM hive_payout_stats_communities hpsc
+  WHERE hpsc.posts > 0
 ;
 
-CREATE UNIQUE INDEX IF NOT EXISTS payout_stats_view_ix1 ON payout_stats_view (community_id, author );
-CREATE INDEX IF NOT EXISTS payout_stats_view_ix2 ON payout_stats_view (community_id, author, payout);
+DROP FUNCTION IF EXISTS payout_stats_rebuild;
+CREATE FUNCTION payout_stats_rebuild()
+RETURNS VOID
+LANGUAGE 'plpgsql'
+VOLATILE
+AS
+$function$
+BEGIN
+  TRUNCATE hive_payout_stats, hive_payout_stats_communities;
+
+  INSERT INTO hive_payout_stats (community_id, author_id, payout, pending_payout, posts)
+  SELECT -- payout_stats_rebuild
+      COALESCE( hp.community_id, 0 ),
+      hp.author_id,
+      SUM( hp.payout + hp.pending_payout ),
+      SUM( hp.pending_payout ),
+      COUNT(*)
+  FROM hive_posts hp
+  WHERE hp.counter_deleted = 0 AND NOT hp.is_paidout AND hp.id != 0
+  GROUP BY COALESCE( hp.community_id, 0 ), hp.author_id;
+
+  INSERT INTO hive_payout_stats_communities (community_id, payout, pending_payout, posts, authors)
+  SELECT -- payout_stats_rebuild (communities)
+      hps.community_id,
+      SUM( hps.payout ),
+      SUM( hps.pending_payout ),
+      SUM( hps.posts ),
+      COUNT(*)
+  FROM hive_payout_stats hps
+  GROUP BY hps.community_id;
+END
+$function$
+;
+
+DROP FUNCTION IF EXISTS payout_stats_update_authors;
+CREATE FUNCTION payout_stats_update_authors( in _authors VARCHAR[] )
+RETURNS VOID
+LANGUAGE 'plpgsql'
+VOLATILE
+AS
+$function$
+DECLARE
+  __author_ids INT[] = ARRAY( SELECT ha.id FROM hive_accounts ha WHERE ha.name = ANY( _authors ) );
+BEGIN
+  -- per-author rows are recomputed, community rows receive the difference; old rows are removed and
+  -- new ones inserted in separate statements, since modifications of the same rows made by sibling
+  -- CTEs are not ordered
+  WITH old_stats AS
+  (
+    DELETE FROM hive_payout_stats hps
+    WHERE hps.author_id = ANY( __author_ids )
+    RETURNING hps.community_id, hps.payout, hps.pending_payout, hps.posts
+  )
+  INSERT INTO hive_payout_stats_communities AS hpsc (community_id, payout, pending_payout, posts, authors)
+  SELECT os.community_id, -SUM( os.payout ), -SUM( os.pending_payout ), -SUM( os.posts ), -COUNT(*)
+  FROM old_stats os
+  GROUP BY os.community_id
+  ON CONFLICT (community_id) DO UPDATE SET
+      payout = hpsc.payout + EXCLUDED.payout,
+      pending_payout = hpsc.pending_payout + EXCLUDED.pending_payout,
+      posts = hpsc.posts + EXCLUDED.posts,
+      authors = hpsc.authors + EXCLUDED.authors;
+
+  WITH new_stats AS
+  (
+    INSERT INTO hive_payout_stats (community_id, author_id, payout, pending_payout, posts)
+    SELECT -- payout_stats_update_authors
+        COALESCE( hp.community_id, 0 ),
+        hp.author_id,
+        SUM( hp.payout + hp.pending_payout ),
+        SUM( hp.pending_payout ),
+        COUNT(*)
+    FROM hive_posts hp
+    WHERE hp.author_id = ANY( __author_ids ) AND hp.counter_deleted = 0 AND NOT hp.is_paidout AND hp.id != 0
+    GROUP BY COALESCE( hp.community_id, 0 ), hp.author_id
+    RETURNING community_id, payout, pending_payout, posts
+  )
+  INSERT INTO hive_payout_stats_communities AS hpsc (community_id, payout, pending_payout, posts, authors)
+  SELECT ns.community_id, SUM( ns.payout ), SUM( ns.pending_payout ), SUM( ns.posts ), COUNT(*)
+  FROM new_stats ns
+  GROUP BY ns.community_id
+  ON CONFLICT (community_id) DO UPDATE SET
+      payout = hpsc.payout + EXCLUDED.payout,
+      pending_payout = hpsc.pending_payout + EXCLUDED.pending_payout,
+      posts = hpsc.posts + EXCLUDED.posts,
+      authors = hpsc.authors + EXCLUDED.authors;
+END
+$function$
+;
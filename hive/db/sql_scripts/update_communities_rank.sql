@@ -3,6 +3,8 @@ CREATE FUNCTION update_communities_posts_data_and_rank()
 RETURNS void
 AS
 $function$
+-- pending posts data comes from hive_payout_stats_communities (maintained incrementally with payout stats),
+-- so only the small set of communities is ranked and only changed rows are written
 UPDATE hive_communities hc SET
   num_pending = cr.posts,
   sum_pending = cr.payouts,
@@ -18,18 +20,16 @@ FROM
       COALESCE(p.authors, 0) as authors
     FROM hive_communities c
     LEFT JOIN (
-              SELECT hp.community_id,
-                     COUNT(*) posts,
-                     ROUND(SUM(hp.pending_payout)) payouts,
-                     COUNT(DISTINCT hp.author_id) authors
-                FROM hive_posts hp
-               WHERE community_id IS NOT NULL
-                 AND NOT hp.is_paidout
-                 AND hp.counter_deleted = 0
-            GROUP BY hp.community_id
+              SELECT hpsc.community_id,
+                     hpsc.posts,
+                     ROUND(hpsc.pending_payout) payouts,
+                     hpsc.authors
+                FROM hive_payout_stats_communities hpsc
+               WHERE hpsc.community_id <> 0
          ) p
          ON p.community_id = c.id
 ) as cr
-WHERE hc.id = cr.id;
+WHERE hc.id = cr.id
+  AND ( hc.rank, hc.num_pending, hc.sum_pending, hc.num_authors ) IS DISTINCT FROM ( cr.rank::INT, cr.posts, cr.payouts::INT, cr.authors );
 $function$
 language sql;
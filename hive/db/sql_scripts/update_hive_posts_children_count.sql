@@ -109,3 +109,69 @@ BEGIN
 
 END
 $BODY$;
+
+DROP FUNCTION IF EXISTS public.update_hive_posts_children_count_for_roots;
+CREATE OR REPLACE FUNCTION public.update_hive_posts_children_count_for_roots(in _first_root_id INTEGER, in _last_root_id INTEGER)
+  RETURNS void
+  LANGUAGE 'plpgsql'
+  VOLATILE
+AS $BODY$
+-- same as update_all_hive_posts_children_count, but limited to discussions started by given range of root posts
+-- (requires root_id to be filled), so disjoint ranges can be processed concurrently
+declare __depth INT;
+BEGIN
+  CREATE TEMPORARY TABLE IF NOT EXISTS __chunk_posts
+  (
+    id INT NOT NULL,
+    parent_id INT NOT NULL,
+    depth SMALLINT NOT NULL
+  );
+  CREATE INDEX IF NOT EXISTS __chunk_posts_depth_idx ON __chunk_posts (depth);
+
+  CREATE TEMPORARY TABLE IF NOT EXISTS __chunk_post_children
+  (
+    id INT NOT NULL,
+    child_count INT NOT NULL,
+    CONSTRAINT __chunk_post_children_pkey PRIMARY KEY (id)
+  );
+
+  TRUNCATE TABLE __chunk_posts, __chunk_post_children;
+
+  INSERT INTO __chunk_posts (id, parent_id, depth)
+  SELECT h1.id, h1.parent_id, h1.depth
+  FROM hive_posts h1
+  WHERE h1.root_id BETWEEN _first_root_id AND _last_root_id AND h1.parent_id != 0 AND h1.counter_deleted = 0 AND h1.id != 0
+  ;
+  ANALYZE __chunk_posts;
+
+  SELECT MAX(cp.depth) INTO __depth FROM __chunk_posts cp;
+
+  WHILE __depth > 0 LOOP
+    INSERT INTO __chunk_post_children
+    (id, child_count)
+      SELECT
+        cp.parent_id AS queried_parent,
+        SUM(COALESCE((SELECT pc.child_count FROM __chunk_post_children pc WHERE pc.id = cp.id),
+                      0
+                    ) + 1
+        ) AS count
+      FROM __chunk_posts cp
+      WHERE cp.depth = __depth
+      GROUP BY cp.parent_id
+
+    ON CONFLICT ON CONSTRAINT __chunk_post_children_pkey DO UPDATE
+      SET child_count = __chunk_post_children.child_count + excluded.child_count
+    ;
+
+    __depth := __depth -1;
+  END LOOP;
+
+  UPDATE hive_posts uhp
+  SET children = s.child_count
+  FROM
+  __chunk_post_children s
+  WHERE s.id = uhp.id and s.child_count != uhp.children
+  ;
+
+END
+$BODY$;
@@ -2,6 +2,8 @@ DROP FUNCTION IF EXISTS update_posts_rshares;
 CREATE OR REPLACE FUNCTION update_posts_rshares(
     _first_block hive_blocks.num%TYPE
   , _last_block hive_blocks.num%TYPE
+  , _first_post_id hive_posts.id%TYPE = NULL
+  , _last_post_id hive_posts.id%TYPE = NULL
 )
 RETURNS VOID
 LANGUAGE 'plpgsql'
@@ -31,7 +33,8 @@ FROM
               ELSE -1
             END ) as net_votes
     FROM hive_votes hv
-    WHERE EXISTS
+    WHERE ( _first_post_id IS NULL OR hv.post_id BETWEEN _first_post_id AND _last_post_id ) -- optional chunk of posts
+    AND EXISTS
       (
         SELECT NULL
         FROM hive_votes hv2
@@ -129,6 +129,45 @@ END
 $BODY$;
 COMMIT;
 
+START TRANSACTION;
+DO
+$BODY$
+BEGIN
+IF EXISTS(SELECT * FROM hive_db_data_migration WHERE migration = 'Notification cache partitioned fill') THEN
+  RAISE NOTICE 'Performing partitioned notification cache fill...';
+  SET work_mem='2GB';
+  PERFORM update_notification_cache(NULL, NULL, False);
+  DELETE FROM hive_db_data_migration WHERE migration = 'Notification cache partitioned fill';
+ELSE
+  RAISE NOTICE 'Skipping partitioned notification cache fill...';
+END IF;
+
+END
+$BODY$;
+COMMIT;
+
+START TRANSACTION;
+DO
+$BODY$
+BEGIN
+IF EXISTS(SELECT * FROM hive_db_data_migration WHERE migration = 'Reputation data partitioned fill') THEN
+  RAISE NOTICE 'Performing partitioned reputation data fill...';
+  SET work_mem='2GB';
+  PERFORM prepare_reputation_data_partitions( ( SELECT COALESCE( MIN( rd.block_num ), 0 ) FROM hive_reputation_data_old rd ),
+                                              ( SELECT hb.num FROM hive_blocks hb ORDER BY hb.num DESC LIMIT 1 ) );
+  INSERT INTO hive_reputation_data (id, author_id, voter_id, permlink, rshares, block_num)
+  SELECT rd.id, rd.author_id, rd.voter_id, rd.permlink, rd.rshares, rd.block_num
+  FROM hive_reputation_data_old rd;
+  DROP TABLE hive_reputation_data_old;
+  DELETE FROM hive_db_data_migration WHERE migration = 'Reputation data partitioned fill';
+ELSE
+  RAISE NOTICE 'Skipping partitioned reputation data fill...';
+END IF;
+
+END
+$BODY$;
+COMMIT;
+
 
 START TRANSACTION;
 
@@ -473,3 +473,101 @@ CREATE INDEX IF NOT EXISTS hive_posts_parent_id_id_idx ON hive_posts (parent_id,
 --- Drop this view as it was eliminated.
 DROP VIEW IF EXISTS hive_posts_view CASCADE;
 
+
+--- payout_stats_view is now served from delta-maintained tables (filled by payout_stats_rebuild())
+CREATE TABLE IF NOT EXISTS hive_payout_stats
+(
+  community_id INTEGER NOT NULL,
+  author_id INTEGER NOT NULL,
+  payout NUMERIC(14,3) NOT NULL,
+  pending_payout NUMERIC(14,3) NOT NULL,
+  posts INTEGER NOT NULL,
+  CONSTRAINT hive_payout_stats_pk PRIMARY KEY (author_id, community_id)
+);
+
+CREATE TABLE IF NOT EXISTS hive_payout_stats_communities
+(
+  community_id INTEGER NOT NULL,
+  payout NUMERIC(14,3) NOT NULL,
+  pending_payout NUMERIC(14,3) NOT NULL,
+  posts INTEGER NOT NULL,
+  authors INTEGER NOT NULL,
+  CONSTRAINT hive_payout_stats_communities_pkey PRIMARY KEY (community_id)
+);
+
+--- hive_notification_cache is partitioned by block range, so old notifications are removed by dropping whole partitions
+DO $$
+BEGIN
+  IF EXISTS ( SELECT 1 FROM pg_class WHERE relname = 'hive_notification_cache' AND relkind = 'r' ) THEN
+    RAISE NOTICE 'Performing hive_notification_cache upgrade - partitioning by block range';
+    -- id sequence is owned by the old table, so it would be dropped together with it
+    ALTER TABLE hive_notification_cache RENAME TO hive_notification_cache_old;
+    ALTER TABLE hive_notification_cache_old RENAME CONSTRAINT hive_notification_cache_pkey TO hive_notification_cache_old_pkey;
+    DROP INDEX IF EXISTS hive_notification_cache_block_num_idx;
+    DROP INDEX IF EXISTS hive_notification_cache_dst_score_idx;
+
+    CREATE TABLE hive_notification_cache
+    (
+      id BIGINT NOT NULL DEFAULT nextval('hive_notification_cache_id_seq'::regclass),
+      block_num INT NOT NULL,
+      type_id INT NOT NULL,
+      dst INT NULL,
+      src INT NULL,
+      dst_post_id INT NULL,
+      post_id INT NULL,
+      score INT NOT NULL,
+      created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+      community_title VARCHAR(32) NULL,
+      community VARCHAR(16) NULL,
+      payload VARCHAR NULL,
+
+      CONSTRAINT hive_notification_cache_pkey PRIMARY KEY (id, block_num)
+    ) PARTITION BY RANGE (block_num);
+
+    ALTER SEQUENCE hive_notification_cache_id_seq OWNED BY hive_notification_cache.id;
+    -- cache content is rebuilt by runtime migration
+    DROP TABLE hive_notification_cache_old;
+
+    CREATE INDEX IF NOT EXISTS hive_notification_cache_block_num_idx ON hive_notification_cache (block_num);
+    CREATE INDEX IF NOT EXISTS hive_notification_cache_dst_score_idx ON hive_notification_cache (dst, score) WHERE dst IS NOT NULL;
+
+    INSERT INTO hive_db_data_migration VALUES ('Notification cache partitioned fill');
+  ELSE
+    RAISE NOTICE 'hive_notification_cache partitioning skipped';
+  END IF;
+END
+$$;
+
+--- hive_reputation_data is partitioned by block range, so data older than 30 days is removed mostly by dropping whole partitions
+DO $$
+BEGIN
+  IF EXISTS ( SELECT 1 FROM pg_class WHERE relname = 'hive_reputation_data' AND relkind = 'r' ) THEN
+    RAISE NOTICE 'Performing hive_reputation_data upgrade - partitioning by block range';
+    ALTER TABLE hive_reputation_data RENAME TO hive_reputation_data_old;
+    ALTER TABLE hive_reputation_data_old RENAME CONSTRAINT hive_reputation_data_pkey TO hive_reputation_data_old_pkey;
+    DROP INDEX IF EXISTS hive_reputation_data_author_permlink_voter_idx;
+    DROP INDEX IF EXISTS hive_reputation_data_block_num_idx;
+
+    CREATE TABLE hive_reputation_data
+    (
+      id INT NOT NULL DEFAULT nextval('hive_reputation_data_id_seq'::regclass),
+      author_id INT NOT NULL,
+      voter_id INT NOT NULL,
+      permlink VARCHAR(255) COLLATE "C" NOT NULL,
+      rshares BIGINT NOT NULL,
+      block_num INT NOT NULL,
+
+      CONSTRAINT hive_reputation_data_pkey PRIMARY KEY (id, block_num)
+    ) PARTITION BY RANGE (block_num);
+
+    ALTER SEQUENCE hive_reputation_data_id_seq OWNED BY hive_reputation_data.id;
+
+    CREATE INDEX IF NOT EXISTS hive_reputation_data_author_permlink_voter_idx ON hive_reputation_data (author_id, permlink, voter_id);
+    CREATE INDEX IF NOT EXISTS hive_reputation_data_block_num_idx ON hive_reputation_data (block_num);
+
+    INSERT INTO hive_db_data_migration VALUES ('Reputation data partitioned fill');
+  ELSE
+    RAISE NOTICE 'hive_reputation_data partitioning skipped';
+  END IF;
+END
+$$;
@@ -183,4 +183,68 @@ BEGIN
     ;
 END
 $function$
-;
\ No newline at end of file
+;
+DROP FUNCTION IF EXISTS prepare_range_partitions
+;
+CREATE OR REPLACE FUNCTION prepare_range_partitions(in _table VARCHAR, in _first_block_num INT, in _last_block_num INT, in _partition_size INT, in _options VARCHAR = NULL)
+RETURNS VOID
+LANGUAGE 'plpgsql'
+VOLATILE
+AS
+$function$
+DECLARE
+  __start INT = ( _first_block_num / _partition_size ) * _partition_size;
+  __partition VARCHAR;
+  __persistence VARCHAR;
+BEGIN
+  -- partitions are named <table>_p<first block>; existing ones are detected without touching (locking) the parent table
+  WHILE __start <= _last_block_num LOOP
+    __partition = _table || '_p' || __start;
+    IF to_regclass( __partition ) IS NULL THEN
+      IF __persistence IS NULL THEN
+        -- new partitions follow LOGGED/UNLOGGED attribute of existing ones (partitioned table itself can't have it)
+        SELECT CASE c.relpersistence WHEN 'u' THEN 'UNLOGGED' ELSE '' END INTO __persistence
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = _table::regclass
+        ORDER BY substring( c.relname FROM '_p([0-9]+)$' )::INT DESC
+        LIMIT 1;
+        __persistence = COALESCE( __persistence, '' );
+      END IF;
+      EXECUTE format( 'CREATE %s TABLE %I PARTITION OF %I FOR VALUES FROM (%s) TO (%s) %s',
+                      __persistence, __partition, _table, __start, __start + _partition_size, COALESCE( 'WITH (' || _options || ')', '' ) );
+    END IF;
+    __start = __start + _partition_size;
+  END LOOP;
+END
+$function$
+;
+
+DROP FUNCTION IF EXISTS drop_range_partitions
+;
+CREATE OR REPLACE FUNCTION drop_range_partitions(in _table VARCHAR, in _limit_block_num INT, in _partition_size INT)
+RETURNS INT
+LANGUAGE 'plpgsql'
+VOLATILE
+AS
+$function$
+DECLARE
+  __partition RECORD;
+  __dropped INT = 0;
+BEGIN
+  -- drops partitions holding only blocks below _limit_block_num (all partitions when NULL)
+  FOR __partition IN
+    SELECT c.relname, substring( c.relname FROM '_p([0-9]+)$' )::INT AS start_block
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = _table::regclass
+  LOOP
+    IF _limit_block_num IS NULL OR __partition.start_block + _partition_size <= _limit_block_num THEN
+      EXECUTE format( 'DROP TABLE %I', __partition.relname );
+      __dropped = __dropped + 1;
+    END IF;
+  END LOOP;
+  RETURN __dropped;
+END
+$function$
+;
@@ -7,6 +7,7 @@ from hive.utils.account import get_profile_str
 
 from hive.indexer.db_adapter_holder import DbAdapterHolder
 from hive.utils.normalize import escape_characters
+from hive.utils.system import estimate_size
 
 log = logging.getLogger(__name__)
 
@@ -28,6 +29,11 @@ class Accounts(DbAdapterHolder):
     # account core methods
     # --------------------
 
+    @classmethod
+    def staged_size(cls):
+        """Number of staged account updates and their approximate size (bytes)."""
+        return (len(cls._updates_data), estimate_size(cls._updates_data))
+
     @classmethod
     def update_op(cls, update_operation, allow_change_posting):
         """Save json_metadata."""
@@ -0,0 +1,149 @@
+"""Offline sync throughput benchmark (`hive bench-sync`).
+
+Runs initial sync of blocks and virtual operations served by mock data
+providers (recorded or synthetic mock data files) instead of hived node,
+into local database, and reports throughput as JSON.
+"""
+
+import logging
+from datetime import datetime
+from time import perf_counter as perf
+import ujson as json
+
+import dateutil.parser
+
+from hive.db.db_state import DbState
+from hive.indexer.accounts import Accounts
+from hive.indexer.blocks import Blocks
+from hive.indexer.community import Community
+from hive.indexer.mock_block_provider import MockBlockProvider
+from hive.indexer.mock_vops_provider import MockVopsProvider
+from hive.indexer.sync import Sync
+from hive.utils.stats import OPStatusManager as OPSM
+from hive.utils.stats import FlushStatusManager as FSM
+from hive.utils.stats import WaitingStatusManager as WSM
+from hive.utils.system import peak_usage_mb
+
+log = logging.getLogger(__name__)
+
+# matches genesis block inserted by schema setup
+GENESIS_BLOCK_ID = '0000000000000000000000000000000000000000'
+GENESIS_BLOCK_TIME = '2016-03-24T16:04:57'
+
+class MockNodeClient:
+    """Stands in for SteemClient, serving only mock blocks and virtual operations.
+
+    Blocks are returned empty, so `BlocksProvider` fills them with pure mock
+    blocks, and virtual ops are added by `MockVopsProvider` just like for
+    real node responses."""
+
+    def __init__(self):
+        self._client = {'default': self}
+
+    def exec(self, method, params, is_batch=False):
+        """Respond to `get_block` call(s) of `BlocksProvider`."""
+        assert method == 'get_block', "mock node does not support %s" % method
+        return [{} for _ in params] if is_batch else {}
+
+    def enum_virtual_ops(self, conf, begin_block, end_block):
+        """Get virtual ops for range of blocks."""
+        # pylint: disable=unused-argument,no-self-use
+        ret = {}
+        MockVopsProvider.add_mock_vops(ret, begin_block, end_block)
+        return ret
+
+    def last_irreversible(self):
+        """Number of the block after last mock block."""
+        # pylint: disable=no-self-use
+        return MockBlockProvider.get_max_block_number() + 1
+
+class BenchSync(Sync):
+    """Initial sync of mock data, measured with sync status managers."""
+
+    def __init__(self, conf):
+        # pylint: disable=super-init-not-called
+        self._conf = conf
+        self._db = conf.db()
+        self._steem = MockNodeClient()
+
+    def fetch_in_processes(self):
+        """Mock node lives in this process only."""
+        return False
+
+    def run(self):
+        """Sync all mock blocks, then write report."""
+        Community.start_block = self._conf.get("community_start_block")
+
+        DbState.initialize()
+        assert DbState.is_initial_sync(), "bench-sync needs database which did not finish initial sync"
+
+        paths = self._conf.get("mock_block_data_path") or []
+        assert paths, "bench-sync needs --mock-block-data-path"
+        for path in paths:
+            self.load_mock_data(path)
+        mock_vops_data_path = self._conf.get("mock_vops_data_path")
+        if mock_vops_data_path:
+            MockVopsProvider.load_block_data(mock_vops_data_path)
+
+        # there are no real blocks - whole chain is made of mocks following genesis
+        MockBlockProvider.last_real_block_num = 0
+        MockBlockProvider.last_real_block_id = GENESIS_BLOCK_ID
+        MockBlockProvider.last_real_block_time = dateutil.parser.isoparse(GENESIS_BLOCK_TIME)
+
+        Accounts.load_ids()
+
+        first_block = Blocks.head_num() + 1
+        last_block = self._steem.last_irreversible() - 1
+        if self._conf.get('test_max_block'):
+            last_block = min(last_block, self._conf.get('test_max_block') - 1)
+        DbState.before_initial_sync(first_block - 1, last_block)
+
+        start = perf()
+        self.initial()
+        sync_time = perf() - start
+
+        finish_time = None
+        if not self._conf.get('test_skip_ais_phase'):
+            start = perf()
+            DbState.finish_initial_sync(Blocks.head_num())
+            finish_time = perf() - start
+
+        report = bench_sync_report(first_block, Blocks.head_num(), sync_time, finish_time)
+        output = self._conf.get('bench_sync_report')
+        if output:
+            with open(output, 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+            log.info("bench-sync report written to %s", output)
+        else:
+            print(json.dumps(report, indent=2))
+
+def bench_sync_report(first_block, last_block, sync_time, finish_time):
+    """Collect sync statistics (global stats of OPSM/FSM/WSM) into JSON-ready dict."""
+    try:
+        from hive.version import VERSION, GIT_REVISION
+    except ImportError:
+        VERSION, GIT_REVISION = None, None
+
+    blocks = max(0, last_block - first_block + 1)
+    operations = {name: dict(count=stat.count, time=stat.time,
+                             per_second=stat.count / sync_time if sync_time else 0.0)
+                  for name, stat in sorted(OPSM.global_stats.items())}
+    total_ops = sum(stat.count for stat in OPSM.global_stats.values())
+
+    return dict(
+        hivemind_version=VERSION,
+        hivemind_git_rev=GIT_REVISION,
+        created_at=datetime.now().isoformat(timespec='seconds'),
+        first_block=first_block,
+        last_block=last_block,
+        blocks=blocks,
+        sync_time=sync_time,
+        blocks_per_second=blocks / sync_time if sync_time else 0.0,
+        operations_per_second=total_ops / sync_time if sync_time else 0.0,
+        operations=operations,
+        op_timing_interval=OPSM.timing_interval,
+        flush={name: dict(time=stat.time, pushed=stat.pushed) for name, stat in sorted(FSM.global_stats.items())},
+        wait={name: stat.time for name, stat in sorted(WSM.global_stats.items())},
+        finish_initial_sync_time=finish_time,
+        peak_rss_mb=peak_usage_mb()
+    )
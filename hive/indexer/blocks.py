@@ -19,6 +19,7 @@ from hive.indexer.notify import Notify
 
 from hive.utils.stats import OPStatusManager as OPSM
 from hive.utils.stats import FlushStatusManager as FSM
+from hive.utils.stats import PrometheusClient, BroadcastObject
 from hive.utils.post_active import update_active_starting_from_posts_on_block
 
 from hive.server.common.payout_stats import PayoutStats
@@ -42,6 +43,19 @@ class Blocks:
     _head_block_date = None
     _current_block_date = None
 
+    # initial sync flushes processed blocks when staged data exceed memory budget (bytes)
+    # or row limit (both checked every BUDGET_CHECK_INTERVAL blocks), or after max blocks
+    BUDGET_CHECK_INTERVAL = 50
+    _memory_budget = 0
+    _max_batch_rows = 0
+    _max_batch_blocks = 1000
+
+    # blocks processed since last flush
+    _batch_blocks = 0
+    _batch_first_block = None
+    _batch_last_num = 0
+    _batch_start = None
+
     _concurrent_flush = [
       ('Posts', Posts.flush, Posts),
       ('PostDataCache', PostDataCache.flush, PostDataCache),
@@ -100,23 +114,78 @@ class Blocks:
         sql = "SELECT head_block_time()"
         return str(DB.query_one(sql) or '')
 
+    @classmethod
+    def configure_batching(cls, memory_budget_mb, max_batch_rows, max_batch_blocks):
+        """Set when initial sync flushes processed blocks (0 disables given limit)."""
+        assert max_batch_blocks > 0, "max batch blocks has to be positive"
+        cls._memory_budget = memory_budget_mb * 1024 * 1024
+        cls._max_batch_rows = max_batch_rows
+        cls._max_batch_blocks = max_batch_blocks
+
+    @classmethod
+    def staged_sizes(cls):
+        """Rows and approximate bytes of data staged by each flushed cache."""
+        return {description: c.staged_size() for (description, _, c) in cls._concurrent_flush}
+
+    @classmethod
+    def _batch_full(cls):
+        """Check if staged data reached limits; size is checked every BUDGET_CHECK_INTERVAL blocks."""
+        if cls._batch_blocks >= cls._max_batch_blocks:
+            return True
+        if not (cls._memory_budget or cls._max_batch_rows) or cls._batch_blocks % cls.BUDGET_CHECK_INTERVAL:
+            return False
+        sizes = cls.staged_sizes().values()
+        if cls._memory_budget and sum(size for (_, size) in sizes) >= cls._memory_budget:
+            return True
+        return bool(cls._max_batch_rows) and sum(rows for (rows, _) in sizes) >= cls._max_batch_rows
+
     @classmethod
     def process_multi(cls, blocks, vops, is_initial_sync):
-        """Batch-process blocks; wrapped in a transaction."""
-        time_start = OPSM.start()
+        """Batch-process blocks; wrapped in a transaction.
 
-        DB.query("START TRANSACTION")
+        In initial sync processed blocks are flushed once staged data reach
+        limits set by `configure_batching`, so a batch can end in the middle
+        of given blocks or span several calls; `flush_pending` flushes the
+        rest. Otherwise all given blocks are flushed at once."""
 
-        last_num = 0
-        first_block = -1
-        try:
-            for block in blocks:
-                if first_block == -1:
-                    first_block = int(block['block_id'][:8], base=16)
-                last_num = cls._process(block, vops)
-        except Exception as e:
-            log.error("exception encountered block %d", last_num + 1)
-            raise e
+        # bodies of posts edited in these blocks are loaded at once instead of one query per patch
+        PostDataCache.prefetch_post_bodies(cls._edited_posts(blocks))
+        # notification cache of live blocks is written from events collected by indexers
+        Notify.collect_events(not is_initial_sync)
+
+        for block in blocks:
+            if cls._batch_blocks == 0:
+                cls._batch_start = OPSM.start()
+                cls._batch_first_block = int(block['block_id'][:8], base=16)
+                DB.query("START TRANSACTION")
+            try:
+                cls._batch_last_num = cls._process(block, vops)
+            except Exception as e:
+                log.error("exception encountered block %d", cls._batch_last_num + 1)
+                raise e
+            cls._batch_blocks += 1
+            if is_initial_sync and cls._batch_full():
+                cls._flush_batch(is_initial_sync)
+
+        if not is_initial_sync:
+            cls.flush_pending(is_initial_sync)
+
+    @classmethod
+    def flush_pending(cls, is_initial_sync):
+        """Flush blocks processed since last flush, if any."""
+        if cls._batch_blocks:
+            cls._flush_batch(is_initial_sync)
+
+    @classmethod
+    def _flush_batch(cls, is_initial_sync):
+        first_block = cls._batch_first_block
+        last_num = cls._batch_last_num
+
+        staged = cls.staged_sizes()
+        log.info("[STAGED] %s", ', '.join("%s: %d rows, %.1fMB" % (description, rows, size / 1024 / 1024)
+                                          for description, (rows, size) in staged.items()))
+        PrometheusClient.broadcast([BroadcastObject('staged_' + description.lower(), size, 'b')
+                                    for description, (_, size) in staged.items()])
 
         # Follows flushing needs to be atomic because recounts are
         # expensive. So is tracking follows at all; hence we track
@@ -131,6 +200,9 @@ class Blocks:
         log.info("#############################################################################")
         flush_time = register_time(flush_time, "Blocks", cls._flush_blocks())
 
+        # concurrent flushes below insert into partitioned tables, so missing partitions have to be ready
+        DB.query_no_return("SELECT prepare_reputation_data_partitions(:first, :last)", first=first_block, last=last_num)
+
         DB.query("COMMIT")
 
         completedThreads = 0
@@ -156,28 +228,50 @@ class Blocks:
 
         assert completedThreads == len(cls._concurrent_flush)
 
-        if (not is_initial_sync) and (first_block > -1):
+        if not is_initial_sync:
             DB.query("START TRANSACTION")
             cls.on_live_blocks_processed( first_block, last_num )
             DB.query("COMMIT")
+        else:
+            # payout stats are rebuilt from scratch once initial sync is finished
+            PayoutStats.discard_changes()
 
-        log.info(f"[PROCESS MULTI] {len(blocks)} blocks in {OPSM.stop(time_start) :.4f}s")
+        log.info(f"[PROCESS MULTI] {cls._batch_blocks} blocks in {OPSM.stop(cls._batch_start) :.4f}s")
+        cls._batch_blocks = 0
+
+    @staticmethod
+    def _edited_posts(blocks):
+        """Author and permlink of posts which bodies are patched by comment operations in given blocks."""
+        posts = set()
+        for block in blocks:
+            for tx in block['transactions']:
+                for operation in tx['operations']:
+                    if operation['type'] == 'comment_operation':
+                        op = operation['value']
+                        if (op['body'] or '').startswith('@@ '):
+                            posts.add((op['author'], op['permlink']))
+        return posts
 
     @staticmethod
     def prepare_vops(comment_payout_ops, vopsList, date, block_num):
         ineffective_deleted_ops = {}
         registered_ops_stats = [ 'author_reward_operation', 'comment_reward_operation', 'effective_comment_vote_operation', 'comment_payout_update_operation', 'ineffective_delete_comment_operation']
 
+        op_counts = OPSM.op_counts
+        interval = OPSM.timing_interval
         for vop in vopsList:
-            start = OPSM.start()
             key = None
 
             op_type = vop['type']
             if op_type not in registered_ops_stats:
                 continue
+            count = op_counts.get(op_type, 0) + 1
+            op_counts[op_type] = count
+            start = perf_counter() if (count - 1) % interval == 0 else None
             op_value = vop['value']
             op_value['block_num'] = block_num
             key = "{}/{}".format(op_value['author'], op_value['permlink'])
+            PayoutStats.author_changed(op_value['author'])
 
             if op_type == 'author_reward_operation':
                 if key not in comment_payout_ops:
@@ -211,8 +305,8 @@ class Blocks:
             elif op_type == 'ineffective_delete_comment_operation':
                 ineffective_deleted_ops[key] = {}
 
-            if op_type in registered_ops_stats:
-                OPSM.op_stats(op_type, OPSM.stop(start))
+            if start is not None:
+                OPSM.op_timed(op_type, start)
 
         return ineffective_deleted_ops
 
@@ -238,10 +332,17 @@ class Blocks:
             ineffective_deleted_ops = Blocks.prepare_vops(Posts.comment_payout_ops, virtual_operations[num], cls._current_block_date, num)
 
         json_ops = []
+        op_counts = OPSM.op_counts
+        interval = OPSM.timing_interval
         for tx_idx, tx in enumerate(block['transactions']):
             for operation in tx['operations']:
-                start = OPSM.start()
                 op_type = operation['type']
+                start = None
+                if op_type != 'custom_json_operation': # counted by CustomOp
+                    count = op_counts.get(op_type, 0) + 1
+                    op_counts[op_type] = count
+                    if (count - 1) % interval == 0:
+                        start = perf_counter()
                 op = operation['value']
 
                 assert 'block_num' not in op
@@ -282,10 +383,12 @@ class Blocks:
                 # post ops
                 elif op_type == 'comment_operation':
                     Posts.comment_op(op, cls._head_block_date)
+                    PayoutStats.author_changed(op['author'])
                 elif op_type == 'delete_comment_operation':
                     key = "{}/{}".format(op['author'], op['permlink'])
                     if ( ineffective_deleted_ops is None ) or ( key not in ineffective_deleted_ops ):
                         Posts.delete_op(op, cls._head_block_date)
+                        PayoutStats.author_changed(op['author'])
                 elif op_type == 'comment_options_operation':
                     Posts.comment_options_op(op)
                 elif op_type == 'vote_operation':
@@ -297,8 +400,8 @@ class Blocks:
                 elif op_type == 'custom_json_operation':
                     json_ops.append(op)
 
-                if op_type != 'custom_json_operation':
-                    OPSM.op_stats(op_type, OPSM.stop(start))
+                if start is not None:
+                    OPSM.op_timed(op_type, start)
 
         # follow/reblog/community ops
         if json_ops:
@@ -435,6 +538,11 @@ class Blocks:
             DB.query("DELETE FROM hive_payments    WHERE block_num = :num", num=num)
             DB.query("DELETE FROM hive_blocks      WHERE num = :num", num=num)
 
+        # removed posts are not tracked by incremental update
+        DB.query_no_return("SELECT payout_stats_rebuild()")
+        PayoutStats.discard_changes()
+        PostDataCache.clear_bodies()
+
         DB.query("COMMIT")
         log.warning("[FORK] recovery complete")
         # TODO: manually re-process here the blocks which were just popped.
@@ -449,19 +557,31 @@ class Blocks:
 
         is_hour_action = last_block % 1200 == 0
 
-        queries = [
+        def execute(queries):
+            for query in queries:
+                time_start = perf_counter()
+                DB.query_no_return(query)
+                log.info("%s executed in: %.4f s", query, perf_counter() - time_start)
+
+        execute([
             "SELECT update_posts_rshares({}, {})".format(first_block, last_block),
             "SELECT update_hive_posts_children_count({}, {})".format(first_block, last_block),
             "SELECT update_hive_posts_root_id({},{})".format(first_block, last_block),
             "SELECT update_hive_posts_api_helper({},{})".format(first_block, last_block),
             "SELECT update_feed_cache({}, {})".format(first_block, last_block),
-            "SELECT update_hive_posts_mentions({}, {})".format(first_block, last_block),
-            "SELECT update_notification_cache({}, {}, {})".format(first_block, last_block, is_hour_action),
+            "SELECT update_hive_posts_mentions({}, {})".format(first_block, last_block)
+        ])
+
+        # notifications are scored by reputation rank from before the update below
+        time_start = perf_counter()
+        events = Notify.flush_cache(first_block, last_block, is_hour_action)
+        log.info("notifications of %d events cached in: %.4f s", events, perf_counter() - time_start)
+
+        execute([
             "SELECT update_follow_count({}, {})".format(first_block, last_block),
             "SELECT update_account_reputations({}, {}, False)".format(first_block, last_block)
-        ]
+        ])
 
-        for query in queries:
-            time_start = perf_counter()
-            DB.query_no_return(query)
-            log.info("%s executed in: %.4f s", query, perf_counter() - time_start)
+        time_start = perf_counter()
+        authors = PayoutStats.flush(DB)
+        log.info("payout stats of %d authors updated in: %.4f s", authors, perf_counter() - time_start)
@@ -9,7 +9,7 @@ import ujson as json
 
 from hive.db.adapter import Db
 from hive.indexer.accounts import Accounts
-from hive.indexer.notify import Notify
+from hive.indexer.notify import Notify, NotifyType
 from hive.server.common.helpers import check_community
 
 log = logging.getLogger(__name__)
@@ -120,6 +120,7 @@ class Community:
         sql = """INSERT INTO hive_communities (id, name, type_id, created_at, block_num)
                         VALUES (:id, :name, :type_id, :date, :block_num)"""
         DB.query(sql, id=_id, name=name, type_id=type_id, date=block_date, block_num=block_num)
+        Notify.stage_event(NotifyType.new_community, _id)
 
         # insert owner
         sql = """INSERT INTO hive_roles (community_id, account_id, role_id, created_at)
@@ -326,6 +327,7 @@ class CommunityOp:
             DB.query("""INSERT INTO hive_subscriptions
                                (account_id, community_id, created_at, block_num)
                         VALUES (:actor_id, :community_id, :date, :block_num)""", **params)
+            Notify.stage_event(NotifyType.subscribe, self.actor_id, self.community_id)
             DB.query("""UPDATE hive_communities
                            SET subscribers = subscribers + 1
                          WHERE id = :community_id""", **params)
@@ -566,7 +568,6 @@ WHERE author_id=:_author AND hpd.permlink=:_permlink
 
     def _flagged(self):
         """Check user's flag status."""
-        from hive.indexer.notify import NotifyType
         sql = """SELECT 1 FROM hive_notifs
                   WHERE community_id = :community_id
                     AND post_id = :post_id
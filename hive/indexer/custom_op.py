@@ -1,6 +1,7 @@
 """Main custom_json op handler."""
 
 import logging
+from time import perf_counter
 
 from funcy.seqs import first, second
 from hive.db.adapter import Db
@@ -36,17 +37,26 @@ def _get_auth(op):
 class CustomOp:
     """Processes custom ops and dispatches updates."""
 
+    # op id -> name under which op is counted in OPSM
+    _op_names = {}
+
     @classmethod
     def process_ops(cls, ops, block_num, block_date):
         """Given a list of operation in block, filter and process them."""
+        op_counts = OPSM.op_counts
+        interval = OPSM.timing_interval
         for op in ops:
-            start = OPSM.start()
-            opName = str(op['id']) + ( '-ignored' if op['id'] not in ['follow', 'community', 'notify', 'reblog'] else '' )
-
             account = _get_auth(op)
             if not account:
                 continue
 
+            op_name = cls._op_names.get(op['id'])
+            if op_name is None:
+                op_name = cls._op_names[op['id']] = str(op['id']) + ( '-ignored' if op['id'] not in ['follow', 'community', 'notify', 'reblog'] else '' )
+            count = op_counts.get(op_name, 0) + 1
+            op_counts[op_name] = count
+            start = perf_counter() if (count - 1) % interval == 0 else None
+
             op_json = load_json_key(op, 'json')
             if op['id'] == 'follow':
                 if block_num < 6000000 and not isinstance(op_json, list):
@@ -61,7 +71,8 @@ class CustomOp:
                     process_json_community_op(account, op_json, block_date, block_num)
             elif op['id'] == 'notify':
                 cls._process_notify(account, op_json, block_date)
-            OPSM.op_stats(opName, OPSM.stop(start))
+            if start is not None:
+                OPSM.op_timed(op_name, start)
 
     @classmethod
     def _process_notify(cls, account, op_json, block_date):
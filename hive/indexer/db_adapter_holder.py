@@ -2,6 +2,8 @@ import logging
 log = logging.getLogger(__name__)
 
 class DbAdapterHolder(object):
+    __slots__ = ()
+
     db = None
 
     _inside_tx = False
@@ -15,6 +17,11 @@ class DbAdapterHolder(object):
         if cls.db is not None:
           cls.db.close()
 
+    @classmethod
+    def staged_size(cls):
+        """Number of rows and approximate size (bytes) of data waiting for flush."""
+        return (0, 0)
+
     @classmethod
     def tx_active(cls):
         return cls._inside_tx
@@ -7,7 +7,9 @@ from funcy.seqs import first
 from hive.indexer.accounts import Accounts
 
 from hive.indexer.db_adapter_holder import DbAdapterHolder
+from hive.indexer.notify import Notify, NotifyType
 from hive.utils.normalize import escape_characters
+from hive.utils.system import estimate_size
 
 
 log = logging.getLogger(__name__)
@@ -29,58 +31,84 @@ class Action(enum.IntEnum):
     Reset_follow_muted_list = 13 # cancel all existing records of Follow_muted type
     Reset_all_lists = 14 # cancel all existing records of ??? types
 
+class FollowItem:
+    """ Staged change of relation between two accounts; 'NULL' marks state/flags to be left as they are in db """
+    # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    __slots__ = ('idx', 'follower', 'following', 'state', 'blacklisted', 'follow_blacklists', 'follow_muted',
+                 'at', 'block_num')
+
+    def __init__(self, idx, follower, following, state, blacklisted, follow_blacklists, follow_muted, at, block_num):
+        # pylint: disable=too-many-arguments
+        self.idx = idx
+        self.follower = follower
+        self.following = following
+        self.state = state
+        self.blacklisted = blacklisted
+        self.follow_blacklists = follow_blacklists
+        self.follow_muted = follow_muted
+        self.at = at
+        self.block_num = block_num
+
 class Follow(DbAdapterHolder):
     """Handles processing of incoming follow ups and flushing to db."""
     
+    # 'follower/following' -> FollowItem
     follow_items_to_flush = dict()
     list_resets_to_flush = []
 
     idx = 0
 
+    @classmethod
+    def staged_size(cls):
+        """Number of staged follows and list resets and their approximate size (bytes)."""
+        return (len(cls.follow_items_to_flush) + len(cls.list_resets_to_flush),
+                estimate_size(cls.follow_items_to_flush) + estimate_size(cls.list_resets_to_flush))
+
     @classmethod
     def _reset_blacklist(cls, data, op):
-        data['idx'] = cls.idx
-        data['blacklisted'] = False
-        data['block_num'] = op['block_num']
+        data.idx = cls.idx
+        data.blacklisted = False
+        data.block_num = op['block_num']
     @classmethod
     def _reset_following_list(cls, data, op):
-        if data['state'] == 1:
-            data['idx'] = cls.idx
-            data['state'] = 0
-            data['block_num'] = op['block_num']
+        if data.state == 1:
+            data.idx = cls.idx
+            data.state = 0
+            data.block_num = op['block_num']
     @classmethod
     def _reset_muted_list(cls, data, op):
-        if data['state'] == 2:
-            data['idx'] = cls.idx
-            data['state'] = 0
-            data['block_num'] = op['block_num']
+        if data.state == 2:
+            data.idx = cls.idx
+            data.state = 0
+            data.block_num = op['block_num']
     @classmethod
     def _reset_follow_blacklist(cls, data, op):
-        data['idx'] = cls.idx
-        data['follow_blacklists'] = False
-        data['block_num'] = op['block_num']
+        data.idx = cls.idx
+        data.follow_blacklists = False
+        data.block_num = op['block_num']
     @classmethod
     def _reset_follow_muted_list(cls, data, op):
-        data['idx'] = cls.idx
-        data['follow_muted'] = False
-        data['block_num'] = op['block_num']
+        data.idx = cls.idx
+        data.follow_muted = False
+        data.block_num = op['block_num']
     @classmethod
     def _reset_all_lists(cls, data, op):
-        data['idx'] = cls.idx
-        data['state'] = 0
-        data['blacklisted'] = False
-        data['follow_blacklists'] = False
-        data['follow_muted'] = False
-        data['block_num'] = op['block_num']
+        data.idx = cls.idx
+        data.state = 0
+        data.blacklisted = False
+        data.follow_blacklists = False
+        data.follow_muted = False
+        data.block_num = op['block_num']
 
     @classmethod
     def _follow_single(cls, follower, following, at, block_num,
                        new_state=None, new_blacklisted=None, new_follow_blacklists=None, new_follow_muted=None):
         # add or update single record in flush cache
         k = '{}/{}'.format(follower, following)
-        if k not in cls.follow_items_to_flush:
+        item = cls.follow_items_to_flush.get(k)
+        if item is None:
             # fresh follow item (note that db might have that pair already)
-            cls.follow_items_to_flush[k] = dict(
+            cls.follow_items_to_flush[k] = FollowItem(
                 idx=cls.idx,
                 follower=follower,
                 following=following,
@@ -93,17 +121,17 @@ class Follow(DbAdapterHolder):
             )
         else:
             # follow item already in cache - just overwrite previous value where applicable
-            cls.follow_items_to_flush[k]['idx'] = cls.idx
+            item.idx = cls.idx
             if new_state is not None:
-                cls.follow_items_to_flush[k]['state'] = new_state
+                item.state = new_state
             if new_blacklisted is not None:
-                cls.follow_items_to_flush[k]['blacklisted'] = new_blacklisted
+                item.blacklisted = new_blacklisted
             if new_follow_blacklists is not None:
-                cls.follow_items_to_flush[k]['follow_blacklists'] = new_follow_blacklists
+                item.follow_blacklists = new_follow_blacklists
             if new_follow_muted is not None:
-                cls.follow_items_to_flush[k]['follow_muted'] = new_follow_muted
+                item.follow_muted = new_follow_muted
             # ABW: at not updated for some reason - will therefore always point at time of first relation between accounts
-            cls.follow_items_to_flush[k]['block_num'] = block_num
+            item.block_num = block_num
         cls.idx += 1
 
     @classmethod
@@ -156,8 +184,8 @@ class Follow(DbAdapterHolder):
             # apply action to existing cached data as well as to database (ABW: with expected frequency of list resetting
             # there is no point in grouping such operations from group of blocks - we can just execute them one by one
             # in order of appearance)
-            for k, data in cls.follow_items_to_flush.items():
-                if data['follower'] == follower:
+            for data in cls.follow_items_to_flush.values():
+                if data.follower == follower:
                     reset_list(data, op)
             if add_null_blacklist or add_null_muted:
                 # since 'null' account can't have its blacklist/mute list, following such list is only used
@@ -170,6 +198,9 @@ class Follow(DbAdapterHolder):
             new_blacklisted = true_false_none(state, Action.Blacklist, Action.Unblacklist)
             new_follow_blacklists = true_false_none(state, Action.Follow_blacklist, Action.Unfollow_blacklist)
             new_follow_muted = true_false_none(state, Action.Follow_muted, Action.Unfollow_muted)
+            if new_state == Action.Blog:
+                # follower is the (validated) account which signed operation
+                Notify.stage_event(NotifyType.follow, account)
             
             for following in op['following']:
                 cls._follow_single(follower, following, op['at'], block_num,
@@ -284,17 +315,17 @@ class Follow(DbAdapterHolder):
             limit = 1000
             count = 0
 
-            for _, follow_item in cls.follow_items_to_flush.items():
+            for follow_item in cls.follow_items_to_flush.values():
                 values.append("({}, {}, {}, '{}'::timestamp, {}::smallint, {}::boolean, {}::boolean, {}::boolean, {})".format(
-                    follow_item['idx'],
-                    follow_item['follower'],
-                    follow_item['following'],
-                    follow_item['at'],
-                    follow_item['state'],
-                    follow_item['blacklisted'],
-                    follow_item['follow_blacklists'],
-                    follow_item['follow_muted'],
-                    follow_item['block_num']))
+                    follow_item.idx,
+                    follow_item.follower,
+                    follow_item.following,
+                    follow_item.at,
+                    follow_item.state,
+                    follow_item.blacklisted,
+                    follow_item.follow_blacklists,
+                    follow_item.follow_muted,
+                    follow_item.block_num))
                 count = count + 1
                 if count >= limit:
                     query = str(sql).format(",".join(values))
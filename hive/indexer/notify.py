@@ -5,6 +5,7 @@ import logging
 from hive.db.adapter import Db
 from hive.indexer.db_adapter_holder import DbAdapterHolder
 from hive.utils.normalize import escape_characters
+from hive.utils.system import estimate_size
 #pylint: disable=too-many-lines,line-too-long
 
 log = logging.getLogger(__name__)
@@ -50,6 +51,16 @@ class Notify(DbAdapterHolder):
     DEFAULT_SCORE = 35
     _notifies = []
 
+    # live sync: keys of events which produce notifications (per type), written directly to
+    # hive_notification_cache once processed blocks are flushed (see flush_cache)
+    _collect_events = False
+    _events = {}
+    _cached_notifies = []
+
+    # there can be lots of instances buffered before flush
+    __slots__ = ('block_num', 'enum', 'score', 'when', 'src_id', 'dst_id', 'post_id', 'community_id',
+                 'payload', '_id')
+
     def __init__(self, block_num, type_id, when=None, src_id=None, dst_id=None, community_id=None,
                  post_id=None, payload=None, score=None, **kwargs):
         """Create a notification."""
@@ -77,6 +88,27 @@ class Notify(DbAdapterHolder):
         # about 90 days before release day
         if block_num > 44300000:
             Notify._notifies.append( self )
+            if Notify._collect_events and community_id:
+                Notify._cached_notifies.append( self )
+
+    @classmethod
+    def staged_size(cls):
+        """Number of staged notifications and their approximate size (bytes)."""
+        return (len(cls._notifies), estimate_size(cls._notifies))
+
+    @classmethod
+    def collect_events(cls, enabled):
+        """Turn on collecting events for notification cache (live sync; initial sync fills the cache at its end)."""
+        cls._collect_events = enabled
+
+    @classmethod
+    def stage_event(cls, enum, *key):
+        """Register event of live block, identified by `key` of its row in indexed table:
+           reply - post id (also used for mentions), vote - voter, author, permlink,
+           follow - follower, reblog - blogger, author, permlink, subscribe - account id, community id,
+           new_community - community id."""
+        if cls._collect_events:
+            cls._events.setdefault(enum, set()).add(key)
 
     @classmethod
     def set_lastread(cls, account, date):
@@ -134,3 +166,123 @@ class Notify(DbAdapterHolder):
             cls.commitTx()
 
         return n
+
+    # SELECTs of notifications made by staged events of given type, matching hive_raw_notifications_view
+    # (restricted to processed blocks); columns are:
+    # block_num, type_id, created_at, src, dst, dst_post_id, post_id, payload, community, community_title[, score]
+    # first ones are scored by rank of src account
+    _RANKED_EVENTS_SQL = {
+        NotifyType.reply: """
+            SELECT hpv.block_num, CASE hpv.depth WHEN 1 THEN 12 ELSE 13 END, hpv.created_at, hpv.author_id, hpv.parent_author_id,
+                   hpv.parent_id, hpv.id, ''::VARCHAR, ''::VARCHAR, ''::VARCHAR
+            FROM (VALUES {}) AS ev(post_id)
+            JOIN hive_posts_pp_view hpv ON hpv.id = ev.post_id
+            WHERE hpv.depth > 0 AND hpv.block_num BETWEEN :first_block AND :last_block
+              AND NOT EXISTS (SELECT NULL FROM hive_follows hf
+                              WHERE hf.follower = hpv.parent_author_id AND hf.following = hpv.author_id AND hf.state = 2)
+            UNION ALL
+            SELECT hm.block_num, 16, hb.created_at, hp.author_id, hm.account_id, hm.post_id, hm.post_id, ''::VARCHAR, ''::VARCHAR, ''::VARCHAR
+            FROM (VALUES {}) AS ev(post_id)
+            JOIN hive_mentions hm ON hm.post_id = ev.post_id
+            JOIN hive_posts hp ON hp.id = hm.post_id
+            JOIN hive_blocks hb ON hb.num = hm.block_num - 1 -- use time of previous block to match head_block_time behavior at given block
+            WHERE hm.block_num BETWEEN :first_block AND :last_block""",
+        NotifyType.follow: """
+            SELECT hf.block_num, 15, hb.created_at, hf.follower, hf.following, 0, 0, ''::VARCHAR, ''::VARCHAR, ''::VARCHAR
+            FROM (VALUES {}) AS ev(follower)
+            JOIN hive_accounts ha ON ha.name = ev.follower
+            JOIN hive_follows hf ON hf.follower = ha.id
+            JOIN hive_blocks hb ON hb.num = hf.block_num - 1 -- use time of previous block to match head_block_time behavior at given block
+            WHERE hf.state = 1 AND hf.block_num BETWEEN :first_block AND :last_block""",
+        NotifyType.reblog: """
+            SELECT hr.block_num, 14, hr.created_at, hr.blogger_id, hp.author_id, hr.post_id, hp.id, ''::VARCHAR, ''::VARCHAR, ''::VARCHAR
+            FROM (VALUES {}) AS ev(blogger, author, permlink)
+            JOIN hive_accounts ha_b ON ha_b.name = ev.blogger
+            JOIN hive_accounts ha ON ha.name = ev.author
+            JOIN hive_permlink_data hpd ON hpd.permlink = ev.permlink
+            JOIN hive_posts hp ON hp.author_id = ha.id AND hp.permlink_id = hpd.id
+            JOIN hive_reblogs hr ON hr.blogger_id = ha_b.id AND hr.post_id = hp.id
+            WHERE hr.block_num BETWEEN :first_block AND :last_block""",
+        NotifyType.subscribe: """
+            SELECT hs.block_num, 11, hs.created_at, hs.account_id, hs.community_id, 0, 0, ''::VARCHAR, hc.name, hc.title
+            FROM (VALUES {}) AS ev(account_id, community_id)
+            JOIN hive_subscriptions hs ON hs.account_id = ev.account_id AND hs.community_id = ev.community_id
+            JOIN hive_communities hc ON hc.id = hs.community_id
+            WHERE hs.block_num BETWEEN :first_block AND :last_block"""
+    }
+    _SCORED_EVENTS_SQL = {
+        NotifyType.vote: """
+            SELECT vn.block_num, 17, vn.created_at, vn.src, vn.dst, vn.post_id, vn.post_id,
+                   CASE
+                     WHEN vn.vote_value < 0.01 THEN ''::VARCHAR
+                     ELSE CAST( to_char(vn.vote_value, '($FM99990.00)') AS VARCHAR )
+                   END, ''::VARCHAR, ''::VARCHAR, vn.score
+            FROM
+            (
+              SELECT hv.block_num, hv.last_update AS created_at, hv.voter_id AS src, hp.author_id AS dst, hp.id AS post_id
+                   , calculate_value_of_vote_on_post(hp.payout + hp.pending_payout, hp.vote_rshares, hv.rshares) AS vote_value
+                   , calculate_notify_vote_score(hp.payout + hp.pending_payout, hp.abs_rshares, hv.rshares) AS score
+              FROM (VALUES {}) AS ev(voter, author, permlink)
+              JOIN hive_accounts ha_v ON ha_v.name = ev.voter
+              JOIN hive_accounts ha_a ON ha_a.name = ev.author
+              JOIN hive_permlink_data hpd ON hpd.permlink = ev.permlink
+              JOIN hive_votes hv ON hv.voter_id = ha_v.id AND hv.author_id = ha_a.id AND hv.permlink_id = hpd.id
+              JOIN hive_posts hp ON hp.id = hv.post_id
+              WHERE hv.rshares >= 10e9 AND hv.block_num BETWEEN :first_block AND :last_block
+                AND hp.block_num > block_before_head('97 days'::interval)
+            ) AS vn
+            WHERE vn.vote_value >= 0.02""",
+        NotifyType.new_community: """
+            SELECT hc.block_num, 1, hc.created_at, 0, hc.id, 0, 0, ''::VARCHAR, hc.name, ''::VARCHAR, 35
+            FROM (VALUES {}) AS ev(id)
+            JOIN hive_communities hc ON hc.id = ev.id
+            WHERE hc.block_num BETWEEN :first_block AND :last_block"""
+    }
+    # persistent notifications (the ones written to hive_notifs) of communities
+    _NOTIFIES_SQL = """
+            SELECT ev.block_num, ev.type_id, ev.created_at, CAST(ev.src_id AS INT), CAST(ev.dst_id AS INT), CAST(ev.post_id AS INT),
+                   CAST(ev.post_id AS INT), CAST(ev.payload AS VARCHAR), hc.name, hc.title, ev.score
+            FROM (VALUES {}) AS ev(block_num, type_id, score, created_at, src_id, dst_id, post_id, community_id, payload)
+            JOIN hive_communities hc ON hc.id = ev.community_id"""
+
+    @staticmethod
+    def _event_values(keys):
+        return ','.join("({})".format(', '.join(escape_characters(value) if isinstance(value, str) else str(value)
+                                                 for value in key))
+                        for key in keys)
+
+    @classmethod
+    def flush_cache(cls, first_block, last_block, prune_old):
+        """Live sync: write notifications made by staged events of processed blocks to hive_notification_cache
+           (instead of evaluating hive_raw_notifications_view for them); has to be called once data of blocks
+           is flushed and posts/mentions are updated. Returns number of staged events."""
+        limit_block = DB.query_one("SELECT prepare_notification_cache(:first_block, :last_block, :prune_old)",
+                                   first_block=first_block, last_block=last_block, prune_old=prune_old)
+
+        ranked = [sql.format(*[cls._event_values(cls._events[enum])] * sql.count('{}'))
+                  for enum, sql in cls._RANKED_EVENTS_SQL.items() if enum in cls._events]
+        scored = [sql.format(cls._event_values(cls._events[enum]))
+                  for enum, sql in cls._SCORED_EVENTS_SQL.items() if enum in cls._events]
+        if cls._cached_notifies:
+            scored.append(cls._NOTIFIES_SQL.format(','.join(notify.to_db_values() for notify in cls._cached_notifies)))
+        if ranked:
+            scored.append("""
+            SELECT notifs.*, harv.score
+            FROM ( {} ) AS notifs(block_num, type_id, created_at, src, dst, dst_post_id, post_id, payload, community, community_title)
+            JOIN hive_accounts_rank_view harv ON harv.id = notifs.src""".format(' UNION ALL '.join(ranked)))
+
+        n = sum(len(keys) for keys in cls._events.values()) + len(cls._cached_notifies)
+        if scored:
+            sql = """
+                INSERT INTO hive_notification_cache
+                (block_num, type_id, created_at, src, dst, dst_post_id, post_id, score, payload, community, community_title)
+                SELECT nv.block_num, nv.type_id, nv.created_at, nv.src, nv.dst, nv.dst_post_id, nv.post_id, nv.score, nv.payload, nv.community, nv.community_title
+                FROM ( {} ) AS nv(block_num, type_id, created_at, src, dst, dst_post_id, post_id, payload, community, community_title, score)
+                WHERE nv.score >= 0 AND nv.src IS DISTINCT FROM nv.dst AND nv.block_num > :limit_block
+                ORDER BY nv.block_num, nv.type_id, nv.created_at, nv.src, nv.dst, nv.dst_post_id, nv.post_id
+                """.format(' UNION ALL '.join(scored))
+            DB.query_no_return(sql, first_block=first_block, last_block=last_block, limit_block=limit_block)
+
+        cls._events.clear()
+        cls._cached_notifies.clear()
+        return n
@@ -1,44 +1,118 @@
 import logging
+import sys
+from collections import OrderedDict
+
 from hive.utils.normalize import escape_characters
 
 from hive.indexer.db_adapter_holder import DbAdapterHolder
 
 log = logging.getLogger(__name__)
 
+# memory limit for bodies of recently written/edited posts kept between flushes
+BODY_CACHE_BYTES = 64 * 1024 * 1024
+
 class PostDataCache(DbAdapterHolder):
     """ Procides cache for DB operations on post data table in order to speed up initial sync """
     _data = {}
+    _data_bytes = 0
 
+    # post id -> body (as stored in hive_post_data), least recently used first
+    _bodies = OrderedDict()
+    _bodies_bytes = 0
 
     @classmethod
     def is_cached(cls, pid):
         """ Check if data is cached """
         return pid in cls._data
 
+    @staticmethod
+    def _entry_size(data):
+        return sys.getsizeof(data) + sum(map(sys.getsizeof, data.values()))
+
+    @classmethod
+    def staged_size(cls):
+        """ Number of staged posts data and their approximate size (bytes), tracked as they are added """
+        return (len(cls._data), cls._data_bytes)
+
     @classmethod
     def add_data(cls, pid, post_data, is_new_post):
         """ Add data to cache """
         if not cls.is_cached(pid):
             cls._data[pid] = post_data
             cls._data[pid]['is_new_post'] = is_new_post
+            cls._data_bytes += cls._entry_size(post_data)
         else:
             assert not is_new_post
+            entry = cls._data[pid]
+            cls._data_bytes -= cls._entry_size(entry)
             for k, data in post_data.items():
                 if data is not None:
-                    cls._data[pid][k] = data
+                    entry[k] = data
+            cls._data_bytes += cls._entry_size(entry)
+
+    @classmethod
+    def _remember_body(cls, pid, body):
+        """ Put body into bounded LRU, evicting least recently used ones. """
+        old = cls._bodies.pop(pid, None)
+        if old is not None:
+            cls._bodies_bytes -= sys.getsizeof(old)
+        size = sys.getsizeof(body)
+        if size > BODY_CACHE_BYTES:
+            return
+        cls._bodies[pid] = body
+        cls._bodies_bytes += size
+        while cls._bodies_bytes > BODY_CACHE_BYTES:
+            (_, evicted) = cls._bodies.popitem(last=False)
+            cls._bodies_bytes -= sys.getsizeof(evicted)
+
+    @classmethod
+    def clear_bodies(cls):
+        """ Forget remembered bodies (e.g. when posts were removed). """
+        cls._bodies.clear()
+        cls._bodies_bytes = 0
+
+    @classmethod
+    def prefetch_post_bodies(cls, posts):
+        """ Loads with single query bodies of given (author, permlink) posts which are not remembered yet. """
+        if not posts:
+            return 0
+        sql = """
+              SELECT hp.id, hpd.body
+              FROM
+              (
+                SELECT UNNEST( (:authors)::VARCHAR[] ) AS author, UNNEST( (:permlinks)::VARCHAR[] ) AS permlink
+              ) AS t
+              JOIN hive_accounts ha ON ha.name = t.author
+              JOIN hive_permlink_data hpl ON hpl.permlink = t.permlink
+              JOIN hive_posts hp ON hp.author_id = ha.id AND hp.permlink_id = hpl.id AND hp.counter_deleted = 0
+              JOIN hive_post_data hpd ON hpd.id = hp.id
+              """
+        posts = list(posts)
+        rows = cls.db.query_all(sql, authors=[author for (author, _) in posts], permlinks=[permlink for (_, permlink) in posts])
+        for (pid, body) in rows:
+            if pid not in cls._bodies and body is not None:
+                cls._remember_body(pid, body)
+        return len(rows)
 
     @classmethod
     def get_post_body(cls, pid):
-        """ Returns body of given post from collected cache or from underlying DB storage. """
+        """ Returns body of given post from collected cache, remembered bodies or from underlying DB storage. """
         try:
-            post_data = cls._data[pid]
+            return cls._data[pid]['body']
         except KeyError:
-            sql = """
-                  SELECT hpd.body FROM hive_post_data hpd WHERE hpd.id = :post_id;
-                  """
-            row = cls.db.query_row(sql, post_id = pid)
-            post_data = dict(row)
-        return post_data['body']
+            pass
+        body = cls._bodies.get(pid)
+        if body is not None:
+            cls._bodies.move_to_end(pid)
+            return body
+        sql = """
+              SELECT hpd.body FROM hive_post_data hpd WHERE hpd.id = :post_id;
+              """
+        row = cls.db.query_row(sql, post_id = pid)
+        body = dict(row)['body']
+        if body is not None:
+            cls._remember_body(pid, body)
+        return body
 
     @classmethod
     def flush(cls, print_query = False):
@@ -100,6 +174,12 @@ class PostDataCache(DbAdapterHolder):
 
             cls.commitTx()
 
+        # written bodies are the current ones, so next edits of the same posts don't need to read them back
+        for pid, data in cls._data.items():
+            if data['body'] is not None:
+                cls._remember_body(pid, data['body'])
+
         n = len(cls._data.keys())
         cls._data.clear()
+        cls._data_bytes = 0
         return n
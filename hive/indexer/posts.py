@@ -12,10 +12,11 @@ from hive.db.db_state import DbState
 
 from hive.indexer.reblog import Reblog
 from hive.indexer.community import Community
-from hive.indexer.notify import Notify
+from hive.indexer.notify import Notify, NotifyType
 from hive.indexer.post_data_cache import PostDataCache
 from hive.indexer.db_adapter_holder import DbAdapterHolder
 from hive.utils.misc import chunks
+from hive.utils.system import estimate_size
 
 from hive.utils.normalize import sbd_amount, legacy_amount, safe_img_url, escape_characters
 
@@ -33,6 +34,11 @@ class Posts(DbAdapterHolder):
     comment_payout_ops = {}
     _comment_payout_ops = []
 
+    @classmethod
+    def staged_size(cls):
+        """Number of posts with staged payout ops and their approximate size (bytes)."""
+        return (len(cls.comment_payout_ops), estimate_size(cls.comment_payout_ops))
+
     @classmethod
     def last_id(cls):
         """Get the last indexed post id."""
@@ -111,6 +117,7 @@ class Posts(DbAdapterHolder):
 
 #        log.info("Adding author: {}  permlink: {}".format(op['author'], op['permlink']))
         PostDataCache.add_data(result['id'], post_data, is_new_post)
+        Notify.stage_event(NotifyType.reply, result['id'])
 
         if not DbState.is_initial_sync():
             if error:
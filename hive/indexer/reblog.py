@@ -6,15 +6,23 @@ from hive.db.adapter import Db
 
 from hive.indexer.accounts import Accounts
 from hive.indexer.db_adapter_holder import DbAdapterHolder
+from hive.indexer.notify import Notify, NotifyType
 from hive.utils.normalize import escape_characters
+from hive.utils.system import estimate_size
 
 log = logging.getLogger(__name__)
 DB = Db.instance()
 
 class Reblog(DbAdapterHolder):
     """ Class for reblog operations """
+    # "author/permlink/account" -> (account, author, permlink, block_date, block_num)
     reblog_items_to_flush = {}
 
+    @classmethod
+    def staged_size(cls):
+        """ Number of staged reblogs and their approximate size (bytes) """
+        return (len(cls.reblog_items_to_flush), estimate_size(cls.reblog_items_to_flush))
+
     @classmethod
     def _validated_op(cls, actor, op, block_date, block_num):
         if 'account' not in op or \
@@ -53,7 +61,8 @@ class Reblog(DbAdapterHolder):
                 del cls.reblog_items_to_flush[key]
             cls.delete( op['author'], op['permlink'], op['account'] )
         else:
-            cls.reblog_items_to_flush[key] = { 'op': op }
+            cls.reblog_items_to_flush[key] = (op['account'], op['author'], op['permlink'], op['block_date'], op['block_num'])
+            Notify.stage_event(NotifyType.reblog, op['account'], op['author'], op['permlink'])
 
     @classmethod
     def delete(cls, author, permlink, account ):
@@ -94,25 +103,24 @@ class Reblog(DbAdapterHolder):
             limit = 1000
             count = 0
             cls.beginTx()
-            for k, v in cls.reblog_items_to_flush.items():
-                reblog_item = v['op']
+            for (account, author, permlink, block_date, block_num) in cls.reblog_items_to_flush.values():
                 if count < limit:
-                    values.append("({}, {}, {}, '{}'::timestamp, {})".format(escape_characters(reblog_item['account']),
-                                                                                escape_characters(reblog_item['author']),
-                                                                                escape_characters(reblog_item['permlink']),
-                                                                                reblog_item['block_date'],
-                                                                                reblog_item['block_num']))
+                    values.append("({}, {}, {}, '{}'::timestamp, {})".format(escape_characters(account),
+                                                                                escape_characters(author),
+                                                                                escape_characters(permlink),
+                                                                                block_date,
+                                                                                block_num))
                     count = count + 1
                 else:
                     values_str = ",".join(values)
                     query = sql_prefix.format(values_str, values_str)
                     cls.db.query(query)
                     values.clear()
-                    values.append("({}, {}, {}, '{}'::timestamp, {})".format(escape_characters(reblog_item['account']),
-                                                                                escape_characters(reblog_item['author']),
-                                                                                escape_characters(reblog_item['permlink']),
-                                                                                reblog_item['block_date'],
-                                                                                reblog_item['block_num']))
+                    values.append("({}, {}, {}, '{}'::timestamp, {})".format(escape_characters(account),
+                                                                                escape_characters(author),
+                                                                                escape_characters(permlink),
+                                                                                block_date,
+                                                                                block_num))
                     count = 1
 
             if len(values) > 0:
@@ -3,6 +3,7 @@
 import logging
 from hive.indexer.db_adapter_holder import DbAdapterHolder
 from hive.utils.normalize import escape_characters
+from hive.utils.system import estimate_size
 
 log = logging.getLogger(__name__)
 
@@ -12,6 +13,10 @@ class Reputations(DbAdapterHolder):
     _values = []
     _total_values = 0
 
+    @classmethod
+    def staged_size(cls):
+        return (len(cls._values), estimate_size(cls._values))
+
     @classmethod
     def process_vote(self, block_num, effective_vote_op):
         tuple = "('{}', '{}', {}, {}, {})".format(effective_vote_op['author'], effective_vote_op['voter'],
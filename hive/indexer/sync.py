@@ -1,6 +1,7 @@
 """Hive sync manager."""
 
 import logging
+import sys
 from time import perf_counter as perf
 import ujson as json
 
@@ -30,13 +31,14 @@ from hive.utils.stats import PrometheusClient as PC
 from hive.utils.stats import BroadcastObject
 from hive.utils.communities_rank import update_communities_posts_and_rank
 from hive.utils.misc import show_app_version, log_memory_usage
+from hive.utils.profiler import SamplingProfiler
 
 from hive.indexer.mock_block_provider import MockBlockProvider
 from hive.indexer.mock_vops_provider import MockVopsProvider
 
 from datetime import datetime
 
-from signal import signal, SIGINT, SIGTERM, getsignal
+from signal import signal, SIGINT, SIGTERM, SIGUSR2, getsignal
 from atomic import AtomicLong
 from threading import Thread
 from collections import deque
@@ -94,7 +96,7 @@ def _block_consumer(blocks_data_provider, is_initial_sync, lbound, ubound):
     num = 0
     time_start = OPSM.start()
     rate = {}
-    LIMIT_FOR_PROCESSED_BLOCKS = 1000;
+    LIMIT_FOR_PROCESSED_BLOCKS = 1000; # taken from provider at once; flushes depend on Blocks batching limits
 
     rate = minmax(rate, 0, 1.0, 0)
 
@@ -166,6 +168,10 @@ def _block_consumer(blocks_data_provider, is_initial_sync, lbound, ubound):
 
             if not can_continue_thread():
                 break
+
+        # last batch may not have reached limits of staged data
+        Blocks.flush_pending(is_initial_sync)
+        FSM.next_blocks()
     except Exception:
         log.exception("Exception caught during processing blocks...")
         set_exception_thrown()
@@ -179,16 +185,31 @@ def _node_data_provider(self, is_initial_sync, lbound, ubound, chunk_size):
     blocksQueue = queue.Queue(maxsize=10000)
     vopsQueue = queue.Queue(maxsize=10000)
 
-    massive_blocks_data_provier = MassiveBlocksDataProvider(
-          self._conf
-        , self._steem
-        , self._conf.get( 'max_workers' )
-        , self._conf.get( 'max_workers' )
-        , self._conf.get( 'max_batch' )
-        , lbound
-        , ubound
-        , can_continue_thread
-    )
+    if self.fetch_in_processes():
+        # needs multiprocessing.shared_memory (Python 3.8+), so it is imported only when used
+        from hive.steem.process_blocks_data_provider import ProcessBlocksDataProvider
+        massive_blocks_data_provier = ProcessBlocksDataProvider(
+              self._conf
+            , self._conf.steem_args()
+            , self._conf.get( 'max_workers' )
+            , self._conf.get( 'max_workers' )
+            , self._conf.get( 'max_batch' )
+            , lbound
+            , ubound
+            , can_continue_thread
+            , self._conf.get( 'sync_fetch_buffer_mb' )
+        )
+    else:
+        massive_blocks_data_provier = MassiveBlocksDataProvider(
+              self._conf
+            , self._steem
+            , self._conf.get( 'max_workers' )
+            , self._conf.get( 'max_workers' )
+            , self._conf.get( 'max_batch' )
+            , lbound
+            , ubound
+            , can_continue_thread
+        )
     with ThreadPoolExecutor(max_workers = 4) as pool:
         block_data_provider_future = pool.submit(_blocks_data_provider, massive_blocks_data_provier)
         blockConsumerFuture = pool.submit(_block_consumer, massive_blocks_data_provier, is_initial_sync, lbound, ubound)
@@ -222,11 +243,20 @@ class Sync:
     def __enter__(self):
         assert self._db, "The database must exist"
         Blocks.setup_own_db_access(self._db)
+        Blocks.configure_batching(self._conf.get('sync_memory_budget_mb'), self._conf.get('sync_max_batch_rows'),
+                                  self._conf.get('sync_max_batch_blocks'))
         return self
 
     def __exit__(self, exc_type, value, traceback):
         Blocks.close_own_db_access()
 
+    def fetch_in_processes(self):
+        """Check if blocks are to be fetched by worker processes (see ProcessBlocksDataProvider)."""
+        if not self._conf.get('sync_fetch_processes'):
+            return False
+        assert sys.version_info >= (3, 8), "--sync-fetch-processes needs Python 3.8 or newer (multiprocessing.shared_memory)"
+        return True
+
     def load_mock_data(self,mock_block_data_path):
         if mock_block_data_path:
             MockBlockProvider.load_block_data(mock_block_data_path)
@@ -236,10 +266,11 @@ class Sync:
         # normally it should be refreshed in various time windows
         # but we need the ability to do it all at the same time
         self._update_chain_state()
-        update_communities_posts_and_rank(self._db)
         with ThreadPoolExecutor(max_workers=2) as executor:
             executor.submit(PayoutStats.generate)
             executor.submit(Mentions.refresh)
+        # community rank depends on payout stats
+        update_communities_posts_and_rank(self._db)
 
     def run(self):
         """Initialize state; setup/recovery checks; sync and runloop."""
@@ -266,6 +297,11 @@ class Sync:
 
         set_handlers()
 
+        if self._conf.get('sampling_profiler'):
+            # `kill -USR2 <pid>` starts profiling, next one stops it and saves results
+            SamplingProfiler(self._conf.get('sampling_profiler_interval_ms') / 1000).toggle_on_signal(
+                SIGUSR2, self._conf.get('sampling_profiler_format'))
+
         Community.start_block = self._conf.get("community_start_block")
 
         # ensure db schema up to date, check app status
@@ -285,7 +321,9 @@ class Sync:
         # prefetch id->name and id->rank memory maps
         Accounts.load_ids()
 
-        # community stats
+        # community stats (payout stats tables are rebuilt first, since
+        # incremental updates are not applied outside of live sync)
+        PayoutStats.generate(self._db)
         update_communities_posts_and_rank(self._db)
 
         last_imported_block = Blocks.head_num()
@@ -326,7 +364,6 @@ class Sync:
         assert trail_blocks >= 0
         assert trail_blocks <= 100
 
-        import sys
         max_block_limit = sys.maxsize
         do_stale_block_check = True
         if self._conf.get('test_max_block'):
@@ -472,10 +509,7 @@ class Sync:
                 log.warning("head block %d @ %s", num, block['timestamp'])
                 log.info("[LIVE SYNC] hourly stats")
 
-                log.info("[LIVE SYNC] filling payout_stats_view executed")
-                with ThreadPoolExecutor(max_workers=2) as executor:
-                    executor.submit(PayoutStats.generate)
-                    executor.submit(Mentions.refresh)
+                Mentions.refresh()
             if num % 200 == 0: #10min
                 update_communities_posts_and_rank(self._db)
             if num % 20 == 0: #1min
@@ -1,19 +1,46 @@
 """ Votes indexing and processing """
 
 import logging
-import collections
+import sys
 
 from hive.indexer.db_adapter_holder import DbAdapterHolder
+from hive.indexer.notify import Notify, NotifyType
 from hive.utils.normalize import escape_characters
+from hive.utils.system import estimate_size
 
 log = logging.getLogger(__name__)
 
+class VoteData:
+    """ Staged vote (compact record; there can be hundreds of thousands of them in a batch) """
+    __slots__ = ('voter', 'author', 'permlink', 'vote_percent', 'weight', 'rshares', 'last_update',
+                 'is_effective', 'num_changes', 'block_num')
+
+    def __init__(self, voter, author, permlink, vote_percent, weight, rshares, last_update, is_effective, block_num):
+        self.voter = voter
+        self.author = author
+        self.permlink = permlink
+        self.vote_percent = vote_percent
+        self.weight = weight
+        self.rshares = rshares
+        self.last_update = last_update
+        self.is_effective = is_effective
+        self.num_changes = 0
+        self.block_num = block_num
+
 class Votes(DbAdapterHolder):
     """ Class for managing posts votes """
-    _votes_data = collections.OrderedDict()
+    # "voter/author/permlink" -> VoteData, in order of appearance; account names are interned since
+    # the same accounts vote/are voted on many times in a batch (string keys, unlike tuples, are not
+    # tracked by garbage collector)
+    _votes_data = {}
 
     inside_flush = False
 
+    @classmethod
+    def staged_size(cls):
+        """ Number of staged votes and their approximate size (bytes) """
+        return (len(cls._votes_data), estimate_size(cls._votes_data))
+
     @classmethod
     def vote_op(cls, vote_operation, date):
         """ Process vote_operation """
@@ -28,46 +55,48 @@ class Votes(DbAdapterHolder):
             raise RuntimeError("Fatal error")
 
         key = "{}/{}/{}".format(voter, author, permlink)
+        vote = cls._votes_data.get(key)
+        Notify.stage_event(NotifyType.vote, voter, author, permlink)
 
-        if key in cls._votes_data:
-            cls._votes_data[key]["vote_percent"] = weight
-            cls._votes_data[key]["last_update"] = date
+        if vote is not None:
+            vote.vote_percent = weight
+            vote.last_update = date
             # only effective vote edits increase num_changes counter
         else:
-            cls._votes_data[key] = dict(voter=voter,
-                                        author=author,
-                                        permlink=escape_characters(permlink),
-                                        vote_percent=weight,
-                                        weight=0,
-                                        rshares=0,
-                                        last_update=date,
-                                        is_effective=False,
-                                        num_changes=0,
-                                        block_num=block_num)
+            cls._votes_data[key] = VoteData(voter=sys.intern(voter),
+                                            author=sys.intern(author),
+                                            permlink=escape_characters(permlink),
+                                            vote_percent=weight,
+                                            weight=0,
+                                            rshares=0,
+                                            last_update=date,
+                                            is_effective=False,
+                                            block_num=block_num)
 
     @classmethod
     def effective_comment_vote_op(cls, vop):
         """ Process effective_comment_vote_operation """
 
         key = "{}/{}/{}".format(vop['voter'], vop['author'], vop['permlink'])
-
-        if key in cls._votes_data:
-            cls._votes_data[key]["weight"]       = vop["weight"]
-            cls._votes_data[key]["rshares"]      = vop["rshares"]
-            cls._votes_data[key]["is_effective"] = True
-            cls._votes_data[key]["num_changes"] += 1
-            cls._votes_data[key]["block_num"]    = vop["block_num"]
+        vote = cls._votes_data.get(key)
+        Notify.stage_event(NotifyType.vote, vop['voter'], vop['author'], vop['permlink'])
+
+        if vote is not None:
+            vote.weight       = vop["weight"]
+            vote.rshares      = vop["rshares"]
+            vote.is_effective = True
+            vote.num_changes += 1
+            vote.block_num    = vop["block_num"]
         else:
-            cls._votes_data[key] = dict(voter=vop["voter"],
-                                        author=vop["author"],
-                                        permlink=escape_characters(vop["permlink"]),
-                                        vote_percent=0,
-                                        weight=vop["weight"],
-                                        rshares=vop["rshares"],
-                                        last_update="1970-01-01 00:00:00",
-                                        is_effective=True,
-                                        num_changes=0,
-                                        block_num=vop["block_num"])
+            cls._votes_data[key] = VoteData(voter=sys.intern(vop["voter"]),
+                                            author=sys.intern(vop["author"]),
+                                            permlink=escape_characters(vop["permlink"]),
+                                            vote_percent=0,
+                                            weight=vop["weight"],
+                                            rshares=vop["rshares"],
+                                            last_update="1970-01-01 00:00:00",
+                                            is_effective=True,
+                                            block_num=vop["block_num"])
     @classmethod
     def flush(cls):
         """ Flush vote data from cache to database """
@@ -111,11 +140,11 @@ class Votes(DbAdapterHolder):
             values = []
             values_limit = 1000
 
-            for _, vd in cls._votes_data.items():
+            for vd in cls._votes_data.values():
                 values.append("({}, '{}', '{}', {}, {}, {}, {}, '{}'::timestamp, {}, {}, {})".format(
                     len(values), # for ordering
-                    vd['voter'], vd['author'], vd['permlink'], vd['weight'], vd['rshares'],
-                    vd['vote_percent'], vd['last_update'], vd['num_changes'], vd['block_num'], vd['is_effective']))
+                    vd.voter, vd.author, vd.permlink, vd.weight, vd.rshares,
+                    vd.vote_percent, vd.last_update, vd.num_changes, vd.block_num, vd.is_effective))
 
                 if len(values) >= values_limit:
                     values_str = ','.join(values)
@@ -0,0 +1,128 @@
+"""Concurrent execution of JSON-RPC batch requests."""
+
+import asyncio
+import logging
+
+import simplejson
+
+from jsonrpcserver import async_dispatch as dispatch
+
+log = logging.getLogger(__name__)
+
+# JSON-RPC 2.0 reserved code for malformed requests
+INVALID_REQUEST_CODE = -32600
+
+def is_batch_request(request):
+    """Check if raw request text holds a JSON-RPC batch (array)."""
+    return request.lstrip()[:1] == '['
+
+def batch_call_key(entry):
+    """Canonical key of a batch entry: method plus params.
+
+    Returns None for entries which cannot be safely deduplicated
+    (malformed ones are dispatched separately, so each gets own error).
+    """
+    if not isinstance(entry, dict) or not isinstance(entry.get('method'), str):
+        return None
+    params = entry.get('params', [])
+    try:
+        return entry['method'] + ':' + simplejson.dumps(params, sort_keys=True, use_decimal=True)
+    except TypeError:
+        return None
+
+def batch_error(message, data=None):
+    """Build error response used when a batch is rejected as a whole."""
+    return {
+        "jsonrpc": "2.0",
+        "error": {
+            "code": INVALID_REQUEST_CODE,
+            "message": message,
+            "data": data
+        },
+        "id": None
+    }
+
+class BatchDispatcher:
+    """Dispatches entries of a batch concurrently.
+
+    Entries are executed with `asyncio.gather`, but no more than
+    `concurrency` of them at once, so a single big batch cannot drain
+    the whole DB pool. Identical calls (same method and params) are
+    executed only once and their result is copied to every entry.
+    """
+
+    def __init__(self, methods, context, max_size, concurrency,
+                 serialize=None, deserialize=None):
+        assert max_size > 0, "max batch size has to be positive"
+        assert concurrency > 0, "batch concurrency has to be positive"
+        self._methods = methods
+        self._context = context
+        self._max_size = max_size
+        self._concurrency = concurrency
+        self._serialize = serialize or simplejson.dumps
+        self._deserialize = deserialize or simplejson.loads
+
+    async def _dispatch_single(self, entry):
+        """Run single call through jsonrpcserver; None for notifications."""
+        response = await dispatch(self._serialize(entry), methods=self._methods, debug=True,
+                                  context=self._context, serialize=self._serialize,
+                                  deserialize=self._deserialize)
+        if response is None or not response.wanted:
+            return None
+        return response.deserialized()
+
+    async def dispatch(self, batch):
+        """Execute a decoded batch; returns list of responses or error dict."""
+        if not batch:
+            return batch_error("Invalid Request", "empty batch")
+        if len(batch) > self._max_size:
+            return batch_error("Invalid Request", "batch size %d exceeds limit of %d" % (len(batch), self._max_size))
+
+        # group identical calls; each group is executed only once
+        groups = {}
+        order = []
+        for idx, entry in enumerate(batch):
+            key = batch_call_key(entry)
+            if key is None:
+                key = idx # not deduplicated
+            if key not in groups:
+                groups[key] = []
+                order.append(key)
+            groups[key].append(entry)
+
+        duplicates = len(batch) - len(order)
+        if duplicates:
+            log.debug("batch of %d calls contains %d duplicates", len(batch), duplicates)
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def execute(entries):
+            first = entries[0]
+            if len(entries) > 1:
+                # run as a call (not notification) if any entry expects result
+                wanted = [e for e in entries if 'id' in e]
+                first = dict(first)
+                if wanted:
+                    first['id'] = wanted[0]['id']
+                else:
+                    first.pop('id', None)
+            async with semaphore:
+                return await self._dispatch_single(first)
+
+        results = await asyncio.gather(*[execute(groups[key]) for key in order])
+
+        responses = []
+        for key, result in zip(order, results):
+            if result is None:
+                continue
+            entries = groups[key]
+            if len(entries) == 1:
+                responses.append(result)
+                continue
+            for entry in entries:
+                if 'id' not in entry:
+                    continue
+                response = dict(result)
+                response['id'] = entry['id']
+                responses.append(response)
+        return responses
@@ -1,5 +1,7 @@
 """Bridge API public endpoints for posts"""
 
+import asyncio
+
 from hive.server.bridge_api.objects import load_profiles, _bridge_post_object, append_statistics_to_post
 from hive.server.database_api.methods import find_votes_impl, VotesPresentation
 from hive.server.common.helpers import (
@@ -16,6 +18,7 @@ from hive.utils.account import safe_db_profile_metadata
 from hive.server.hive_api.common import get_account_id
 from hive.server.hive_api.community import list_top_communities
 from hive.server.common.mutes import Mutes
+from hive.server.common.ranked_posts import RankedPosts
 
 #pylint: disable=too-many-arguments, no-else-return
 
@@ -26,10 +29,14 @@ async def get_profile(context, account, observer=None):
     account = valid_account(account)
     observer = valid_account(observer, allow_empty=True)
 
-    ret = await load_profiles(db, [valid_account(account)])
+    # profile and observer lookups are independent
+    if observer:
+        ret, observer_id = await asyncio.gather(load_profiles(db, [account]),
+                                                get_account_id(db, observer))
+    else:
+        ret, observer_id = await load_profiles(db, [account]), None
     assert ret, 'Account \'{}\' does not exist'.format(account) # should not be needed
 
-    observer_id = await get_account_id(db, observer) if observer else None
     if observer_id:
         await _follow_contexts(db, {ret[0]['id']: ret[0]}, observer_id, True)
     return ret[0]
@@ -108,6 +115,8 @@ async def _get_ranked_posts_for_observer_communities( db, sort:str, start_author
 @return_error_info
 async def _get_ranked_posts_for_communities( db, sort:str, community, start_author:str, start_permlink:str, limit, observer:str ):
     async def execute_community_query(db, sql, limit):
+        if sql != pinned_sql and sort in RankedPosts.SORTS:
+            return await RankedPosts.query_all(db, sql, start_author, start_permlink, limit, observer, community=community)
         return await db.query_all(sql, community=community, author=start_author, permlink=start_permlink, limit=limit, observer=observer )
 
     pinned_sql = "SELECT * FROM bridge_get_ranked_post_pinned_for_community( (:community)::VARCHAR, (:author)::VARCHAR, (:permlink)::VARCHAR, (:limit)::SMALLINT, (:observer)::VARCHAR )"
@@ -155,6 +164,8 @@ async def _get_ranked_posts_for_communities( db, sort:str, community, start_auth
 @return_error_info
 async def _get_ranked_posts_for_tag( db, sort:str, tag, start_author:str, start_permlink:str, limit, observer:str ):
     async def execute_tags_query(db, sql):
+        if sort in RankedPosts.SORTS:
+            return await RankedPosts.query_all(db, sql, start_author, start_permlink, limit, observer, tag=tag)
         return await db.query_all(sql, tag=tag, author=start_author, permlink=start_permlink, limit=limit, observer=observer )
 
     if sort == 'hot':
@@ -190,6 +201,8 @@ async def _get_ranked_posts_for_tag( db, sort:str, tag, start_author:str, start_
 @return_error_info
 async def _get_ranked_posts_for_all( db, sort:str, start_author:str, start_permlink:str, limit, observer:str ):
     async def execute_query(db, sql):
+        if sort in RankedPosts.SORTS:
+            return await RankedPosts.query_all(db, sql, start_author, start_permlink, limit, observer)
         return await db.query_all(sql, author=start_author, permlink=start_permlink, limit=limit, observer=observer )
 
     if sort == 'trending':
@@ -0,0 +1,96 @@
+"""Single-flight coalescing of identical concurrent API calls."""
+
+import asyncio
+import logging
+from functools import wraps
+from inspect import isawaitable, signature
+
+import simplejson
+
+from hive.utils.stats import PrometheusClient, BroadcastObject
+
+log = logging.getLogger(__name__)
+
+class RequestCoalescer:
+    """Shares one execution between identical in-flight API calls.
+
+    Calls are keyed by method name plus canonical (bound, with defaults
+    applied) arguments. While a call is running, later arrivals with the
+    same key await its result instead of issuing their own queries.
+    Since every argument - `observer` included - is part of the key,
+    results are never shared between calls of different observers.
+    """
+
+    # how often (in handled calls) coalesce ratio is reported
+    REPORT_INTERVAL = 10000
+
+    def __init__(self):
+        self._in_flight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def call_key(name, sig, args, kwargs):
+        """Canonical key of a call; None if it can't be determined."""
+        try:
+            bound = sig.bind(*args, **kwargs)
+        except TypeError:
+            return None # let jsonrpcserver report invalid params
+        bound.apply_defaults()
+        params = list(bound.arguments.items())[1:] # skip context
+        try:
+            return name + ':' + simplejson.dumps(params, sort_keys=True, use_decimal=True)
+        except TypeError:
+            return None
+
+    def ratio(self):
+        """Fraction of calls which were served by other call's execution."""
+        return self.coalesced / self.calls if self.calls else 0.0
+
+    def _report(self):
+        log.info("[COALESCE] %d of %d calls coalesced (%.2f%%), %d in flight",
+                 self.coalesced, self.calls, 100 * self.ratio(), len(self._in_flight))
+        PrometheusClient.broadcast([
+            BroadcastObject('api_calls', self.calls, 'b'),
+            BroadcastObject('api_coalesced_calls', self.coalesced, 'b'),
+            BroadcastObject('api_coalesce_ratio', self.ratio(), 'b')])
+
+    def wrap(self, name, method):
+        """Decorate API method; signature is kept for jsonrpcserver validation."""
+        sig = signature(method)
+
+        @wraps(method)
+        async def wrapper(*args, **kwargs):
+            key = self.call_key(name, sig, args, kwargs)
+            if key is None:
+                return await method(*args, **kwargs)
+
+            self.calls += 1
+            if self.calls % self.REPORT_INTERVAL == 0:
+                self._report()
+
+            task = self._in_flight.get(key)
+            if task is None:
+                result = method(*args, **kwargs)
+                if not isawaitable(result):
+                    return result
+                task = asyncio.ensure_future(result)
+                self._in_flight[key] = task
+                task.add_done_callback(lambda t: self._finished(key, t))
+            else:
+                self.coalesced += 1
+            # shielded, so disconnect of one client does not cancel the others
+            return await asyncio.shield(task)
+        return wrapper
+
+    def _finished(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception() # mark as retrieved even when all waiters are gone
+
+    def wrap_methods(self, methods):
+        """Wrap all methods registered in jsonrpcserver `Methods`."""
+        for name, method in list(methods.items.items()):
+            methods.items[name] = self.wrap(name, method)
+        return methods
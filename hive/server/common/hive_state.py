@@ -0,0 +1,60 @@
+"""In-process cache of `hive_state` row (feed price, dgpo)."""
+
+import asyncio
+from time import perf_counter
+
+import ujson as json
+
+class HiveState:
+    """Singleton keeping last read of `hive_state`.
+
+    The row changes at most once per block, so it is refreshed only after
+    a block interval has passed. Concurrent readers share single refresh.
+    """
+
+    # hive block interval [s]
+    BLOCK_INTERVAL = 3
+
+    _state = None
+    _loaded_at = None
+    _refresh = None
+
+    @classmethod
+    async def _load(cls, db):
+        sql = """SELECT (SELECT num FROM hive_blocks ORDER BY num DESC LIMIT 1) AS head_block,
+                        block_num, usd_per_steem, dgpo
+                   FROM hive_state"""
+        row = await db.query_row(sql)
+        return dict(head_block=row['head_block'],
+                    block_num=row['block_num'],
+                    usd_per_steem=row['usd_per_steem'],
+                    dgpo=json.loads(row['dgpo']))
+
+    @classmethod
+    async def get(cls, db):
+        """Return dict with `head_block`, `block_num`, `usd_per_steem` and parsed `dgpo`."""
+        if cls._state is not None and perf_counter() - cls._loaded_at < cls.BLOCK_INTERVAL:
+            return cls._state
+
+        if cls._refresh is None:
+            cls._refresh = asyncio.ensure_future(cls._load(db))
+            cls._refresh.add_done_callback(cls._refreshed)
+        return await asyncio.shield(cls._refresh)
+
+    @classmethod
+    async def head_block(cls, db):
+        """Return number of last block in db (as of last refresh)."""
+        return (await cls.get(db))['head_block']
+
+    @classmethod
+    def _refreshed(cls, future):
+        cls._refresh = None
+        if not future.cancelled() and future.exception() is None:
+            cls._state = future.result()
+            cls._loaded_at = perf_counter()
+
+    @classmethod
+    def clear(cls):
+        """Drop cached state."""
+        cls._state = None
+        cls._loaded_at = None
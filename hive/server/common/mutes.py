@@ -1,7 +1,74 @@
 """List of muted accounts for server process."""
 
+from collections import OrderedDict
+from time import perf_counter
+
+from hive.server.common.hive_state import HiveState
+
 class Mutes:
-    """Singleton tracking muted accounts."""
+    """Singleton tracking muted accounts.
+
+    Resolved blacklists/mute lists are kept in LRU cache per observer. Once
+    head block moves, entries of observers whose follows changed in new
+    blocks (or who follow lists of accounts whose follows changed) are
+    dropped; whole cache is dropped when head block goes back (fork) or
+    after a long break. Callers get copies of cached values.
+    """
+
+    # LRU cache of (kind, observer, args) -> (stored_at, result)
+    CACHE_SIZE = 10000
+    # list metadata is not covered by follows changes, so entries also expire
+    CACHE_MAX_AGE = 600
+    # above this number of new blocks cache is dropped instead of checking changed follows
+    MAX_CHECKED_BLOCKS = 1200
+    _cache = OrderedDict()
+    _checked_block = None
+    _hits = 0
+    _miss = 0
+
+    @classmethod
+    async def _drop_changed(cls, db):
+        """Drop entries invalidated by blocks indexed since last check."""
+        head_block = await HiveState.head_block(db)
+        if head_block == cls._checked_block:
+            return
+        if cls._checked_block is None or not 0 < head_block - cls._checked_block <= cls.MAX_CHECKED_BLOCKS:
+            cls._cache.clear()
+        else:
+            sql = "SELECT * FROM mutes_get_changed_observers( (:after)::INTEGER, (:last)::INTEGER )"
+            observers = set(await db.query_col(sql, after=cls._checked_block, last=head_block))
+            for key in [key for key in cls._cache if key[1] in observers]:
+                del cls._cache[key]
+        cls._checked_block = head_block
+
+    @classmethod
+    async def _cached(cls, key, db, fetch):
+        """Return cached value for key if still valid, otherwise call `fetch`."""
+        await cls._drop_changed(db)
+        entry = cls._cache.get(key)
+        if entry and perf_counter() - entry[0] < cls.CACHE_MAX_AGE:
+            cls._cache.move_to_end(key)
+            cls._hits += 1
+            return entry[1]
+
+        cls._miss += 1
+        result = await fetch()
+        cls._cache[key] = (perf_counter(), result)
+        cls._cache.move_to_end(key)
+        while len(cls._cache) > cls.CACHE_SIZE:
+            cls._cache.popitem(last=False)
+        return result
+
+    @classmethod
+    def cache_stats(cls):
+        """Return (entries, hits, misses) of observer lists cache."""
+        return (len(cls._cache), cls._hits, cls._miss)
+
+    @classmethod
+    def clear_cache(cls):
+        """Drop all cached observer lists."""
+        cls._cache.clear()
+        cls._checked_block = None
 
     @classmethod
     async def get_blacklisted_for_observer(cls, observer, context, flags=1+2+4+8):
@@ -16,20 +83,24 @@ class Mutes:
         if not observer or not context:
             return {}
 
-        blacklisted_users = {}
-
         db = context['db']
-        sql = "SELECT * FROM mutes_get_blacklisted_for_observer( (:observer)::VARCHAR, (:flags)::INTEGER )"
-        sql_result = await db.query_all(sql, observer=observer, flags=flags)
-        for row in sql_result:
-            account_name = row['account']
-            if account_name not in blacklisted_users:
-                blacklisted_users[account_name] = ([], [])
-            if row['is_blacklisted']:
-                blacklisted_users[account_name][0].append(row['source'])
-            else: # muted
-                blacklisted_users[account_name][1].append(row['source'])
-        return blacklisted_users
+
+        async def fetch():
+            blacklisted_users = {}
+            sql = "SELECT * FROM mutes_get_blacklisted_for_observer( (:observer)::VARCHAR, (:flags)::INTEGER )"
+            sql_result = await db.query_all(sql, observer=observer, flags=flags)
+            for row in sql_result:
+                account_name = row['account']
+                if account_name not in blacklisted_users:
+                    blacklisted_users[account_name] = ([], [])
+                if row['is_blacklisted']:
+                    blacklisted_users[account_name][0].append(row['source'])
+                else: # muted
+                    blacklisted_users[account_name][1].append(row['source'])
+            return blacklisted_users
+
+        result = await cls._cached(('blacklisted', observer, flags), db, fetch)
+        return {account: (list(blacklisted), list(muted)) for account, (blacklisted, muted) in result.items()}
 
     @classmethod
     async def get_blacklists_for_observer(cls, observer, context, follow_blacklist = True, follow_muted = True):
@@ -38,5 +109,11 @@ class Mutes:
             return {}
 
         db = context['db']
-        sql = "SELECT * FROM mutes_get_blacklists_for_observer( (:observer)::VARCHAR, (:fb)::BOOLEAN, (:fm)::BOOLEAN )"
-        return await db.query_all(sql, observer=observer, fb=follow_blacklist, fm=follow_muted)
+
+        async def fetch():
+            sql = "SELECT * FROM mutes_get_blacklists_for_observer( (:observer)::VARCHAR, (:fb)::BOOLEAN, (:fm)::BOOLEAN )"
+            rows = await db.query_all(sql, observer=observer, fb=follow_blacklist, fm=follow_muted)
+            return [dict(row) for row in rows]
+
+        result = await cls._cached(('blacklists', observer, follow_blacklist, follow_muted), db, fetch)
+        return [dict(row) for row in result]
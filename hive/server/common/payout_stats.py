@@ -7,11 +7,40 @@ from hive.indexer.db_adapter_holder import DbAdapterHolder
 log = logging.getLogger(__name__)
 
 class PayoutStats(DbAdapterHolder):
+    """Maintains payout stats tables behind payout_stats_view.
+
+    Full rebuild is done by `generate`; during live sync only authors touched
+    by processed operations (new/edited/deleted posts, effective votes, payouts)
+    are recomputed and their difference is applied to community totals.
+    """
+
+    _changed_authors = set()
+
+    @classmethod
+    def generate(cls, db=None):
+        """Re-generate payout stats from scratch (by default using own db access)."""
+
+        log.warning("Rebuilding payout stats")
+
+        (db or cls.db).query_no_return("SELECT payout_stats_rebuild();" )
+        cls._changed_authors.clear()
 
     @classmethod
-    def generate(cls):
-        """Re-generate payout_stats_view."""
+    def author_changed(cls, author):
+        """Mark author whose pending payouts might have changed."""
+        cls._changed_authors.add(author)
 
-        log.warning("Rebuilding payout_stats_view")
+    @classmethod
+    def discard_changes(cls):
+        """Forget collected authors (when stats are going to be rebuilt anyway)."""
+        cls._changed_authors.clear()
 
-        cls.db.query_no_return("REFRESH MATERIALIZED VIEW CONCURRENTLY payout_stats_view;" )
+    @classmethod
+    def flush(cls, db):
+        """Apply changes of collected authors using given db (in its transaction)."""
+        if not cls._changed_authors:
+            return 0
+        authors = list(cls._changed_authors)
+        cls._changed_authors.clear()
+        db.query_no_return("SELECT payout_stats_update_authors( (:authors)::VARCHAR[] )", authors=authors)
+        return len(authors)
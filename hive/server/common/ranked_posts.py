@@ -0,0 +1,133 @@
+"""In-memory top-K cache of ranked post lists (trending/hot/created/promoted)."""
+
+import asyncio
+import logging
+from collections import OrderedDict
+
+from hive.server.common.hive_state import HiveState
+from hive.utils.system import estimate_size
+
+log = logging.getLogger(__name__)
+
+class RankedPosts:
+    """Singleton keeping first `DEPTH` rows of popular rankings.
+
+    Only global and community rankings are cached (tag rankings form a long
+    tail, that would be reloaded every block for few readers). Each one is
+    read once per head block, by first page request with no observer, as
+    single query with no start post and maximal limit. Keyset pages starting
+    at a post within cached rows of current head block are sliced from
+    memory, other requests go straight to database. Calls with observer are
+    never served from cache, since their results depend on observer's
+    blacklists and mutes. Cache is bounded by approximate size of rows.
+    """
+
+    # sorts served from cache
+    SORTS = ('trending', 'hot', 'created', 'promoted')
+    # K - number of top rows kept per ranking (matches max api page size)
+    DEPTH = 100
+    # max approximate size of cached rows (bytes)
+    MAX_BYTES = 64 * 1024 * 1024
+
+    # (sql, params) -> (head_block, rows, size)
+    _rankings = OrderedDict()
+    _size = 0
+    _loading = {}
+    _hits = 0
+    _miss = 0
+
+    @staticmethod
+    def _cacheable(params):
+        """Global ranking or ranking of community (also given as tag)."""
+        return all(not value or name == 'community' or value.startswith('hive-')
+                   for name, value in params.items())
+
+    @classmethod
+    def _store(cls, key, entry):
+        old = cls._rankings.pop(key, None)
+        if old:
+            cls._size -= old[2]
+        cls._rankings[key] = entry
+        cls._size += entry[2]
+        while cls._size > cls.MAX_BYTES and len(cls._rankings) > 1:
+            cls._size -= cls._rankings.popitem(last=False)[1][2]
+
+    @classmethod
+    async def _load(cls, db, key, head_block, params):
+        rows = await db.query_all(key[0], author='', permlink='', limit=cls.DEPTH, observer='', **params)
+        cls._store(key, (head_block, rows, estimate_size(rows)))
+        return rows
+
+    @classmethod
+    async def _ranking(cls, db, key, params):
+        head_block = await HiveState.head_block(db)
+        entry = cls._rankings.get(key)
+        if entry and entry[0] == head_block:
+            cls._rankings.move_to_end(key)
+            return entry[1]
+
+        # single refresh shared by concurrent readers
+        loading = cls._loading.get(key)
+        if loading is None or loading[0] != head_block:
+            future = asyncio.ensure_future(cls._load(db, key, head_block, params))
+            loading = (head_block, future)
+            cls._loading[key] = loading
+            future.add_done_callback(lambda f: cls._loaded(key, f))
+        return await asyncio.shield(loading[1])
+
+    @classmethod
+    def _loaded(cls, key, future):
+        if cls._loading.get(key, (None, None))[1] is future:
+            del cls._loading[key]
+        if not future.cancelled():
+            future.exception() # mark as retrieved; waiters get it re-raised
+
+    @staticmethod
+    def _page(rows, start_author, start_permlink, limit, depth):
+        """Slice page from cached rows; None if it is not fully covered by them."""
+        complete = len(rows) < depth # ranking shorter than cached window
+        first = 0
+        if start_author or start_permlink:
+            for idx, row in enumerate(rows):
+                if row['author'] == start_author and row['permlink'] == start_permlink:
+                    first = idx + 1
+                    break
+            else:
+                return None # start post outside of cached window
+        if first + limit > len(rows) and not complete:
+            return None
+        return rows[first:first + limit]
+
+    @classmethod
+    async def query_all(cls, db, sql, start_author, start_permlink, limit, observer, **params):
+        """Run ranked post query (sql with :author, :permlink, :limit and :observer)
+        serving it from cache when possible."""
+        if not observer and limit <= cls.DEPTH and cls._cacheable(params):
+            key = (sql, tuple(sorted(params.items())))
+            if start_author or start_permlink:
+                # next pages use rows already cached for current head block only
+                entry = cls._rankings.get(key)
+                rows = None
+                if entry and entry[0] == await HiveState.head_block(db):
+                    cls._rankings.move_to_end(key)
+                    rows = entry[1]
+            else:
+                rows = await cls._ranking(db, key, params)
+            page = cls._page(rows, start_author, start_permlink, limit, cls.DEPTH) if rows is not None else None
+            if page is not None:
+                cls._hits += 1
+                return page
+        cls._miss += 1
+        return await db.query_all(sql, author=start_author, permlink=start_permlink,
+                                  limit=limit, observer=observer, **params)
+
+    @classmethod
+    def stats(cls):
+        """Return (rankings, hits, misses) of cache."""
+        return (len(cls._rankings), cls._hits, cls._miss)
+
+    @classmethod
+    def clear(cls):
+        """Drop all cached rankings."""
+        cls._rankings.clear()
+        cls._size = 0
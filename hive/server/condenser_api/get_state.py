@@ -1,13 +1,13 @@
 """Routes then builds a get_state response object"""
 
 #pylint: disable=line-too-long,too-many-lines
+import asyncio
 import logging
 from collections import OrderedDict
-import ujson as json
-from aiocache import cached
 
 from hive.utils.normalize import legacy_amount
 from hive.server.common.mutes import Mutes
+from hive.server.common.hive_state import HiveState
 
 from hive.server.condenser_api.objects import (
     load_accounts,
@@ -92,9 +92,19 @@ async def get_state(context, path: str):
 
     db = context['db']
 
+    # hive_state and path specific data are independent, load concurrently
+    (feed_price, props), state = await asyncio.gather(
+        asyncio.gather(_get_feed_price(db), _get_props_lite(db)),
+        _load_path_state(context, path, part))
+    state['feed_price'] = feed_price
+    state['props'] = props
+    return state
+
+async def _load_path_state(context, path, part):
+    """Load part of get_state response specific to given path."""
+    db = context['db']
+
     state = {
-        'feed_price': await _get_feed_price(db),
-        'props': await _get_props_lite(db),
         'tags': {},
         'accounts': {},
         'content': {},
@@ -110,19 +120,20 @@ async def get_state(context, path: str):
             part[1] = 'blog'
 
         account = valid_account(part[0][1:])
-        state['accounts'][account] = await _load_account(db, account)
 
         if part[1] in ACCOUNT_TAB_KEYS:
             key = ACCOUNT_TAB_KEYS[part[1]]
-            posts = await _get_account_discussion_by_key(db, account, key)
+            state['accounts'][account], posts = await asyncio.gather(
+                _load_account(db, account),
+                _get_account_discussion_by_key(db, account, key))
             state['content'] = _keyed_posts(posts)
             state['accounts'][account][key] = list(state['content'].keys())
-        elif part[1] in ACCOUNT_TAB_IGNORE:
-            pass # condenser no-op URLs
         else:
-            # invalid/undefined case; probably requesting `@user/permlink`,
-            # but condenser still relies on a valid response for redirect.
-            state['error'] = 'invalid get_state account path %s' % path
+            state['accounts'][account] = await _load_account(db, account)
+            if part[1] not in ACCOUNT_TAB_IGNORE: # condenser no-op URLs are fine
+                # invalid/undefined case; probably requesting `@user/permlink`,
+                # but condenser still relies on a valid response for redirect.
+                state['error'] = 'invalid get_state account path %s' % path
 
     # discussion - `/category/@account/permlink`
     elif part[1] and part[1][0] == '@':
@@ -136,10 +147,12 @@ async def get_state(context, path: str):
         assert not part[2], "unexpected discussion path part[2] %s" % path
         sort = valid_sort(part[0])
         tag = valid_tag(part[1].lower(), allow_empty=True)
-        pids = await get_posts_by_given_sort(context, sort, '', '', 20, tag)
+        pids, trending_tags = await asyncio.gather(
+            get_posts_by_given_sort(context, sort, '', '', 20, tag),
+            get_top_trending_tags_summary(context))
         state['content'] = _keyed_posts(pids)
         state['discussion_idx'] = {tag: {sort: list(state['content'].keys())}}
-        state['tag_idx'] = {'trending': await get_top_trending_tags_summary(context)}
+        state['tag_idx'] = {'trending': trending_tags}
 
     # tag "explorer" - `/tags`
     elif part[0] == "tags":
@@ -267,16 +280,14 @@ async def _load_discussion(db, author, permlink, observer=None):
 
     return posts_by_id
 
-@cached(ttl=1800, timeout=1200)
 async def _get_feed_price(db):
     """Get a steemd-style ratio object representing feed price."""
-    price = await db.query_one("SELECT usd_per_steem FROM hive_state")
+    price = (await HiveState.get(db))['usd_per_steem']
     return {"base": "%.3f HBD" % price, "quote": "1.000 HIVE"}
 
-@cached(ttl=1800, timeout=1200)
 async def _get_props_lite(db):
     """Return a minimal version of get_dynamic_global_properties data."""
-    raw = json.loads(await db.query_one("SELECT dgpo FROM hive_state"))
+    raw = dict((await HiveState.get(db))['dgpo'])
 
     # convert NAI amounts to legacy
     nais = ['virtual_supply', 'current_supply', 'current_sbd_supply',
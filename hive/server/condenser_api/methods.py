@@ -15,6 +15,7 @@ from hive.server.common.helpers import (
     valid_truncate,
     valid_follow_type)
 from hive.server.database_api.methods import find_votes_impl, VotesPresentation
+from hive.server.common.ranked_posts import RankedPosts
 
 # pylint: disable=too-many-arguments,line-too-long,too-many-lines
 
@@ -179,9 +180,9 @@ async def get_posts_by_given_sort(context, sort: str, start_author: str = '', st
 
     db = context['db']
 
-    start_author    = valid_account(start_author, allow_empty=True),
-    start_permlink  = valid_permlink(start_permlink, allow_empty=True),
-    limit           = valid_limit(limit, 100, 20),
+    start_author    = valid_account(start_author, allow_empty=True)
+    start_permlink  = valid_permlink(start_permlink, allow_empty=True)
+    limit           = valid_limit(limit, 100, 20)
     tag             = valid_tag(tag, allow_empty=True)
     observer        = valid_account(observer, allow_empty=True)
     truncate_body   = valid_truncate(truncate_body)
@@ -230,7 +231,10 @@ async def get_posts_by_given_sort(context, sort: str, start_author: str = '', st
     else:
       return posts
 
-    sql_result = await db.query_all(sql, tag=tag, author=start_author, permlink=start_permlink, limit=limit, observer=observer )
+    if sort in RankedPosts.SORTS:
+      sql_result = await RankedPosts.query_all(db, sql, start_author, start_permlink, limit, observer, tag=tag)
+    else:
+      sql_result = await db.query_all(sql, tag=tag, author=start_author, permlink=start_permlink, limit=limit, observer=observer )
 
     for row in sql_result:
         post = _condenser_post_object(row, truncate_body)
@@ -1,6 +1,7 @@
 """Async DB adapter for hivemind API."""
 
 import logging
+from functools import partial
 from time import perf_counter as perf
 
 import sqlalchemy
@@ -12,12 +13,30 @@ from hive.utils.stats import Stats
 logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 log = logging.getLogger(__name__)
 
+# names of query methods which can record into trace of API call (see `TracedDb`)
+_TIMED_METHODS = set()
+
 def sqltimer(function):
-    """Decorator for DB query methods which tracks timing."""
-    async def _wrapper(*args, **kwargs):
+    """Decorator for DB query methods which acquires pooled connection
+    and tracks timing (also in `_trace` of API call, if given)."""
+    _TIMED_METHODS.add(function.__name__)
+    async def _wrapper(self, sql, _trace=None, **kwargs):
         start = perf()
-        result = await function(*args, **kwargs)
-        Stats.log_db(args[1], perf() - start)
+        self.waiting += 1
+        try:
+            conn = await self.db.acquire()
+        finally:
+            self.waiting -= 1
+        acquired = perf()
+        try:
+            result = await function(self, conn, sql, **kwargs)
+        finally:
+            await conn.close() # returns connection to the pool
+        secs = perf() - start
+        Stats.log_db(sql, secs)
+        if _trace is not None:
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            _trace.add_query(sql, kwargs, acquired - start, secs, rows)
         return result
     return _wrapper
 
@@ -33,6 +52,7 @@ class Db:
 
     def __init__(self):
         self.db = None
+        self.waiting = 0 # queries waiting for pooled connection
         self._prep_sql = {}
 
     async def init(self, url):
@@ -53,6 +73,10 @@ class Db:
             dsn['application_name'] = 'hive_server'
         self.db = await create_engine(**dsn, maxsize=20, **conf.query)
 
+    def traced(self, trace):
+        """View of this adapter which records queries in `trace` of an API call."""
+        return TracedDb(self, trace)
+
     def close(self):
         """Close pool."""
         self.db.close()
@@ -62,42 +86,49 @@ class Db:
         await self.db.wait_closed()
 
     @sqltimer
-    async def query_all(self, sql, **kwargs):
+    async def query_all(self, conn, sql, **kwargs):
         """Perform a `SELECT n*m`"""
-        async with self.db.acquire() as conn:
-            cur = await self._query(conn, sql, **kwargs)
-            res = await cur.fetchall()
-        return res
+        cur = await self._query(conn, sql, **kwargs)
+        return await cur.fetchall()
 
     @sqltimer
-    async def query_row(self, sql, **kwargs):
+    async def query_row(self, conn, sql, **kwargs):
         """Perform a `SELECT 1*m`"""
-        async with self.db.acquire() as conn:
-            cur = await self._query(conn, sql, **kwargs)
-            res = await cur.first()
-        return res
+        cur = await self._query(conn, sql, **kwargs)
+        return await cur.first()
 
     @sqltimer
-    async def query_col(self, sql, **kwargs):
+    async def query_col(self, conn, sql, **kwargs):
         """Perform a `SELECT n*1`"""
-        async with self.db.acquire() as conn:
-            cur = await self._query(conn, sql, **kwargs)
-            res = await cur.fetchall()
+        cur = await self._query(conn, sql, **kwargs)
+        res = await cur.fetchall()
         return [r[0] for r in res]
 
     @sqltimer
-    async def query_one(self, sql, **kwargs):
+    async def query_one(self, conn, sql, **kwargs):
         """Perform a `SELECT 1*1`"""
-        async with self.db.acquire() as conn:
-            cur = await self._query(conn, sql, **kwargs)
-            row = await cur.first()
+        cur = await self._query(conn, sql, **kwargs)
+        row = await cur.first()
         return row[0] if row else None
 
     @sqltimer
-    async def query(self, sql, **kwargs):
+    async def query(self, conn, sql, **kwargs):
         """Perform a write query"""
+        await self._query(conn, sql, **kwargs)
+
+    async def explain(self, sql, **kwargs):
+        """Get plan of a query with `EXPLAIN (ANALYZE, BUFFERS)`.
+
+        The query is really executed, so it is run in a transaction
+        which is rolled back afterwards."""
         async with self.db.acquire() as conn:
-            await self._query(conn, sql, **kwargs)
+            trx = await conn.begin()
+            try:
+                cur = await self._query(conn, 'EXPLAIN (ANALYZE, BUFFERS) ' + sql, **kwargs)
+                rows = await cur.fetchall()
+            finally:
+                await trx.rollback()
+        return [row[0] for row in rows]
 
     async def _query(self, conn, sql, **kwargs):
         """Send a query off to SQLAlchemy."""
@@ -115,3 +146,17 @@ class Db:
             query = sqlalchemy.text(sql).execution_options(autocommit=False)
             self._prep_sql[sql] = query
         return query
+
+class TracedDb:
+    """`Db` used by single traced API call; pool and all methods are shared,
+    query methods record executed statements in the call's `RequestTrace`."""
+
+    def __init__(self, db, trace):
+        self._db = db
+        self.trace = trace
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        if name in _TIMED_METHODS:
+            return partial(attr, _trace=self.trace)
+        return attr
@@ -0,0 +1,99 @@
+"""Prometheus metrics of the API server."""
+
+import asyncio
+from time import perf_counter as perf
+
+from hive.server.common.mutes import Mutes
+from hive.server.common.ranked_posts import RankedPosts
+from hive.utils.stats import PrometheusClient
+
+def _hit_ratio(stats):
+    """Gauge callback computing hit ratio from (entries, hits, misses)."""
+    def ratio():
+        _, hits, misses = stats()
+        return hits / (hits + misses) if hits + misses else 0.0
+    return ratio
+
+class MethodMetrics:
+    """Metric children of single API method, resolved once at wrap time
+    so calls do not pay for label lookup."""
+    __slots__ = ('calls', 'errors', 'duration', 'db_duration')
+
+    def __init__(self, metrics, name):
+        self.calls = metrics.calls.labels(name)
+        self.errors = metrics.errors.labels(name)
+        self.duration = metrics.duration.labels(name)
+        self.db_duration = metrics.db_duration.labels(name)
+
+    def observe(self, elapsed, db_time, failed):
+        """Account finished call."""
+        self.calls.inc()
+        if failed:
+            self.errors.inc()
+        self.duration.observe(elapsed)
+        self.db_duration.observe(db_time)
+
+class ServerMetrics:
+    """Per-method call counters and latency histograms, DB pool, cache and
+    event loop gauges exported through `PrometheusClient`.
+
+    Counters and histograms are updated in place by `RequestTracer`; pool
+    and cache gauges are computed only when scraped. Event loop lag is
+    measured by a task which oversleeps when the loop is busy.
+    """
+
+    # how often event loop lag is measured (s)
+    LOOP_LAG_INTERVAL = 1.0
+
+    def __init__(self):
+        metric = PrometheusClient.metric
+        self.calls = metric('Counter', 'hivemind_api_requests', 'API calls', ['method'])
+        self.errors = metric('Counter', 'hivemind_api_request_errors', 'API calls which failed', ['method'])
+        self.duration = metric('Histogram', 'hivemind_api_request_duration_seconds', 'API call processing time', ['method'])
+        self.db_duration = metric('Histogram', 'hivemind_api_request_db_seconds',
+                                  'Time spent by API call in database queries (pool wait included)', ['method'])
+        self._loop_lag = metric('Gauge', 'hivemind_api_event_loop_lag_seconds', 'Delay of event loop callbacks')
+        self._lag_task = None
+
+        if self.enabled():
+            caches = metric('Gauge', 'hivemind_api_cache_entries', 'Entries in server caches', ['cache'])
+            ratios = metric('Gauge', 'hivemind_api_cache_hit_ratio', 'Hit ratio of server caches', ['cache'])
+            for name, stats in (('mutes', Mutes.cache_stats), ('ranked_posts', RankedPosts.stats)):
+                caches.labels(name).set_function(lambda stats=stats: stats()[0])
+                ratios.labels(name).set_function(_hit_ratio(stats))
+
+    def enabled(self):
+        """Check if prometheus client runs."""
+        return self.calls is not None
+
+    def method(self, name):
+        """Metrics of API method `name`; None when disabled."""
+        return MethodMetrics(self, name) if self.enabled() else None
+
+    def watch_db(self, db):
+        """Export pool usage of server `Db`."""
+        if not self.enabled():
+            return
+        metric = PrometheusClient.metric
+        metric('Gauge', 'hivemind_api_db_pool_size', 'Maximal number of pooled DB connections').set(db.db.maxsize)
+        metric('Gauge', 'hivemind_api_db_pool_in_use', 'DB connections in use').set_function(
+            lambda: db.db.size - db.db.freesize)
+        metric('Gauge', 'hivemind_api_db_pool_waiting', 'Queries waiting for DB connection').set_function(
+            lambda: db.waiting)
+
+    async def _measure_loop_lag(self):
+        while True:
+            start = perf()
+            await asyncio.sleep(self.LOOP_LAG_INTERVAL)
+            self._loop_lag.set(max(0.0, perf() - start - self.LOOP_LAG_INTERVAL))
+
+    def start(self):
+        """Start measuring event loop lag (call from running loop)."""
+        if self.enabled() and self._lag_task is None:
+            self._lag_task = asyncio.ensure_future(self._measure_loop_lag())
+
+    def stop(self):
+        """Stop measuring event loop lag."""
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
@@ -0,0 +1,149 @@
+"""Per-request SQL tracing and slow request diagnostics."""
+
+import asyncio
+import logging
+from functools import wraps
+from inspect import isawaitable
+from time import perf_counter as perf
+
+log = logging.getLogger(__name__)
+
+class QueryTrace:
+    """Single statement executed on behalf of traced request."""
+    __slots__ = ('sql', 'params', 'wait', 'secs', 'rows')
+
+    def __init__(self, sql, params, wait, secs, rows):
+        self.sql = sql
+        self.params = params
+        self.wait = wait
+        self.secs = secs
+        self.rows = rows
+
+class RequestTrace:
+    """Statements executed (with timings) during single JSON-RPC call.
+
+    Passed to API method in its context, as `db` which records into
+    it (see `Db.traced`), so concurrent queries of one call are
+    recorded as well.
+    """
+    __slots__ = ('method', 'params', 'start', 'queries')
+
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.start = perf()
+        self.queries = []
+
+    def add_query(self, sql, params, wait, secs, rows):
+        """Record executed statement; `secs` includes pool `wait`."""
+        self.queries.append(QueryTrace(sql, params, wait, secs, rows))
+
+    def db_time(self):
+        """Total time spent in queries (pool wait included)."""
+        return sum(query.secs for query in self.queries)
+
+    def wait_time(self):
+        """Total time spent waiting for pooled connections."""
+        return sum(query.wait for query in self.queries)
+
+    def slowest(self):
+        """Longest executed query (pool wait excluded); None if there were no queries."""
+        return max(self.queries, key=lambda query: query.secs - query.wait, default=None)
+
+    def breakdown(self, elapsed):
+        """Multiline description of the call for slow request log."""
+        lines = ["[SLOW-REQUEST][%dms] %s%s -- db %dms (pool wait %dms) in %d queries" % (
+            elapsed * 1000, self.method, str(self.params)[:1024], self.db_time() * 1000,
+            self.wait_time() * 1000, len(self.queries))]
+        for query in sorted(self.queries, key=lambda query: query.secs, reverse=True):
+            lines.append("  [%dms][wait %dms][%d rows] %s" % (
+                query.secs * 1000, query.wait * 1000, query.rows, ' '.join(query.sql.split())[:250]))
+        return '\n'.join(lines)
+
+class RequestTracer:
+    """Traces API calls: logs slow ones and reports per-method timings.
+
+    Calls which took longer than `slow_ms` are logged with statements
+    they executed. With `explain` on, the slowest statement of such call
+    is run again with `EXPLAIN (ANALYZE, BUFFERS)` in the background and
+    its plan is logged. Every call is also accounted in per-method
+    `ServerMetrics`, when enabled.
+    """
+
+    # same statement is explained again no sooner than after (s)
+    EXPLAIN_INTERVAL = 600
+
+    def __init__(self, slow_ms, explain, metrics):
+        self._slow_secs = slow_ms / 1000 if slow_ms else None
+        self._explain = explain
+        self._explaining = False
+        self._explained = {}
+        self._metrics = metrics
+
+    def enabled(self):
+        """Check if tracing has anything to report to."""
+        return self._slow_secs is not None or self._metrics.enabled()
+
+    def wrap(self, name, method):
+        """Decorate API method; signature is kept for jsonrpcserver validation."""
+        metrics = self._metrics.method(name)
+
+        @wraps(method)
+        async def wrapper(*args, **kwargs):
+            trace = RequestTrace(name, args[1:] or kwargs)
+            context = args[0] if args else None
+            if context is not None:
+                # call gets own copy of context, with db recording into its trace
+                args = (dict(context, db=context['db'].traced(trace)),) + args[1:]
+            failed = True
+            try:
+                result = method(*args, **kwargs)
+                if isawaitable(result):
+                    result = await result
+                failed = False
+                return result
+            finally:
+                self._finished(trace, context, metrics, failed)
+        return wrapper
+
+    def wrap_methods(self, methods):
+        """Wrap all methods registered in jsonrpcserver `Methods`."""
+        for name, method in list(methods.items.items()):
+            methods.items[name] = self.wrap(name, method)
+        return methods
+
+    def _finished(self, trace, context, metrics, failed):
+        elapsed = perf() - trace.start
+        if metrics is not None:
+            metrics.observe(elapsed, trace.db_time(), failed)
+        if self._slow_secs is None or elapsed < self._slow_secs:
+            return
+        log.warning(trace.breakdown(elapsed))
+        if self._explain and context is not None:
+            query = trace.slowest()
+            if query is not None and self._should_explain(query.sql):
+                asyncio.ensure_future(self._explain_query(context['db'], trace.method, query))
+
+    def _should_explain(self, sql):
+        """Only one plan is captured at a time, same statement not too often."""
+        if self._explaining:
+            return False
+        now = perf()
+        if len(self._explained) > 1000:
+            self._explained.clear()
+        last = self._explained.get(sql)
+        if last is not None and now - last < self.EXPLAIN_INTERVAL:
+            return False
+        self._explained[sql] = now
+        self._explaining = True
+        return True
+
+    async def _explain_query(self, db, method, query):
+        try:
+            plan = await db.explain(query.sql, **query.params)
+            log.warning("[SLOW-REQUEST] plan of slowest query of %s (%dms):\n%s\n%s",
+                        method, query.secs * 1000, ' '.join(query.sql.split()), '\n'.join(plan))
+        except Exception as e:
+            log.warning("[SLOW-REQUEST] could not explain query of %s: %s", method, e)
+        finally:
+            self._explaining = False
@@ -2,6 +2,7 @@
 """Hive JSON-RPC API server."""
 import os
 import sys
+import asyncio
 import logging
 import time
 
@@ -35,6 +36,11 @@ from hive.server.tags_api import methods as tags_api
 from hive.server.database_api import methods as database_api
 
 from hive.server.db import Db
+from hive.server.batch import BatchDispatcher, is_batch_request
+from hive.server.coalesce import RequestCoalescer
+from hive.server.request_trace import RequestTracer
+from hive.server.metrics import ServerMetrics
+from hive.utils.profiler import SamplingProfiler
 
 # pylint: disable=too-many-lines
 
@@ -210,6 +216,14 @@ def run_server(conf):
       conf_stdout_custom_file_logger(req_res_log, "./request_process_times.log")
 
     methods = build_methods()
+    if conf.get('request_coalescing'):
+        # identical concurrent calls share single execution
+        RequestCoalescer().wrap_methods(methods)
+    metrics = ServerMetrics()
+    tracer = RequestTracer(conf.get('log_slow_requests_ms'), conf.get('explain_slow_requests'), metrics)
+    if tracer.enabled():
+        # outermost, so time spent waiting for coalesced call is included
+        tracer.wrap_methods(methods)
 
     app = web.Application()
     app['config'] = dict()
@@ -217,13 +231,22 @@ def run_server(conf):
     app['config']['hive.MAX_DB_ROW_RESULTS'] = 100000
     #app['config']['hive.logger'] = logger
 
+    batch_dispatcher = BatchDispatcher(methods, app,
+                                       conf.get('max_batch_request_size'),
+                                       conf.get('batch_request_concurrency'),
+                                       serialize=decimal_serialize,
+                                       deserialize=decimal_deserialize)
+
     async def init_db(app):
         """Initialize db adapter."""
         args = app['config']['args']
         app['db'] = await Db.create(args['database_url'])
+        metrics.watch_db(app['db'])
+        metrics.start()
 
     async def close_db(app):
         """Teardown db adapter."""
+        metrics.stop()
         app['db'].close()
         await app['db'].wait_closed()
 
@@ -298,6 +321,19 @@ def run_server(conf):
         # debug=True refs https://github.com/bcb/jsonrpcserver/issues/71
         response = None
         try:
+            if is_batch_request(request):
+                # batch entries are executed concurrently by our own dispatcher
+                batch_response = await batch_dispatcher.dispatch(decimal_deserialize(request))
+                headers = {
+                    'Access-Control-Allow-Origin': '*'
+                }
+                if batch_response:
+                    ret = web.json_response(batch_response, status=200, headers=headers, dumps=decimal_serialize)
+                else:
+                    ret = web.Response()
+                if req_res_log is not None:
+                  req_res_log.info("Request: {} processed in {:.4f}s".format(request, perf_counter() - t_start))
+                return ret
             response = await dispatch(request, methods=methods, debug=True, context=app, serialize=decimal_serialize, deserialize=decimal_deserialize)
         except simplejson.errors.JSONDecodeError as ex:
             # first log exception
@@ -338,11 +374,65 @@ def run_server(conf):
 
         return ret
 
+    profiler = SamplingProfiler(conf.get('sampling_profiler_interval_ms') / 1000)
+    # start/stop requests are handled one at a time
+    profiler_lock = asyncio.Lock()
+
+    async def profiler_start(request):
+        """Start sampling profiler; `interval_ms` overrides configured interval."""
+        async with profiler_lock:
+            if profiler.running:
+                return web.json_response(status=409, data=dict(result='sampling profiler already running'))
+            if 'interval_ms' in request.query:
+                try:
+                    interval = float(request.query['interval_ms']) / 1000
+                except ValueError:
+                    return web.json_response(status=400, data=dict(result='invalid interval_ms'))
+                if not interval >= SamplingProfiler.MIN_INTERVAL:
+                    return web.json_response(status=400, data=dict(
+                        result='interval_ms has to be at least %.1f' % (SamplingProfiler.MIN_INTERVAL * 1000)))
+                profiler.interval = interval
+            profiler.start()
+            return web.json_response(data=dict(result='sampling profiler started', interval_ms=profiler.interval * 1000))
+
+    def profiler_results(fmt):
+        profiler.stop()
+        return profiler.dump(fmt)
+
+    async def profiler_stop(request):
+        """Stop sampling profiler and return results (`format`: collapsed or speedscope)."""
+        fmt = request.query.get('format', conf.get('sampling_profiler_format'))
+        if fmt not in SamplingProfiler.FORMATS:
+            return web.json_response(status=400, data=dict(result='unknown format %s' % fmt))
+        async with profiler_lock:
+            if not profiler.running:
+                return web.json_response(status=409, data=dict(result='sampling profiler not running'))
+            # joining sampling thread and serializing stacks would block the loop
+            text = await asyncio.get_event_loop().run_in_executor(None, profiler_results, fmt)
+        content_type = 'application/json' if fmt == 'speedscope' else 'text/plain'
+        return web.Response(text=text, content_type=content_type)
+
+    async def start_admin(app):
+        """Serve admin endpoints on their own port, reachable from localhost only."""
+        await admin_runner.setup()
+        await web.TCPSite(admin_runner, '127.0.0.1', conf.get('sampling_profiler_port')).start()
+        log.info("sampling profiler endpoints available on 127.0.0.1:%d", conf.get('sampling_profiler_port'))
+
+    async def stop_admin(app):
+        await admin_runner.cleanup()
+
     if conf.get('sync_to_s3'):
         app.router.add_get('/head_age', head_age)
     app.router.add_get('/.well-known/healthcheck.json', health)
     app.router.add_get('/health', health)
     app.router.add_post('/', jsonrpc_handler)
+    if conf.get('sampling_profiler'):
+        admin_app = web.Application()
+        admin_app.router.add_post('/admin/profiler/start', profiler_start)
+        admin_app.router.add_post('/admin/profiler/stop', profiler_stop)
+        admin_runner = web.AppRunner(admin_app)
+        app.on_startup.append(start_admin)
+        app.on_cleanup.append(stop_admin)
     if 'auto_http_server_port' in app['config']['args'] and app['config']['args']['auto_http_server_port'] is not None:
         log.debug("auto-http-server-port detected in program arguments, http_server_port will be overriden with port from given range")
         port_range = app['config']['args']['auto_http_server_port']
@@ -0,0 +1,179 @@
+"""Blocks data provider fetching and decoding in separate processes."""
+
+import logging
+import marshal
+import multiprocessing
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from hive.steem.blocks_provider import BlocksProvider
+from hive.steem.vops_provider import VopsProvider
+from hive.utils.shared_ring_buffer import SharedRingBuffer
+from hive.utils.stats import WaitingStatusManager as WSM
+
+log = logging.getLogger(__name__)
+
+# operations which values are read by Blocks._process; others are counted only
+INDEXED_OPERATIONS = frozenset((
+    'pow_operation', 'pow2_operation',
+    'account_create_operation', 'account_create_with_delegation_operation', 'create_claimed_account_operation',
+    'account_update_operation', 'account_update2_operation',
+    'comment_operation', 'delete_comment_operation', 'comment_options_operation',
+    'vote_operation', 'transfer_operation', 'custom_json_operation'))
+
+def prefilter_block(block):
+    """Strip block of data indexer does not use; values of not indexed
+    operations are dropped, but operations stay (for op stats)."""
+    return {
+        'block_id': block['block_id'],
+        'previous': block['previous'],
+        'timestamp': block['timestamp'],
+        'transactions': [{'operations': [
+            op if op['type'] in INDEXED_OPERATIONS else {'type': op['type'], 'value': {}}
+            for op in tx['operations']]} for tx in block['transactions']]}
+
+def _fetch_worker(kind, steem_args, conf, lbound, ubound, threads, batch, ring, stop, log_level):
+    """Body of fetching process: runs threads of blocks or vops provider and
+    passes their (prefiltered) results in order to `ring` as marshal records."""
+    # pylint: disable=too-many-arguments
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=log_level)
+    from hive.steem.client import SteemClient
+    from hive.indexer.mock_block_provider import MockBlockProvider
+    from hive.indexer.mock_vops_provider import MockVopsProvider
+
+    def breaker():
+        return not stop.is_set()
+
+    try:
+        client = SteemClient(**steem_args)
+        data_queue = queue.Queue(maxsize=10000)
+        if kind == 'blocks':
+            for path in conf.get('mock_block_data_path') or []:
+                MockBlockProvider.load_block_data(path)
+            provider = BlocksProvider(client._client.get('get_block', client._client['default']),
+                                      threads, batch, lbound, ubound, breaker)
+            encode = lambda block: marshal.dumps(prefilter_block(block))
+        else:
+            if conf.get('mock_vops_data_path'):
+                MockVopsProvider.load_block_data(conf['mock_vops_data_path'])
+            provider = VopsProvider(conf, client, threads, batch, lbound, ubound, breaker)
+            encode = marshal.dumps
+        futures = provider.start(data_queue)
+
+        for _ in range(ubound - lbound):
+            while True:
+                try:
+                    item = data_queue.get(True, 1)
+                    break
+                except queue.Empty:
+                    if not breaker():
+                        return
+                    for future in futures:
+                        if future.done() and future.exception():
+                            raise future.exception()
+            if not ring.put(encode(item), breaker):
+                return
+    except:
+        log.exception("Exception caught during fetching %s in worker process", kind)
+        stop.set()
+        raise
+    finally:
+        ring.close()
+
+class ProcessBlocksDataProvider:
+    """Same interface as `MassiveBlocksDataProvider`, but blocks and virtual
+    ops are fetched and decoded by two worker processes (each running the
+    threads of its provider), so JSON decoding does not compete with
+    indexing for the GIL. Workers prefilter blocks and hand them over in
+    order through `SharedRingBuffer`s as marshal records.
+    """
+
+    def __init__(self, conf, steem_args, blocks_get_threads, vops_get_threads,
+                 number_of_blocks_data_in_one_batch, lbound, ubound, breaker, buffer_mb):
+        """
+            conf - configuration
+            steem_args - SteemClient arguments, to make client in worker processes
+            blocks_get_threads - number of threads which get blocks from node
+            vops_get_threads - number of threads which get virtual operations from node
+            number_of_blocks_data_in_one_batch - number of blocks which will be asked for the node in one HTTP get
+            lbound - first block to get
+            ubound - last block to get
+            breaker - callable, returns False when processing must be stopped
+            buffer_mb - size of each shared memory buffer
+        """
+        # pylint: disable=too-many-arguments
+        context = multiprocessing.get_context('spawn')
+        self._stop = context.Event()
+        self._breaker = breaker
+        self._rings = {}
+        self._processes = {}
+        worker_conf = {key: conf.get(key) for key in
+                       ('log_virtual_op_calls', 'mock_block_data_path', 'mock_vops_data_path')}
+        for kind, threads in (('blocks', blocks_get_threads), ('vops', vops_get_threads)):
+            ring = SharedRingBuffer(buffer_mb * 1024 * 1024, context.Lock())
+            self._rings[kind] = ring
+            self._processes[kind] = context.Process(
+                target=_fetch_worker, name='fetch-' + kind, daemon=True,
+                args=(kind, steem_args, worker_conf, lbound, ubound, threads,
+                      number_of_blocks_data_in_one_batch, ring, self._stop, log.getEffectiveLevel()))
+
+    def _running(self, kind):
+        """Breaker of waiting for records of given worker."""
+        if not self._breaker():
+            return False
+        if self._stop.is_set() or self._processes[kind].exitcode not in (None, 0):
+            raise RuntimeError("fetching blocks data in worker processes failed (waiting for %s)" % kind)
+        return True
+
+    def _get_from_ring(self, kind, number_of_elements):
+        ret = []
+        ring = self._rings[kind]
+        breaker = lambda: self._running(kind)
+        for _ in range(number_of_elements):
+            item = ring.get(marshal.loads, breaker)
+            if item is None:
+                break
+            ret.append(item)
+        return ret
+
+    def get(self, number_of_blocks):
+        """Returns blocks and vops data for next number_of_blocks"""
+        result = {'vops': [], 'blocks': []}
+
+        wait_vops_time = WSM.start()
+        vops = self._get_from_ring('vops', number_of_blocks)
+        if self._breaker():
+            assert len(vops) == number_of_blocks
+            result['vops'] = vops
+        WSM.wait_stat('block_consumer_vop', WSM.stop(wait_vops_time))
+
+        wait_blocks_time = WSM.start()
+        result['blocks'] = self._get_from_ring('blocks', number_of_blocks)
+        WSM.wait_stat('block_consumer_block', WSM.stop(wait_blocks_time))
+
+        return result
+
+    def _watch(self, kind):
+        """Waits for worker process, stopping it with breaker; shared memory is
+        unlinked once worker is gone (consumer keeps its mapping)."""
+        process = self._processes[kind]
+        try:
+            while process.is_alive():
+                if not self._breaker():
+                    self._stop.set()
+                process.join(1)
+        finally:
+            self._rings[kind].unlink()
+        if process.exitcode != 0:
+            self._stop.set()
+            raise RuntimeError("fetching %s process failed with exit code %d" % (kind, process.exitcode))
+
+    def start(self):
+        """Starts worker processes; returns futures of their watchers."""
+        pool = ThreadPoolExecutor(len(self._processes))
+        futures = []
+        for kind, process in self._processes.items():
+            process.start()
+            futures.append(pool.submit(self._watch, kind))
+        pool.shutdown(wait=False)
+        return futures
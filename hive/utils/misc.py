@@ -1,9 +1,9 @@
-import os, psutil
+import gc, os, psutil
 from hive.utils.stats import PrometheusClient, BroadcastObject
 
 def log_memory_usage(memtypes=["rss", "vms", "shared"], broadcast = True) -> str:
   """
-  Logs current memory types, additionally broadcast if broadcast set to True (default)
+  Logs current memory types and garbage collector runs, additionally broadcast if broadcast set to True (default)
   
   Available memtypes: rss, vms, shared, text, lib, data, dirty
   """
@@ -16,7 +16,8 @@ def log_memory_usage(memtypes=["rss", "vms", "shared"], broadcast = True) -> str
   stats = psutil.Process(os.getpid()).memory_info() # docs: https://psutil.readthedocs.io/en/latest/#psutil.Process.memory_info
   if broadcast:
     PrometheusClient.broadcast([ BroadcastObject(f'hivemind_memory_{key}', getattr(stats, key), 'b') for key in stats._fields ]) # broadcast to prometheus
-  return f"memory usage report: { ', '.join( [ f'{ human_readable.get(k, k) } = { format_bytes(getattr(stats, k)) }' for k in memtypes ] ) }"
+  gc_collections = '/'.join( str(gen['collections']) for gen in gc.get_stats() ) # per generation, since process start
+  return f"memory usage report: { ', '.join( [ f'{ human_readable.get(k, k) } = { format_bytes(getattr(stats, k)) }' for k in memtypes ] ) }, gc_collections = { gc_collections }"
 
 def chunks(lst, n):
     """Yield successive n-sized chunks from lst."""
@@ -3,6 +3,7 @@
 import logging
 import math
 import decimal
+import re
 
 from datetime import datetime
 from pytz import utc
@@ -66,38 +67,28 @@ def to_nai(value):
     return ret
 
 
+# special chars replaced one kind at a time (backslash first, so it's not escaped again in replacements)
+SPECIAL_CHARS_REPLACEMENTS = sorted(SPECIAL_CHARS.items(), key=lambda item: item[0] != "\\")
+# after special chars are replaced, only printable ASCII is left as it is
+NOT_PRINTABLE_ASCII_RE = re.compile(r'[^\x20-\x7e]')
+
+def _escape_unicode(match):
+    ordinal = ord(match.group(0))
+    return '\\u{:04x}'.format(ordinal) if ordinal <= 0xffff else '\\U{:08x}'.format(ordinal)
+
 def escape_characters(text):
     """ Escape special charactes """
     assert isinstance(text, str), "Expected string got: {}".format(type(text))
     if len(text.strip()) == 0:
         return "'" + text + "'"
 
-    ret = "E'"
-
-    for ch in text:
-        if ch in SPECIAL_CHARS:
-            dw = SPECIAL_CHARS[ch]
-            ret = ret + dw
-        else:
-            ordinal = ord(ch)
-            if ordinal <= 0x80 and ch.isprintable():
-                ret = ret + ch
-            else:
-                hexstr = hex(ordinal)[2:]
-                i = len(hexstr)
-                max = 4
-                escaped_value = '\\u'
-                if i > max:
-                    max = 8
-                    escaped_value = '\\U'
-                while i < max:
-                    escaped_value += '0'
-                    i += 1
-                escaped_value += hexstr
-                ret = ret + escaped_value
-
-    ret = ret + "'"
-    return ret
+    ret = text
+    for (ch, replacement) in SPECIAL_CHARS_REPLACEMENTS:
+        if ch in ret:
+            ret = ret.replace(ch, replacement)
+    if NOT_PRINTABLE_ASCII_RE.search(ret):
+        ret = NOT_PRINTABLE_ASCII_RE.sub(_escape_unicode, ret)
+    return "E'" + ret + "'"
 
 def vests_amount(value):
     """Returns a decimal amount, asserting units are VESTS"""
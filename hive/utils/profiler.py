@@ -2,7 +2,19 @@
 """Hive profiling tools"""
 
 import cProfile
+import logging
+import os
 import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import ujson as json
+
+log = logging.getLogger(__name__)
 
 class Profiler:
     """Context-based profiler."""
@@ -31,3 +43,130 @@ class Profiler:
         """Reads profile results from file and prints."""
         stats = pstats.Stats(self.filepath)
         stats.sort_stats('cumulative').print_stats(lines)
+
+class SamplingProfiler:
+    """Wall clock sampling profiler, cheap enough for production.
+
+    A daemon thread takes stacks of all other threads every `interval`
+    seconds (`sys._current_frames`) and counts identical stacks, so the
+    profiled process is only interrupted for the time of taking a sample.
+    Results are available as collapsed stacks (input of flamegraph.pl,
+    inferno etc.) or speedscope file (https://www.speedscope.app).
+    """
+
+    FORMATS = ('collapsed', 'speedscope')
+    # shorter intervals would keep GIL busy with taking samples
+    MIN_INTERVAL = 0.001
+
+    def __init__(self, interval=0.01):
+        assert interval >= self.MIN_INTERVAL, "sampling interval has to be at least %.1fms" % (self.MIN_INTERVAL * 1000)
+        self.interval = interval
+        self.samples = 0
+        self._stacks = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self._started_at = None
+
+    @property
+    def running(self):
+        """True while sampling."""
+        return self._thread is not None
+
+    def start(self):
+        """Drop previous results and start sampling."""
+        assert not self.running, "sampling profiler already running"
+        self.samples = 0
+        self._stacks = Counter()
+        self._stop.clear()
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        log.info("sampling profiler started (interval %.1fms)", self.interval * 1000)
+
+    def stop(self):
+        """Stop sampling; results are kept until next start."""
+        assert self.running, "sampling profiler not running"
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        log.info("sampling profiler stopped after %d samples (%.1fs)",
+                 self.samples, time.time() - self._started_at)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items(): # pylint: disable=protected-access
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stack.reverse()
+                self._stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _frame_name(code):
+        return "%s (%s:%d)" % (code.co_name, code.co_filename, code.co_firstlineno)
+
+    def collapsed(self):
+        """Samples as collapsed stacks: `thread;outer;...;inner count` lines."""
+        lines = []
+        for stack, count in self._stacks.most_common():
+            frames = [stack[0]] + [self._frame_name(code) for code in stack[1:]]
+            lines.append("%s %d" % (';'.join(frame.replace(';', ':') for frame in frames), count))
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self):
+        """Samples as speedscope file (dict), one sampled profile per thread."""
+        frames = []
+        index = {}
+        profiles = {}
+        for stack, count in self._stacks.items():
+            ids = []
+            for code in stack[1:]:
+                if code not in index:
+                    index[code] = len(frames)
+                    frames.append(dict(name=code.co_name, file=code.co_filename, line=code.co_firstlineno))
+                ids.append(index[code])
+            profile = profiles.setdefault(stack[0], dict(
+                type='sampled', name=stack[0], unit='none', startValue=0, endValue=0, samples=[], weights=[]))
+            profile['samples'].append(ids)
+            profile['weights'].append(count)
+            profile['endValue'] += count
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': 'hivemind %s' % datetime.fromtimestamp(self._started_at or 0).isoformat(timespec='seconds'),
+            'exporter': 'hivemind sampling profiler',
+            'shared': dict(frames=frames),
+            'profiles': [profiles[name] for name in sorted(profiles)]
+        }
+
+    def dump(self, fmt='collapsed'):
+        """Results serialized in given format."""
+        assert fmt in self.FORMATS, "unknown profile format %s" % fmt
+        if fmt == 'speedscope':
+            return json.dumps(self.speedscope())
+        return self.collapsed()
+
+    def save(self, directory='.', fmt='collapsed'):
+        """Write results into new file in `directory`; returns its path."""
+        path = os.path.join(directory, "sampling-profile-%d-%s.%s" % (
+            os.getpid(), datetime.now().strftime('%Y%m%d-%H%M%S'), 'json' if fmt == 'speedscope' else 'txt'))
+        with open(path, 'w') as profile_file:
+            profile_file.write(self.dump(fmt))
+        log.info("sampling profile saved to %s", path)
+        return path
+
+    def toggle_on_signal(self, signum, fmt='collapsed'):
+        """Start sampling on first `signum`, stop and save on the next one."""
+        def toggle(_signum, _frame):
+            if self.running:
+                self.stop()
+                self.save(fmt=fmt)
+            else:
+                self.start()
+        signal.signal(signum, toggle)
@@ -0,0 +1,104 @@
+"""Byte records queue in shared memory, handing data between processes."""
+
+import struct
+from multiprocessing import shared_memory
+from time import sleep
+
+_COUNTERS = struct.Struct('<QQ')
+_LENGTH = struct.Struct('<I')
+
+class SharedRingBuffer:
+    """Single producer / single consumer queue of byte records kept in
+    `multiprocessing.shared_memory` block.
+
+    Records are length prefixed and wrap around the end of the buffer.
+    Header holds total number of bytes written and read; each counter is
+    advanced only by its side, under the lock, so other side sees record
+    bytes before the counter moving past them. Sides poll (with short
+    sleeps) when the buffer is full or empty, checking `breaker` - callable
+    returning False when processing must be stopped.
+    """
+
+    # poll interval of waiting side (s)
+    POLL_INTERVAL = 0.001
+
+    def __init__(self, capacity, lock, name=None):
+        """Create new buffer of `capacity` bytes or attach (in other process)
+        to existing one of given `name`."""
+        self.capacity = capacity
+        self._lock = lock
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=_COUNTERS.size + capacity)
+            _COUNTERS.pack_into(self._shm.buf, 0, 0, 0)
+        else:
+            # spawned processes share resource tracker of their parent, so
+            # attaching does not make shared memory owned by this process
+            self._shm = shared_memory.SharedMemory(name=name)
+
+    def __reduce__(self):
+        return (self.__class__, (self.capacity, self._lock, self._shm.name))
+
+    def _counters(self):
+        with self._lock:
+            return _COUNTERS.unpack_from(self._shm.buf, 0)
+
+    def _advance(self, offset, value):
+        with self._lock:
+            struct.pack_into('<Q', self._shm.buf, offset, value)
+
+    def _copy_in(self, pos, data):
+        buf, pos = self._shm.buf, _COUNTERS.size + pos % self.capacity
+        first = min(len(data), _COUNTERS.size + self.capacity - pos)
+        buf[pos:pos + first] = data[:first]
+        if first < len(data):
+            buf[_COUNTERS.size:_COUNTERS.size + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos, size):
+        buf, pos = self._shm.buf, _COUNTERS.size + pos % self.capacity
+        end = _COUNTERS.size + self.capacity
+        if pos + size <= end:
+            return buf[pos:pos + size]
+        return bytes(buf[pos:end]) + bytes(buf[_COUNTERS.size:_COUNTERS.size + size - (end - pos)])
+
+    def put(self, data, breaker):
+        """Append record (bytes); returns False when stopped by `breaker`."""
+        need = _LENGTH.size + len(data)
+        assert need <= self.capacity, "record of %d bytes exceeds ring buffer" % len(data)
+        written, read = self._counters()
+        while self.capacity - (written - read) < need:
+            if not breaker():
+                return False
+            sleep(self.POLL_INTERVAL)
+            _, read = self._counters()
+        self._copy_in(written, _LENGTH.pack(len(data)))
+        self._copy_in(written + _LENGTH.size, data)
+        self._advance(0, written + need)
+        return True
+
+    def get(self, decode, breaker):
+        """Take next record and return `decode(record)`; None when stopped by
+        `breaker`. Record may be a view of the buffer, valid only until
+        `decode` returns."""
+        written, read = self._counters()
+        while written == read:
+            if not breaker():
+                return None
+            sleep(self.POLL_INTERVAL)
+            written, _ = self._counters()
+        size, = _LENGTH.unpack(bytes(self._copy_out(read, _LENGTH.size)))
+        record = self._copy_out(read + _LENGTH.size, size)
+        try:
+            return decode(record)
+        finally:
+            if isinstance(record, memoryview):
+                record.release()
+            self._advance(8, read + _LENGTH.size + size)
+
+    def close(self):
+        """Detach from shared memory."""
+        self._shm.close()
+
+    def unlink(self):
+        """Free shared memory (by its creator) once no other process needs to
+        attach; processes already attached keep their mapping."""
+        self._shm.unlink()
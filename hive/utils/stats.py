@@ -78,6 +78,15 @@ class PrometheusClient:
             PrometheusClient.deamon = Thread(target=PrometheusClient.work, args=[ port, getpid() ], daemon=True)
             PrometheusClient.deamon.start()
 
+    @staticmethod
+    def metric(kind, name, documentation, labelnames=()):
+        """Metric object (`Counter`, `Gauge` or `Histogram`) updated directly
+        by the caller, without the queue; None when prometheus client does not run."""
+        if PrometheusClient.deamon is None:
+            return None
+        import prometheus_client as prom
+        return getattr(prom, kind)(name, documentation, labelnames)
+
     @staticmethod
     def broadcast(obj):
         if PrometheusClient.deamon is None:
@@ -170,12 +179,46 @@ class OPStat(Stat):
         return list([ super().broadcast(n), BroadcastObject(n + "_count", self.count, 'b') ])
 
 class OPStatusManager(StatusManager):
+    """Operation processing stats.
+
+    Processed operations are only counted in `op_counts` (updated in place
+    by processing loops); of every `timing_interval` operations of given
+    type in current blocks, the first one is timed and reported with
+    `op_timed`. Time of others is estimated from average of timed
+    operations of the same type - of current blocks when there were any,
+    otherwise of whole sync.
+    """
+
+    # every n-th operation of a type is timed (1 - all of them)
+    timing_interval = 100
+
     # Summary for whole sync
     global_stats = {}
 
     # Currently processed blocks stats, merged to global stats, after `next_block`
     cpbs = {}
 
+    # operation counts of currently processed blocks, not yet folded into `cpbs`
+    op_counts = {}
+    # name -> [time, timed count] of currently processed blocks / whole sync
+    _timed = {}
+    _timed_total = {}
+
+    @staticmethod
+    def configure_timing(interval):
+        """Set how often operations are timed."""
+        assert interval > 0, "timing interval has to be positive"
+        OPStatusManager.timing_interval = interval
+
+    @staticmethod
+    def op_timed(name, start):
+        """Record time of timed operation (it has to be counted separately)."""
+        timed = OPStatusManager._timed.get(name)
+        if timed is None:
+            timed = OPStatusManager._timed[name] = [0.0, 0]
+        timed[0] += perf() - start
+        timed[1] += 1
+
     @staticmethod
     def op_stats( name, time, processed = 1 ):
         if name in OPStatusManager.cpbs.keys():
@@ -184,8 +227,28 @@ class OPStatusManager(StatusManager):
         else:
             OPStatusManager.cpbs[name] = OPStat(time, processed)
 
+    @staticmethod
+    def _fold_counts():
+        """Move counted operations into `cpbs` with estimated times."""
+        timed_total = OPStatusManager._timed_total
+        for name, timed in OPStatusManager._timed.items():
+            total = timed_total.get(name)
+            if total is None:
+                timed_total[name] = list(timed)
+            else:
+                total[0] += timed[0]
+                total[1] += timed[1]
+
+        for name, count in OPStatusManager.op_counts.items():
+            time, timed_count = OPStatusManager._timed.get(name) or timed_total.get(name) or (0.0, 0)
+            OPStatusManager.op_stats(name, time * count / timed_count if timed_count else 0.0, count)
+
+        OPStatusManager.op_counts.clear()
+        OPStatusManager._timed.clear()
+
     @staticmethod
     def next_blocks():
+        OPStatusManager._fold_counts()
         OPStatusManager.global_stats = StatusManager.merge_dicts(
             OPStatusManager.global_stats, 
             OPStatusManager.cpbs,
@@ -204,6 +267,7 @@ class OPStatusManager(StatusManager):
 
     @staticmethod
     def log_current(label : str):
+        OPStatusManager._fold_counts()
         StatusManager.print_row()
         log.info(label)
         tm = StatusManager.log_dict(OPStatusManager.cpbs)
@@ -2,6 +2,7 @@
 
 import sys
 import resource
+from itertools import islice
 
 USE_COLOR = hasattr(sys.stdout, 'isatty') and sys.stdout.isatty()
 
@@ -16,3 +17,36 @@ def peak_usage_mb():
     mem_denom = (1024 * 1024) if sys.platform == 'darwin' else 1024
     max_mem = int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
     return max_mem / mem_denom
+
+def deep_sizeof(obj, seen=None):
+    """Approximate memory (bytes) taken by object together with objects
+    it holds (containers, `__dict__` and `__slots__` attributes)."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    else:
+        if hasattr(obj, '__dict__'):
+            size += deep_sizeof(obj.__dict__, seen)
+        for name in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, name):
+                size += deep_sizeof(getattr(obj, name), seen)
+    return size
+
+def estimate_size(items, sample=16):
+    """Approximate memory (bytes) taken by list or dict with its content,
+    extrapolated from deep size of up to `sample` entries (first of dict, last of list)."""
+    count = len(items)
+    if not count:
+        return sys.getsizeof(items)
+    if isinstance(items, dict):
+        entries = list(islice(items.items(), sample))
+    else:
+        entries = items[-sample:]
+    return sys.getsizeof(items) + sum(deep_sizeof(entry) for entry in entries) * count // len(entries)
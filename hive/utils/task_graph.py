@@ -0,0 +1,86 @@
+"""Runs interdependent tasks in parallel under a limit of workers."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from time import perf_counter
+
+log = logging.getLogger(__name__)
+
+class TaskGraph:
+    """Dependency-aware scheduler of tasks executed by a pool of threads.
+
+    Each task declares resources (e.g. table or `table.column` names) it
+    reads and writes. A task waits for every task added before it which
+    writes something it reads or writes, or reads something it writes.
+    Tasks of the same `group` (chunks of one operation working on disjoint
+    rows) never wait for each other. Ready tasks are started by descending
+    `cost`, then in order of addition.
+    """
+
+    def __init__(self, max_workers):
+        self._max_workers = max(1, max_workers)
+        self._tasks = []
+
+    def add(self, name, func, args=(), reads=(), writes=(), group=None, cost=0):
+        """Add task; `name` is used for reporting and may repeat (e.g. for chunks)."""
+        reads, writes = set(reads), set(writes)
+        deps = set()
+        for idx, task in enumerate(self._tasks):
+            if group is not None and task['group'] == group:
+                continue
+            if task['writes'] & (reads | writes) or task['reads'] & writes:
+                deps.add(idx)
+        self._tasks.append(dict(name=name, func=func, args=args, reads=reads,
+                                writes=writes, group=group, cost=cost, deps=deps))
+        return len(self._tasks) - 1
+
+    def dependencies(self, idx):
+        """Indexes of tasks which have to be finished before given one."""
+        return set(self._tasks[idx]['deps'])
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def run(self, on_finished=None):
+        """Execute all tasks, calling `on_finished(name, elapsed_time)` after each one.
+
+        First failure stops scheduling of further tasks and is re-raised
+        once already running ones are finished."""
+        pending = set(range(len(self._tasks)))
+        done = set()
+        running = {}
+        failure = None
+
+        def execute(task):
+            start = perf_counter()
+            task['func'](*task['args'])
+            return perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            while pending or running:
+                if failure is None:
+                    ready = sorted((idx for idx in pending if self._tasks[idx]['deps'] <= done),
+                                   key=lambda idx: (-self._tasks[idx]['cost'], idx))
+                    for idx in ready[:self._max_workers - len(running)]:
+                        pending.discard(idx)
+                        running[pool.submit(execute, self._tasks[idx])] = idx
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    idx = running.pop(future)
+                    name = self._tasks[idx]['name']
+                    try:
+                        elapsed = future.result()
+                    except Exception as exc:
+                        log.error('%r generated an exception: %s', name, exc)
+                        failure = failure or exc
+                        continue
+                    done.add(idx)
+                    if on_finished:
+                        on_finished(name, elapsed)
+
+        if failure is not None:
+            raise failure
+        return len(done)
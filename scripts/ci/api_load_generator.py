@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+# Replays weighted mix of JSON-RPC requests against hivemind server under concurrency and reports latency
+# percentiles per method, throughput and error rate; optionally compares results with stored baseline report
+# and exits with error on regression.
+#
+# Sources of requests (can be mixed):
+#  - *.jsonl file: one request per line, either plain JSON-RPC request or {"weight": 2.5, "request": {...}},
+#  - *.log file: log captured by `hive server --log-request-times` (identical requests are weighted by count),
+#  - directory: tavern tests (*.tavern.yaml), each with weight 1.
+#
+# Example:
+# ./api_load_generator.py http://localhost:8080 ./request_process_times.log --concurrency 32 --duration 60 \
+#     --report load_report.json --baseline ../../tests/benchmarks/<dir>/load_report.json --threshold 0.2
+
+import asyncio
+import json
+import os
+import re
+import sys
+from collections import Counter
+from fnmatch import fnmatch
+from random import Random
+from time import perf_counter
+
+import aiohttp
+
+LOG_REQUEST_RE = re.compile(r'Request: (.*) processed in [0-9.]+s$')
+
+def load_jsonl(path):
+    requests = []
+    with open(path, 'r') as src:
+        for line in src:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if 'request' in item:
+                requests.append((item['request'], float(item.get('weight', 1.0))))
+            else:
+                requests.append((item, 1.0))
+    return requests
+
+def load_log(path):
+    counts = Counter()
+    with open(path, 'r') as src:
+        for line in src:
+            match = LOG_REQUEST_RE.search(line.rstrip())
+            if match:
+                try:
+                    request = json.loads(match.group(1))
+                except ValueError:
+                    continue
+                counts[json.dumps(request, sort_keys=True)] += 1
+    return [(json.loads(request), float(count)) for request, count in counts.items()]
+
+def load_tavern(path):
+    from benchmark_generator import get_request_from_yaml
+    requests = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            if fnmatch(name, "*.tavern.yaml"):
+                payload = get_request_from_yaml(os.path.join(root, name))
+                if payload is not None:
+                    requests.append((json.loads(payload), 1.0))
+    return requests
+
+def load_requests(paths):
+    requests = []
+    for path in paths:
+        if os.path.isdir(path):
+            requests.extend(load_tavern(path))
+        elif path.endswith('.log'):
+            requests.extend(load_log(path))
+        else:
+            requests.extend(load_jsonl(path))
+    return requests
+
+def method_name(request):
+    """Name under which request is reported (`call` style requests are reported as called api method)."""
+    if isinstance(request, list):
+        return 'batch'
+    method = request.get('method', '?')
+    params = request.get('params')
+    if method == 'call' and isinstance(params, list) and len(params) >= 2:
+        return '{}.{}'.format(params[0], params[1])
+    return method
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[rank - 1]
+
+class LoadGenerator:
+    """Sends requests picked from weighted mix and collects latencies."""
+
+    def __init__(self, url, requests, seed, timeout):
+        self._url = url
+        self._requests = [request for request, _ in requests]
+        self._weights = [weight for _, weight in requests]
+        self._rng = Random(seed)
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self.latencies = {}
+        self.errors = Counter()
+        self.sent = 0
+
+    def _pick(self):
+        return self._rng.choices(self._requests, self._weights)[0]
+
+    async def _send(self, session, request):
+        name = method_name(request)
+        self.sent += 1
+        start = perf_counter()
+        failed = False
+        try:
+            async with session.post(self._url, json=request) as response:
+                body = await response.json(content_type=None)
+                failed = response.status != 200 or \
+                    any('error' in item for item in (body if isinstance(body, list) else [body]))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            failed = True
+        self.latencies.setdefault(name, []).append(perf_counter() - start)
+        if failed:
+            self.errors[name] += 1
+
+    async def run_concurrency(self, concurrency, deadline, max_requests):
+        """Closed loop: `concurrency` clients sending next request as soon as previous one is answered."""
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(connector=connector, timeout=self._timeout) as session:
+            async def client():
+                while perf_counter() < deadline and (max_requests is None or self.sent < max_requests):
+                    await self._send(session, self._pick())
+            await asyncio.gather(*[client() for _ in range(concurrency)])
+
+    async def run_rate(self, rate, deadline, max_requests):
+        """Open loop: requests sent with exponentially distributed intervals (Poisson arrivals), regardless of responses."""
+        pending = set()
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0), timeout=self._timeout) as session:
+            next_at = perf_counter()
+            while perf_counter() < deadline and (max_requests is None or self.sent < max_requests):
+                next_at += self._rng.expovariate(rate)
+                delay = next_at - perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.ensure_future(self._send(session, self._pick()))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+
+def make_report(generator, elapsed):
+    methods = {}
+    for name, latencies in sorted(generator.latencies.items()):
+        latencies.sort()
+        methods[name] = dict(
+            count=len(latencies),
+            errors=generator.errors[name],
+            error_rate=generator.errors[name] / len(latencies),
+            p50=percentile(latencies, 50),
+            p90=percentile(latencies, 90),
+            p99=percentile(latencies, 99),
+            max=latencies[-1])
+    count = sum(item['count'] for item in methods.values())
+    errors = sum(generator.errors.values())
+    return dict(
+        elapsed=elapsed,
+        requests=count,
+        errors=errors,
+        error_rate=errors / count if count else 0.0,
+        throughput=count / elapsed if elapsed else 0.0,
+        methods=methods)
+
+def compare_with_baseline(report, baseline, threshold, error_margin, min_count):
+    """Return list of regressions: latency percentiles higher (throughput lower) than baseline by relative threshold,
+    error rate higher by absolute margin."""
+    regressions = []
+    # throughput is comparable only for the same load (with given rate it is just the rate)
+    if report.get('mode') == baseline.get('mode') and report['throughput'] < baseline['throughput'] * (1 - threshold):
+        regressions.append("throughput {:.1f}/s < baseline {:.1f}/s".format(report['throughput'], baseline['throughput']))
+    if report['error_rate'] > baseline['error_rate'] + error_margin:
+        regressions.append("error rate {:.2%} > baseline {:.2%}".format(report['error_rate'], baseline['error_rate']))
+    for name, stats in report['methods'].items():
+        base = baseline['methods'].get(name)
+        if base is None or stats['count'] < min_count or base['count'] < min_count:
+            continue
+        for key in ('p50', 'p90', 'p99'):
+            if stats[key] > base[key] * (1 + threshold):
+                regressions.append("{} {}: {:.1f}ms > baseline {:.1f}ms".format(name, key, stats[key] * 1000, base[key] * 1000))
+    return regressions
+
+def print_report(report):
+    print("{:<50} {:>8} {:>7} {:>9} {:>9} {:>9} {:>9}".format('method', 'count', 'errors', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms'))
+    for name, stats in report['methods'].items():
+        print("{:<50} {:>8} {:>7} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f}".format(
+            name, stats['count'], stats['errors'], stats['p50'] * 1000, stats['p90'] * 1000, stats['p99'] * 1000, stats['max'] * 1000))
+    print("requests: {}, throughput: {:.1f}/s, error rate: {:.2%}".format(report['requests'], report['throughput'], report['error_rate']))
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url", type=str, help="Address of hivemind server, e.g. http://localhost:8080")
+    parser.add_argument("requests", type=str, nargs='+', help="Request mix sources: *.jsonl, *.log (--log-request-times output) or tavern tests directory")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=8, help="Number of clients sending requests one after another")
+    mode.add_argument("--rate", type=float, default=None, help="Requests per second sent regardless of responses (instead of --concurrency)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Test duration in seconds")
+    parser.add_argument("--max-requests", type=int, default=None, help="Stop after given number of requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds (timeouts are errors)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", type=str, default=None, help="Save report to given JSON file")
+    parser.add_argument("--baseline", type=str, default=None, help="Report of previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression against baseline")
+    parser.add_argument("--error-rate-margin", type=float, default=0.01, help="Allowed absolute increase of error rate against baseline")
+    parser.add_argument("--min-count", type=int, default=20, help="Methods with less samples are not compared with baseline")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    request_mix = load_requests(args.requests)
+    assert request_mix, "No requests found"
+    print("Loaded {} distinct requests".format(len(request_mix)))
+
+    load = LoadGenerator(args.url, request_mix, args.seed, args.timeout)
+    start = perf_counter()
+    if args.rate is not None:
+        coroutine = load.run_rate(args.rate, start + args.duration, args.max_requests)
+    else:
+        coroutine = load.run_concurrency(args.concurrency, start + args.duration, args.max_requests)
+    asyncio.get_event_loop().run_until_complete(coroutine)
+    load_report = make_report(load, perf_counter() - start)
+    load_report['mode'] = dict(rate=args.rate) if args.rate is not None else dict(concurrency=args.concurrency)
+
+    print_report(load_report)
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump(load_report, report_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as baseline_file:
+            found = compare_with_baseline(load_report, json.load(baseline_file), args.threshold,
+                                          args.error_rate_margin, args.min_count)
+        for regression in found:
+            print("REGRESSION: {}".format(regression))
+        if found:
+            sys.exit(1)
+        print("No regressions against baseline (threshold {:.0%})".format(args.threshold))
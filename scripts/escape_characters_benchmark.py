@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+# Compares hive.utils.normalize.escape_characters with previous char by char implementation
+# on post bodies, titles and json_metadata taken from comment operations of mock block data
+# (also glued together into bodies of sizes typical for real posts, up to 64KB limit).
+
+import argparse
+import glob
+import json
+import os
+from time import perf_counter
+
+from hive.utils.normalize import escape_characters, SPECIAL_CHARS
+
+def escape_characters_previous(text):
+    """ Escape special charactes (previous implementation) """
+    if len(text.strip()) == 0:
+        return "'" + text + "'"
+
+    ret = "E'"
+
+    for ch in text:
+        if ch in SPECIAL_CHARS:
+            dw = SPECIAL_CHARS[ch]
+            ret = ret + dw
+        else:
+            ordinal = ord(ch)
+            if ordinal <= 0x80 and ch.isprintable():
+                ret = ret + ch
+            else:
+                hexstr = hex(ordinal)[2:]
+                i = len(hexstr)
+                max = 4
+                escaped_value = '\\u'
+                if i > max:
+                    max = 8
+                    escaped_value = '\\U'
+                while i < max:
+                    escaped_value += '0'
+                    i += 1
+                escaped_value += hexstr
+                ret = ret + escaped_value
+
+    ret = ret + "'"
+    return ret
+
+def load_comment_texts(mock_data_dir):
+    texts = []
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get('type') == 'comment_operation':
+                value = node['value']
+                texts.extend(value.get(key, '') for key in ('body', 'title', 'json_metadata', 'permlink'))
+            for item in node.values():
+                walk(item)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    for path in glob.glob(os.path.join(mock_data_dir, '**', '*.json'), recursive=True):
+        with open(path) as data_file:
+            walk(json.load(data_file))
+    return [text for text in texts if isinstance(text, str)]
+
+def glue(texts, size):
+    body = []
+    length = 0
+    while length < size:
+        for text in texts:
+            body.append(text)
+            length += len(text) + 1
+            if length >= size:
+                break
+    return '\n'.join(body)[:size]
+
+def bench(label, texts, iterations):
+    results = []
+    for func in (escape_characters_previous, escape_characters):
+        start = perf_counter()
+        for _ in range(iterations):
+            for text in texts:
+                func(text)
+        results.append(perf_counter() - start)
+    total = sum(len(text) for text in texts) * iterations
+    print("{:<22} {:>10} chars: previous {:8.4f}s, current {:8.4f}s, speedup {:6.1f}x".format(
+        label, total, results[0], results[1], results[0] / results[1]))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="escape_characters benchmark")
+    parser.add_argument("--mock-data-dir", type=str, default=os.path.join(os.path.dirname(__file__), '..', 'mock_data'))
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = load_comment_texts(args.mock_data_dir)
+    assert texts, "no comment operations found in {}".format(args.mock_data_dir)
+    for text in texts:
+        assert escape_characters(text) == escape_characters_previous(text)
+
+    bench("comment op fields", texts, args.iterations)
+    for size in (1024, 8192, 65536):
+        unicode_body = glue(texts + ['zażółć gęślą jaźń 🚀'], size)
+        bench("bodies {}B".format(size), [glue(texts, size)] * 10, args.iterations)
+        bench("bodies {}B unicode".format(size), [unicode_body] * 10, args.iterations)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Generates synthetic chain: block data files for MockBlockProvider and matching virtual operations files for
+MockVopsProvider, so sync (e.g. `hive bench-sync`) and API can be tested at large scale without hived node.
+
+Chain starts right after genesis block and contains:
+ - account creations (regular accounts and communities) in first blocks,
+ - posts, replies, edits (as diff patches, like condenser does) and deletions,
+ - votes with effective_comment_vote_operation,
+ - follow, reblog, community and ignored custom_json operations,
+ - payouts (author_reward, comment_reward and comment_payout_update operations) 7 days after post creation.
+Output is deterministic for given parameters and seed.
+
+Files are written per `--blocks-per-file` blocks to <output_dir>/block_data and <output_dir>/vops_data.
+Since communities are created in first blocks, sync has to use `--community-start-block 0`.
+
+Example:
+./mock_chain_generator.py /tmp/chain --blocks 201600 --accounts 20000
+hive bench-sync --community-start-block 0 --mock-block-data-path /tmp/chain/block_data --mock-vops-data-path /tmp/chain/vops_data
+"""
+
+import json
+import os
+from random import Random
+
+from diff_match_patch import diff_match_patch
+
+BLOCKS_PER_PAYOUT = 7 * 24 * 60 * 20 # 7 days of 3s blocks
+ACCOUNTS_PER_BLOCK = 500 # account creations in single block at the beginning of chain
+MAX_VOTE_WEIGHT = 10000
+
+DEFAULT_MIX = 'vote=60,comment=14,edit=4,delete=1,follow=8,reblog=3,community=3,custom_json=7'
+
+WORDS = ('hive', 'block', 'chain', 'witness', 'post', 'vote', 'reward', 'community', 'node', 'token', 'the', 'a',
+         'of', 'and', 'to', 'in', 'is', 'it', 'for', 'on', 'with', 'as', 'this', 'that', 'power', 'curation',
+         'market', 'price', 'photo', 'travel', 'music', 'game', 'art', 'news', 'life', 'food', 'zażółć', 'gęślą',
+         'jaźń', 'привет', 'こんにちは', '🚀', '"quoted"', "it's", 'back\\slash', '#tag', '@mention', '[link](https://hive.blog)')
+
+def asset(amount, precision, nai):
+    return dict(amount=str(amount), precision=precision, nai=nai)
+
+def hbd(amount):
+    return asset(amount, 3, '@@000000013')
+
+class Post:
+    """ State of generated post needed for further operations """
+    __slots__ = ('author', 'permlink', 'parent_author', 'parent_permlink', 'json_metadata', 'created', 'version',
+                 'children', 'votes', 'rshares', 'deleted')
+
+    def __init__(self, author, permlink, parent_author, parent_permlink, json_metadata, created):
+        # pylint: disable=too-many-arguments
+        self.author = author
+        self.permlink = permlink
+        self.parent_author = parent_author
+        self.parent_permlink = parent_permlink
+        self.json_metadata = json_metadata
+        self.created = created
+        self.version = 0
+        self.children = 0
+        self.votes = 0
+        self.rshares = 0
+        self.deleted = False
+
+class ChainGenerator:
+    """ Produces operations of consecutive blocks """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, seed, accounts, communities, ops_per_block, mix, root_post_ratio, community_post_ratio):
+        self._seed = seed
+        self._rng = Random(seed)
+        self._accounts = ['user{}'.format(idx) for idx in range(accounts)]
+        self._communities = ['hive-1{:05d}'.format(idx) for idx in range(communities)]
+        self._to_create = self._accounts + self._communities
+        self._ops_per_block = ops_per_block
+        self._mix = mix
+        self._root_post_ratio = root_post_ratio
+        self._community_post_ratio = community_post_ratio
+        self._dmp = diff_match_patch()
+
+        # posts before payout, in order of creation (ids are consecutive)
+        self._posts = {}
+        self._oldest_post = 0
+        self._next_post = 0
+
+    def _body(self, post_id, version):
+        # regenerated on demand, so bodies of all posts are not kept in memory; every edit appends a line
+        parts = []
+        for ver in range(version + 1):
+            rng = Random('{}/{}/{}'.format(self._seed, post_id, ver))
+            parts.append(' '.join(rng.choices(WORDS, k=rng.randint(20, 400) if ver == 0 else 10)))
+        return '\n'.join(parts)
+
+    def _random_account(self):
+        return self._rng.choice(self._accounts)
+
+    def _random_post(self, block_num):
+        """ Active (not deleted nor paid out) post created before given block, or None """
+        for _ in range(5):
+            if self._oldest_post == self._next_post:
+                return None, None
+            post_id = self._rng.randint(self._oldest_post, self._next_post - 1)
+            post = self._posts.get(post_id)
+            if post is not None and not post.deleted and post.created < block_num:
+                return post_id, post
+        return None, None
+
+    def block_ops(self, block_num):
+        """ Returns (operations, virtual operations) of given block """
+        ops, vops = [], []
+
+        if self._to_create:
+            for name in self._to_create[:ACCOUNTS_PER_BLOCK]:
+                ops.append(self._account_create(name))
+            del self._to_create[:ACCOUNTS_PER_BLOCK]
+            if not self._to_create:
+                for community in self._communities:
+                    ops.append(self._custom_json(community, 'community', ['updateProps', {
+                        'community': community, 'props': {'title': 'Community ' + community, 'about': 'synthetic'}}]))
+            return ops, vops
+
+        kinds, weights = zip(*self._mix.items())
+        for kind in self._rng.choices(kinds, weights, k=self._rng.randint(0, 2 * self._ops_per_block)):
+            getattr(self, '_op_' + kind)(block_num, ops, vops)
+
+        self._payouts(block_num, vops)
+        return ops, vops
+
+    def _account_create(self, name):
+        key = {'weight_threshold': 1, 'account_auths': [], 'key_auths': [['', 1]]}
+        return {'type': 'account_create_operation', 'value': {
+            'fee': asset(3000, 3, '@@000000021'), 'creator': 'initminer', 'new_account_name': name,
+            'owner': key, 'active': key, 'posting': key, 'memo_key': '', 'json_metadata': ''}}
+
+    def _custom_json(self, account, op_id, payload):
+        return {'type': 'custom_json_operation', 'value': {
+            'required_auths': [], 'required_posting_auths': [account], 'id': op_id, 'json': json.dumps(payload)}}
+
+    def _comment(self, post_id, post, body):
+        return {'type': 'comment_operation', 'value': {
+            'parent_author': post.parent_author, 'parent_permlink': post.parent_permlink, 'author': post.author,
+            'permlink': post.permlink, 'title': 'Title of post {}'.format(post_id) if not post.parent_author else '',
+            'body': body, 'json_metadata': post.json_metadata}}
+
+    def _op_comment(self, block_num, ops, vops):
+        # pylint: disable=unused-argument
+        parent_id, parent = None, None
+        if self._rng.random() >= self._root_post_ratio:
+            parent_id, parent = self._random_post(block_num)
+
+        if parent is not None:
+            parent.children += 1
+            parent_author, parent_permlink, tags = parent.author, parent.permlink, []
+        elif self._communities and self._rng.random() < self._community_post_ratio:
+            parent_author, parent_permlink = '', self._rng.choice(self._communities)
+            tags = [parent_permlink, self._rng.choice(WORDS[:10])]
+        else:
+            parent_author, parent_permlink = '', self._rng.choice(WORDS[:10])
+            tags = [parent_permlink]
+        json_metadata = json.dumps({'tags': tags, 'app': 'generator/1.0'})
+
+        post_id = self._next_post
+        self._next_post += 1
+        post = Post(self._random_account(), 'p{}'.format(post_id), parent_author, parent_permlink, json_metadata, block_num)
+        self._posts[post_id] = post
+        ops.append(self._comment(post_id, post, self._body(post_id, 0)))
+
+    def _op_edit(self, block_num, ops, vops):
+        # pylint: disable=unused-argument
+        post_id, post = self._random_post(block_num)
+        if post is None:
+            return
+        old_body = self._body(post_id, post.version)
+        post.version += 1
+        new_body = self._body(post_id, post.version)
+        patch = self._dmp.patch_toText(self._dmp.patch_make(old_body, new_body))
+        ops.append(self._comment(post_id, post, patch if len(patch) < len(new_body) else new_body))
+
+    def _op_delete(self, block_num, ops, vops):
+        # pylint: disable=unused-argument
+        post_id, post = self._random_post(block_num)
+        if post is None or post.children or post.votes:
+            return
+        post.deleted = True
+        ops.append({'type': 'delete_comment_operation', 'value': {'author': post.author, 'permlink': post.permlink}})
+        if post_id == self._oldest_post:
+            del self._posts[post_id]
+            self._oldest_post += 1
+
+    def _op_vote(self, block_num, ops, vops):
+        _, post = self._random_post(block_num)
+        if post is None:
+            return
+        voter = self._random_account()
+        weight = self._rng.choice((MAX_VOTE_WEIGHT, MAX_VOTE_WEIGHT, 5000, 2500, 100, -MAX_VOTE_WEIGHT))
+        rshares = weight * self._rng.randint(1, 100000000) // MAX_VOTE_WEIGHT
+        post.votes += 1
+        post.rshares += rshares
+        ops.append({'type': 'vote_operation', 'value': {
+            'voter': voter, 'author': post.author, 'permlink': post.permlink, 'weight': weight}})
+        vops.append({'type': 'effective_comment_vote_operation', 'value': {
+            'voter': voter, 'author': post.author, 'permlink': post.permlink, 'weight': abs(weight),
+            'rshares': rshares, 'total_vote_weight': post.votes * MAX_VOTE_WEIGHT,
+            'pending_payout': hbd(max(0, post.rshares) // 1000000)}})
+
+    def _op_follow(self, block_num, ops, vops):
+        # pylint: disable=unused-argument
+        follower, following = self._random_account(), self._random_account()
+        what = self._rng.choice((['blog'], ['blog'], ['blog'], [], ['ignore']))
+        ops.append(self._custom_json(follower, 'follow', ['follow', {
+            'follower': follower, 'following': following, 'what': what}]))
+
+    def _op_reblog(self, block_num, ops, vops):
+        # pylint: disable=unused-argument
+        _, post = self._random_post(block_num)
+        if post is None:
+            return
+        account = self._random_account()
+        ops.append(self._custom_json(account, 'reblog', ['reblog', {
+            'account': account, 'author': post.author, 'permlink': post.permlink}]))
+
+    def _op_community(self, block_num, ops, vops):
+        # pylint: disable=unused-argument
+        if not self._communities:
+            return
+        account = self._random_account()
+        action = self._rng.choice(('subscribe', 'subscribe', 'unsubscribe'))
+        ops.append(self._custom_json(account, 'community', [action, {'community': self._rng.choice(self._communities)}]))
+
+    def _op_custom_json(self, block_num, ops, vops):
+        # pylint: disable=unused-argument
+        # custom_json of other applications (ignored by hivemind; there is a lot of them on mainnet)
+        account = self._random_account()
+        ops.append(self._custom_json(account, 'sm_find_match', {'match_type': 'Ranked', 'app': 'generator/1.0'}))
+
+    def _payouts(self, block_num, vops):
+        payout_created = block_num - BLOCKS_PER_PAYOUT
+        while self._oldest_post < self._next_post:
+            post = self._posts.get(self._oldest_post)
+            if post is not None:
+                if post.created > payout_created:
+                    break
+                if not post.deleted:
+                    self._payout(post, vops)
+                del self._posts[self._oldest_post]
+            self._oldest_post += 1
+
+    def _payout(self, post, vops):
+        payout = max(0, post.rshares) // 1000000
+        if payout:
+            author_payout = payout * 3 // 4
+            vops.append({'type': 'author_reward_operation', 'value': {
+                'author': post.author, 'permlink': post.permlink, 'hbd_payout': hbd(author_payout // 2),
+                'hive_payout': asset(0, 3, '@@000000021'),
+                'vesting_payout': asset(author_payout * 1000, 6, '@@000000037')}})
+            vops.append({'type': 'comment_reward_operation', 'value': {
+                'author': post.author, 'permlink': post.permlink, 'payout': hbd(payout),
+                'author_rewards': author_payout, 'total_payout_value': hbd(author_payout),
+                'curator_payout_value': hbd(payout - author_payout), 'beneficiary_payout_value': hbd(0)}})
+        vops.append({'type': 'comment_payout_update_operation', 'value': {
+            'author': post.author, 'permlink': post.permlink}})
+
+def make_transaction(block_num, operation):
+    return {'ref_block_num': block_num & 0xffff, 'ref_block_prefix': 0, 'expiration': '1970-01-01T00:00:00',
+            'operations': [operation], 'extensions': [], 'signatures': []}
+
+def write_files(output_dir, first_block, blocks, vops):
+    name = '{:010d}.json'.format(first_block)
+    # json.dumps (unlike json.dump) uses C encoder
+    with open(os.path.join(output_dir, 'block_data', name), 'w') as block_file:
+        block_file.write(json.dumps(blocks))
+    with open(os.path.join(output_dir, 'vops_data', name), 'w') as vops_file:
+        vops_file.write(json.dumps({'ops': [], 'ops_by_block': vops}))
+
+def parse_mix(text):
+    mix = {}
+    kinds = [item.split('=')[0] for item in DEFAULT_MIX.split(',')]
+    for item in text.split(','):
+        kind, weight = item.split('=')
+        assert kind in kinds, "unknown operation kind {}".format(kind)
+        mix[kind] = float(weight)
+    return mix
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Synthetic chain generator for MockBlockProvider and MockVopsProvider")
+    parser.add_argument("output_dir", type=str, help="block_data and vops_data directories are created there")
+    parser.add_argument("--blocks", type=int, default=28800, help="number of blocks to generate")
+    parser.add_argument("--accounts", type=int, default=10000, help="number of regular accounts")
+    parser.add_argument("--communities", type=int, default=100, help="number of communities (up to 100000)")
+    parser.add_argument("--ops-per-block", type=int, default=30, help="average number of operations in block")
+    parser.add_argument("--mix", type=str, default=DEFAULT_MIX, help="relative frequencies of kinds of operations")
+    parser.add_argument("--root-post-ratio", type=float, default=0.3, help="part of comments which are top level posts")
+    parser.add_argument("--community-post-ratio", type=float, default=0.3, help="part of top level posts made in communities")
+    parser.add_argument("--blocks-per-file", type=int, default=10000, help="number of blocks in single output file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    assert args.communities <= 100000
+    for subdir in ('block_data', 'vops_data'):
+        os.makedirs(os.path.join(args.output_dir, subdir), exist_ok=True)
+
+    generator = ChainGenerator(args.seed, args.accounts, args.communities, args.ops_per_block, parse_mix(args.mix),
+                               args.root_post_ratio, args.community_post_ratio)
+    file_first_block = 1
+    file_blocks, file_vops = {}, []
+    operations = 0
+    for num in range(1, args.blocks + 1):
+        block_ops, block_vops = generator.block_ops(num)
+        operations += len(block_ops) + len(block_vops)
+        if block_ops:
+            # blocks without operations are made by MockBlockProvider
+            file_blocks[str(num)] = {'transactions': [make_transaction(num, op) for op in block_ops]}
+        if block_vops:
+            file_vops.append({'block': num, 'ops': [{'op': vop} for vop in block_vops]})
+        if num - file_first_block + 1 == args.blocks_per_file or num == args.blocks:
+            write_files(args.output_dir, file_first_block, file_blocks, file_vops)
+            print("blocks {} - {} written, {} operations so far, {} posts created".format(
+                file_first_block, num, operations, generator._next_post)) # pylint: disable=protected-access
+            file_first_block = num + 1
+            file_blocks, file_vops = {}, []
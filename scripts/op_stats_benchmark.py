@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+# Measures per operation overhead of operation stats (hive.utils.stats.OPStatusManager) as used
+# by Blocks._process: previous accounting (timing and dict update of every operation) compared
+# with counting plus sampled timing at given intervals.
+
+import argparse
+from random import Random
+from time import perf_counter
+
+from hive.utils.stats import OPStatusManager as OPSM, OPStat
+
+OP_TYPES = ['vote_operation'] * 60 + ['comment_operation'] * 15 + ['custom_json_operation'] * 20 + \
+           ['transfer_operation'] * 3 + ['comment_options_operation'] * 2
+
+def op_stats_previous(stats, name, time, processed=1):
+    if name in stats.keys():
+        stats[name].time += time
+        stats[name].count += processed
+    else:
+        stats[name] = OPStat(time, processed)
+
+def bench_previous(ops):
+    stats = {}
+    start_all = perf_counter()
+    for op_type in ops:
+        start = OPSM.start()
+        op_stats_previous(stats, op_type, OPSM.stop(start))
+    return perf_counter() - start_all
+
+def bench_current(ops, interval):
+    OPSM.configure_timing(interval)
+    start_all = perf_counter()
+    op_counts = OPSM.op_counts
+    for op_type in ops:
+        count = op_counts.get(op_type, 0) + 1
+        op_counts[op_type] = count
+        start = perf_counter() if (count - 1) % interval == 0 else None
+        if start is not None:
+            OPSM.op_timed(op_type, start)
+    OPSM.next_blocks()
+    return perf_counter() - start_all
+
+def bench_empty(ops):
+    start_all = perf_counter()
+    for op_type in ops:
+        pass
+    return perf_counter() - start_all
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Operation stats overhead benchmark")
+    parser.add_argument("--operations", type=int, default=1000000)
+    parser.add_argument("--intervals", type=int, nargs='+', default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+
+    ops = Random(0).choices(OP_TYPES, k=args.operations)
+    loop = bench_empty(ops)
+    per_op = lambda secs: (secs - loop) / len(ops) * 1e9
+
+    print("previous: {:7.1f}ns per operation".format(per_op(bench_previous(ops))))
+    for interval in args.intervals:
+        print("interval {:5d}: {:7.1f}ns per operation".format(interval, per_op(bench_current(ops, interval))))
@@ -0,0 +1,67 @@
+#pylint: disable=missing-docstring
+import asyncio
+import pytest
+
+from jsonrpcserver.methods import Methods
+
+from hive.server.batch import BatchDispatcher, batch_call_key, is_batch_request
+
+def _methods(calls, running, peak):
+    async def echo(context, value):
+        calls.append(value)
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return value
+
+    methods = Methods()
+    methods.add(**{'test.echo': echo})
+    return methods
+
+def _call(value, _id):
+    return {'jsonrpc': '2.0', 'method': 'test.echo', 'params': {'value': value}, 'id': _id}
+
+def test_is_batch_request():
+    assert is_batch_request(' [{"id": 1}]')
+    assert not is_batch_request('{"id": 1}')
+
+def test_batch_call_key():
+    assert batch_call_key(_call(1, 1)) == batch_call_key(_call(1, 2))
+    assert batch_call_key(_call(1, 1)) != batch_call_key(_call(2, 1))
+    assert batch_call_key({'params': []}) is None
+    assert batch_call_key(5) is None
+
+@pytest.mark.asyncio
+async def test_batch_concurrency_and_dedup():
+    calls, running, peak = [], [0], [0]
+    dispatcher = BatchDispatcher(_methods(calls, running, peak), None, 10, 2)
+
+    batch = [_call(1, 1), _call(2, 2), _call(1, 3), _call(3, 4), _call(4, 5)]
+    responses = await dispatcher.dispatch(batch)
+
+    assert sorted(calls) == [1, 2, 3, 4]
+    assert peak[0] == 2
+    assert {r['id']: r['result'] for r in responses} == {1: 1, 2: 2, 3: 1, 4: 3, 5: 4}
+
+@pytest.mark.asyncio
+async def test_batch_limits():
+    calls, running, peak = [], [0], [0]
+    dispatcher = BatchDispatcher(_methods(calls, running, peak), None, 2, 2)
+
+    response = await dispatcher.dispatch([_call(1, 1), _call(2, 2), _call(3, 3)])
+    assert response['error']['code'] == -32600
+    response = await dispatcher.dispatch([])
+    assert response['error']['code'] == -32600
+    assert not calls
+
+@pytest.mark.asyncio
+async def test_batch_notifications():
+    calls, running, peak = [], [0], [0]
+    dispatcher = BatchDispatcher(_methods(calls, running, peak), None, 10, 2)
+
+    notification = {'jsonrpc': '2.0', 'method': 'test.echo', 'params': {'value': 1}}
+    assert await dispatcher.dispatch([notification]) == []
+    responses = await dispatcher.dispatch([notification, _call(1, 7)])
+    assert responses == [{'jsonrpc': '2.0', 'result': 1, 'id': 7}]
+    assert calls == [1, 1]
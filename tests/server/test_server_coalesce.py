@@ -0,0 +1,61 @@
+#pylint: disable=missing-docstring
+import asyncio
+import pytest
+
+from jsonrpcserver.methods import Methods
+
+from hive.server.coalesce import RequestCoalescer
+
+def _coalesced_echo(calls):
+    async def echo(context, value, observer=None):
+        calls.append((value, observer))
+        await asyncio.sleep(0.01)
+        return value
+
+    methods = Methods()
+    methods.add(**{'test.echo': echo})
+    coalescer = RequestCoalescer()
+    coalescer.wrap_methods(methods)
+    return coalescer, methods.items['test.echo']
+
+@pytest.mark.asyncio
+async def test_coalesce_identical_calls():
+    calls = []
+    coalescer, echo = _coalesced_echo(calls)
+
+    results = await asyncio.gather(echo(None, 1), echo(None, value=1),
+                                   echo(None, 1, None), echo(None, 2))
+    assert results == [1, 1, 1, 2]
+    assert sorted(calls) == [(1, None), (2, None)]
+    assert coalescer.calls == 4
+    assert coalescer.coalesced == 2
+
+    # finished calls are not cached
+    assert await echo(None, 1) == 1
+    assert len(calls) == 3
+
+@pytest.mark.asyncio
+async def test_coalesce_never_shares_between_observers():
+    calls = []
+    coalescer, echo = _coalesced_echo(calls)
+
+    await asyncio.gather(echo(None, 1, 'alice'), echo(None, 1, 'bob'), echo(None, 1))
+    assert len(calls) == 3
+    assert coalescer.coalesced == 0
+
+@pytest.mark.asyncio
+async def test_coalesce_errors_and_invalid_params():
+    async def fail(context, value):
+        await asyncio.sleep(0.01)
+        raise ValueError(value)
+
+    coalescer = RequestCoalescer()
+    fail = coalescer.wrap('test.fail', fail)
+    results = await asyncio.gather(fail(None, 1), fail(None, 1), return_exceptions=True)
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert coalescer.coalesced == 1
+
+    # params not matching signature are passed through untouched
+    with pytest.raises(TypeError):
+        await fail(None, 1, 2)
+    assert coalescer.calls == 2
@@ -0,0 +1,28 @@
+#pylint: disable=missing-docstring
+import asyncio
+import pytest
+
+from hive.server.common.hive_state import HiveState
+
+class FakeDb:
+    def __init__(self):
+        self.reads = 0
+
+    async def query_row(self, sql):
+        self.reads += 1
+        await asyncio.sleep(0.01)
+        return {'head_block': self.reads, 'block_num': self.reads, 'usd_per_steem': 1, 'dgpo': '{"time": "x"}'}
+
+@pytest.mark.asyncio
+async def test_hive_state_refreshed_once_per_block():
+    HiveState.clear()
+    db = FakeDb()
+
+    states = await asyncio.gather(*[HiveState.get(db) for _ in range(5)])
+    assert db.reads == 1
+    assert all(state['dgpo'] == {'time': 'x'} for state in states)
+    assert (await HiveState.get(db))['block_num'] == 1
+
+    HiveState._loaded_at -= HiveState.BLOCK_INTERVAL
+    assert await HiveState.head_block(db) == 2
+    HiveState.clear()
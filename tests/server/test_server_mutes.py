@@ -0,0 +1,72 @@
+#pylint: disable=missing-docstring
+import pytest
+
+from hive.server.common.hive_state import HiveState
+from hive.server.common.mutes import Mutes
+
+class FakeDb:
+    def __init__(self):
+        self.head_block = 10
+        self.changed = []
+        self.fetches = 0
+        self.checks = 0
+
+    async def query_row(self, sql, **kwargs):
+        assert 'hive_state' in sql
+        return {'head_block': self.head_block, 'block_num': self.head_block, 'usd_per_steem': 1, 'dgpo': '{}'}
+
+    async def query_col(self, sql, **kwargs):
+        assert 'mutes_get_changed_observers' in sql
+        self.checks += 1
+        return self.changed
+
+    async def query_all(self, sql, **kwargs):
+        self.fetches += 1
+        return [{'account': 'spammer', 'source': kwargs['observer'], 'is_blacklisted': True}]
+
+    def new_block(self, changed):
+        self.head_block += 1
+        self.changed = changed
+        HiveState.clear()
+
+@pytest.mark.asyncio
+async def test_mutes_cache_invalidation():
+    Mutes.clear_cache()
+    HiveState.clear()
+    db = FakeDb()
+    context = {'db': db}
+
+    expected = {'spammer': (['alice'], [])}
+    assert await Mutes.get_blacklisted_for_observer('alice', context) == expected
+    assert await Mutes.get_blacklisted_for_observer('alice', context) == expected
+    assert db.fetches == 1
+
+    # callers get copies of cached values
+    (await Mutes.get_blacklisted_for_observer('alice', context))['spammer'][0].append('eve')
+    assert await Mutes.get_blacklisted_for_observer('alice', context) == expected
+
+    # other flags and other observers are cached separately
+    await Mutes.get_blacklisted_for_observer('alice', context, 1)
+    await Mutes.get_blacklisted_for_observer('bob', context)
+    assert db.fetches == 3
+
+    # changed follows are checked once per new head block, dropping only entries of changed observers
+    db.new_block(['alice'])
+    await Mutes.get_blacklisted_for_observer('alice', context)
+    await Mutes.get_blacklisted_for_observer('bob', context)
+    assert db.fetches == 4
+    assert db.checks == 1
+    await Mutes.get_blacklisted_for_observer('alice', context, 1)
+    assert db.fetches == 5
+    assert db.checks == 1
+
+    # fork drops whole cache
+    db.head_block -= 2
+    HiveState.clear()
+    await Mutes.get_blacklisted_for_observer('bob', context)
+    assert db.fetches == 6
+    assert db.checks == 1
+
+    assert await Mutes.get_blacklisted_for_observer(None, context) == {}
+    Mutes.clear_cache()
+    HiveState.clear()
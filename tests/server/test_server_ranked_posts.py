@@ -0,0 +1,85 @@
+#pylint: disable=missing-docstring
+import pytest
+
+from hive.server.common.hive_state import HiveState
+from hive.server.common.ranked_posts import RankedPosts
+
+SQL = "SELECT * FROM bridge_get_ranked_post_by_trends( (:author)::VARCHAR, (:permlink)::VARCHAR, (:limit)::SMALLINT, (:observer)::VARCHAR )"
+
+class FakeDb:
+    def __init__(self, size):
+        self.head_block = 1
+        self.rows = [{'author': 'a%d' % i, 'permlink': 'p'} for i in range(size)]
+        self.calls = []
+
+    async def query_row(self, sql):
+        return {'head_block': self.head_block, 'block_num': 1, 'usd_per_steem': 1, 'dgpo': '{}'}
+
+    async def query_all(self, sql, author, permlink, limit, observer, **params):
+        self.calls.append((author, limit, observer))
+        first = 0
+        if author:
+            first = [row['author'] for row in self.rows].index(author) + 1
+        return self.rows[first:first + limit]
+
+def _reset():
+    HiveState.clear()
+    RankedPosts.clear()
+
+@pytest.mark.asyncio
+async def test_ranked_posts_pages_from_cache():
+    _reset()
+    db = FakeDb(250)
+
+    page = await RankedPosts.query_all(db, SQL, '', '', 20, '')
+    assert page == db.rows[:20]
+    page = await RankedPosts.query_all(db, SQL, 'a19', 'p', 20, '')
+    assert page == db.rows[20:40]
+    assert db.calls == [('', RankedPosts.DEPTH, '')]
+
+    # beyond cached window and with observer - regular query
+    page = await RankedPosts.query_all(db, SQL, 'a89', 'p', 20, '')
+    assert page == db.rows[90:110]
+    await RankedPosts.query_all(db, SQL, '', '', 20, 'alice')
+    assert db.calls[1:] == [('a89', 20, ''), ('', 20, 'alice')]
+
+    # new head block - next page is not served from old rows, first page reloads ranking
+    db.head_block = 2
+    HiveState.clear()
+    await RankedPosts.query_all(db, SQL, 'a19', 'p', 20, '')
+    assert db.calls[-1] == ('a19', 20, '')
+    await RankedPosts.query_all(db, SQL, '', '', 20, '')
+    assert db.calls[-1] == ('', RankedPosts.DEPTH, '')
+    _reset()
+
+@pytest.mark.asyncio
+async def test_ranked_posts_cached_rankings():
+    _reset()
+    db = FakeDb(250)
+
+    # tag rankings are not cached, community ones are
+    await RankedPosts.query_all(db, SQL, '', '', 20, '', tag='photography')
+    await RankedPosts.query_all(db, SQL, '', '', 20, '', tag='photography')
+    assert db.calls == [('', 20, ''), ('', 20, '')]
+    await RankedPosts.query_all(db, SQL, '', '', 20, '', community='hive-123456')
+    await RankedPosts.query_all(db, SQL, '', '', 20, '', community='hive-123456')
+    await RankedPosts.query_all(db, SQL, '', '', 20, '', tag='hive-123456')
+    assert db.calls[2:] == [('', RankedPosts.DEPTH, ''), ('', RankedPosts.DEPTH, '')]
+
+    # cache is bounded by size of rows, least recently used rankings are dropped
+    max_bytes = RankedPosts.MAX_BYTES
+    RankedPosts.MAX_BYTES = RankedPosts._size // 2 # pylint: disable=protected-access
+    await RankedPosts.query_all(db, SQL, '', '', 20, '')
+    assert RankedPosts.stats()[0] == 1
+    RankedPosts.MAX_BYTES = max_bytes
+    _reset()
+
+@pytest.mark.asyncio
+async def test_ranked_posts_short_ranking():
+    _reset()
+    db = FakeDb(30)
+
+    assert await RankedPosts.query_all(db, SQL, '', '', 50, '') == db.rows
+    assert await RankedPosts.query_all(db, SQL, 'a19', 'p', 50, '') == db.rows[20:]
+    assert len(db.calls) == 1
+    _reset()
@@ -22,6 +22,8 @@ from hive.utils.normalize import (
     secs_to_str,
     strtobool,
     int_log_level,
+    escape_characters,
+    SPECIAL_CHARS,
 )
 
 def test_secs_to_str():
@@ -118,3 +120,41 @@ def test_int_log_level():
         int_log_level(None)
     with pytest.raises(ValueError):
         int_log_level('')
+
+def _escape_characters_reference(text):
+    """Previous, char by char implementation of escape_characters."""
+    if len(text.strip()) == 0:
+        return "'" + text + "'"
+    ret = "E'"
+    for ch in text:
+        if ch in SPECIAL_CHARS:
+            ret = ret + SPECIAL_CHARS[ch]
+        else:
+            ordinal = ord(ch)
+            if ordinal <= 0x80 and ch.isprintable():
+                ret = ret + ch
+            else:
+                hexstr = hex(ordinal)[2:]
+                width = 8 if len(hexstr) > 4 else 4
+                ret = ret + ('\\U' if width == 8 else '\\u') + hexstr.rjust(width, '0')
+    return ret + "'"
+
+def test_escape_characters():
+    assert escape_characters('') == "''"
+    assert escape_characters(' \n') == "' \n'"
+    assert escape_characters("it's 100%") == "E'it\\047s 100\\045'"
+    assert escape_characters('a\x00b') == "E'a b'"
+    assert escape_characters('\x80\u00e9\U0001f600') == "E'\\u0080\\u00e9\\U0001f600'"
+
+def test_escape_characters_fuzz():
+    import random
+    rnd = random.Random(1234)
+    alphabets = [
+        [chr(i) for i in range(0x100)],
+        list("ab \\'%_:\r\n\t\v\f\x00") + [chr(0x80), chr(0x7f)],
+        [chr(rnd.randrange(0x110000)) for _ in range(500)] + ['\ud800', '\udfff', '\ufeff', 'x'],
+    ]
+    for _ in range(3000):
+        alphabet = rnd.choice(alphabets)
+        text = ''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(0, 64)))
+        assert escape_characters(text) == _escape_characters_reference(text), repr(text)
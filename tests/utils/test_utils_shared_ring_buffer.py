@@ -0,0 +1,148 @@
+#pylint: disable=missing-docstring,wrong-import-position
+import ast
+import marshal
+import os
+import threading
+
+import pytest
+
+# fetching in processes needs multiprocessing.shared_memory (Python 3.8+)
+pytest.importorskip('multiprocessing.shared_memory')
+
+from hive.steem.process_blocks_data_provider import INDEXED_OPERATIONS, prefilter_block
+from hive.utils.shared_ring_buffer import SharedRingBuffer
+
+@pytest.fixture
+def ring():
+    buffer = SharedRingBuffer(32, threading.Lock())
+    yield buffer
+    buffer.close()
+    buffer.unlink()
+
+def _running():
+    return True
+
+def _stopped():
+    return False
+
+def test_ring_buffer_order(ring):
+    for record in (b'a', b'bc', b''):
+        assert ring.put(record, _running)
+    assert [ring.get(bytes, _running) for _ in range(3)] == [b'a', b'bc', b'']
+
+def test_ring_buffer_wraps_record(ring):
+    assert ring.put(b'x' * 20, _running)
+    assert ring.get(bytes, _running) == b'x' * 20
+    # length prefix fits at positions 24..27, record wraps around the end of buffer
+    record = bytes(range(16))
+    assert ring.put(record, _running)
+    assert ring.get(bytes, _running) == record
+
+def test_ring_buffer_wraps_length_prefix(ring):
+    assert ring.put(b'x' * 26, _running)
+    assert ring.get(bytes, _running) == b'x' * 26
+    # length prefix itself is split between positions 30..31 and 0..1
+    assert ring.put(b'wrapped', _running)
+    assert ring.get(bytes, _running) == b'wrapped'
+    assert ring.put(b'next', _running)
+    assert ring.get(bytes, _running) == b'next'
+
+def test_ring_buffer_full(ring):
+    assert ring.put(b'x' * 28, _running) # fills whole buffer
+    calls = []
+    def breaker():
+        calls.append(1)
+        return False
+    assert not ring.put(b'y', breaker)
+    assert calls
+    # nothing was written by failed put
+    assert ring.get(bytes, _running) == b'x' * 28
+    assert ring.put(b'y', _running)
+    assert ring.get(bytes, _running) == b'y'
+
+def test_ring_buffer_empty(ring):
+    assert ring.get(bytes, _stopped) is None
+    assert ring.put(b'z', _running)
+    assert ring.get(bytes, _stopped) == b'z'
+    assert ring.get(bytes, _stopped) is None
+
+def test_ring_buffer_record_too_big(ring):
+    with pytest.raises(AssertionError):
+        ring.put(b'x' * 29, _running)
+
+BLOCK = {
+    'block_id': '02faf0804a7e6b0aa1d4e3a5b8c0a9e0f1c2d3e4',
+    'previous': '02faf07f9c16a1c6e0b2fd3e3b6a6dfb2d0c1b7a',
+    'timestamp': '2021-01-01T00:00:00',
+    'witness': 'someone',
+    'witness_signature': '1f' * 65,
+    'transaction_merkle_root': '00' * 20,
+    'transaction_ids': ['aa' * 20, 'bb' * 20],
+    'extensions': [],
+    'transactions': [
+        {'ref_block_num': 1, 'ref_block_prefix': 2, 'expiration': '2021-01-01T00:01:00', 'signatures': ['1f'],
+         'extensions': [],
+         'operations': [
+             {'type': 'pow_operation', 'value': {'worker_account': 'miner', 'block_id': '00', 'nonce': 1}},
+             {'type': 'pow2_operation', 'value': {'work': {'type': 'pow2', 'value': {'input': {'worker_account': 'miner2'}}}}},
+             {'type': 'account_create_operation', 'value': {'new_account_name': 'alice', 'json_metadata': '{}'}},
+             {'type': 'account_create_with_delegation_operation', 'value': {'new_account_name': 'bob', 'json_metadata': ''}},
+             {'type': 'create_claimed_account_operation', 'value': {'new_account_name': 'carol', 'json_metadata': ''}},
+             {'type': 'account_update_operation', 'value': {'account': 'alice', 'json_metadata': '{"profile": {}}'}},
+             {'type': 'account_update2_operation', 'value': {'account': 'alice', 'posting_json_metadata': '{}'}},
+             {'type': 'comment_operation', 'value': {'author': 'alice', 'permlink': 'p', 'parent_author': '',
+                                                     'parent_permlink': 'tag', 'title': 't', 'body': '@@ -1 +1 @@',
+                                                     'json_metadata': '{"tags": ["tag"]}'}},
+             {'type': 'comment_options_operation', 'value': {'author': 'alice', 'permlink': 'p', 'allow_votes': True,
+                                                             'max_accepted_payout': '1000.000 HBD', 'extensions': []}},
+             {'type': 'vote_operation', 'value': {'voter': 'bob', 'author': 'alice', 'permlink': 'p', 'weight': 10000}},
+             {'type': 'delete_comment_operation', 'value': {'author': 'alice', 'permlink': 'q'}},
+         ]},
+        {'ref_block_num': 1, 'ref_block_prefix': 2, 'expiration': '2021-01-01T00:01:00', 'signatures': [],
+         'extensions': [],
+         'operations': [
+             {'type': 'transfer_operation', 'value': {'from': 'bob', 'to': 'null', 'amount': '1.000 HBD', 'memo': '@alice/p'}},
+             {'type': 'custom_json_operation', 'value': {'id': 'follow', 'required_auths': [],
+                                                         'required_posting_auths': ['bob'],
+                                                         'json': '["follow", {"follower": "bob"}]'}},
+             {'type': 'limit_order_create_operation', 'value': {'owner': 'bob', 'orderid': 1, 'amount_to_sell': '1.000 HIVE'}},
+             {'type': 'witness_update_operation', 'value': {'owner': 'someone', 'url': 'http://x'}},
+         ]},
+    ]
+}
+
+def _read_op_types():
+    """Operation types compared against `op_type` in Blocks._process."""
+    path = os.path.join(os.path.dirname(__file__), '..', '..', 'hive', 'indexer', 'blocks.py')
+    with open(path) as source:
+        tree = ast.parse(source.read())
+    process = next(node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef) and node.name == '_process')
+    return {node.value for node in ast.walk(process)
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.endswith('_operation')}
+
+def test_indexed_operations_cover_process():
+    assert _read_op_types() <= INDEXED_OPERATIONS
+
+def test_prefilter_block():
+    block = marshal.loads(marshal.dumps(BLOCK))
+    filtered = marshal.loads(marshal.dumps(prefilter_block(block)))
+
+    # fields read by Blocks._push/_process
+    assert set(filtered) == {'block_id', 'previous', 'timestamp', 'transactions'}
+    for key in ('block_id', 'previous', 'timestamp'):
+        assert filtered[key] == BLOCK[key]
+
+    assert len(filtered['transactions']) == len(BLOCK['transactions'])
+    for tx, original in zip(filtered['transactions'], BLOCK['transactions']):
+        assert set(tx) == {'operations'}
+        # all operations stay (counted in hive_blocks and op stats)
+        assert [op['type'] for op in tx['operations']] == [op['type'] for op in original['operations']]
+        for op, original_op in zip(tx['operations'], original['operations']):
+            if original_op['type'] in INDEXED_OPERATIONS:
+                assert op['value'] == original_op['value']
+            else:
+                assert op['value'] == {}
+
+    # edited post bodies are found in prefiltered block as well
+    comment = filtered['transactions'][0]['operations'][7]['value']
+    assert comment['body'].startswith('@@ ')
@@ -0,0 +1,58 @@
+#pylint: disable=missing-docstring,protected-access
+import pytest
+
+import hive.utils.stats as stats
+from hive.utils.stats import OPStatusManager as OPSM
+
+@pytest.fixture
+def opsm(monkeypatch):
+    # clock is fixed, timed operations take as long as given by `start` passed to op_timed
+    monkeypatch.setattr(stats, 'perf', lambda: 100.0)
+    OPSM.configure_timing(10)
+    for state in (OPSM.cpbs, OPSM.op_counts, OPSM._timed, OPSM._timed_total):
+        state.clear()
+    yield OPSM
+    OPSM.configure_timing(100)
+    for state in (OPSM.cpbs, OPSM.op_counts, OPSM._timed, OPSM._timed_total):
+        state.clear()
+
+def _process(op_type, count, duration):
+    """Same counting/timing as Blocks._process."""
+    for _ in range(count):
+        processed = OPSM.op_counts.get(op_type, 0) + 1
+        OPSM.op_counts[op_type] = processed
+        if (processed - 1) % OPSM.timing_interval == 0:
+            OPSM.op_timed(op_type, 100.0 - duration)
+
+def test_fold_counts(opsm):
+    _process('vote_operation', 95, 0.002)
+    _process('comment_operation', 3, 0.01)
+    # every 10th vote and first comment are timed
+    assert opsm._timed == {'vote_operation': [pytest.approx(0.02), 10], 'comment_operation': [pytest.approx(0.01), 1]}
+
+    opsm._fold_counts()
+    assert {name: stat.count for name, stat in opsm.cpbs.items()} == {'vote_operation': 95, 'comment_operation': 3}
+    # times are extrapolated from timed samples to all processed operations
+    assert opsm.cpbs['vote_operation'].time == pytest.approx(95 * 0.002)
+    assert opsm.cpbs['comment_operation'].time == pytest.approx(3 * 0.01)
+    assert not opsm.op_counts and not opsm._timed
+
+def test_fold_counts_without_samples(opsm):
+    _process('vote_operation', 10, 0.002)
+    opsm._fold_counts()
+
+    # operations of next blocks that were not timed use average of whole sync
+    opsm.op_counts['vote_operation'] = 5
+    opsm.op_counts['transfer_operation'] = 2
+    opsm._fold_counts()
+    assert opsm.cpbs['vote_operation'].count == 15
+    assert opsm.cpbs['vote_operation'].time == pytest.approx(15 * 0.002)
+    # never timed operations are only counted
+    assert opsm.cpbs['transfer_operation'].count == 2
+    assert opsm.cpbs['transfer_operation'].time == 0.0
+
+    # samples of current blocks take precedence over the sync average
+    _process('vote_operation', 1, 0.004)
+    opsm._fold_counts()
+    assert opsm.cpbs['vote_operation'].count == 16
+    assert opsm.cpbs['vote_operation'].time == pytest.approx(15 * 0.002 + 0.004)
@@ -0,0 +1,53 @@
+#pylint: disable=missing-docstring
+import threading
+import pytest
+
+from hive.utils.task_graph import TaskGraph
+
+def test_task_graph_dependencies():
+    graph = TaskGraph(4)
+    root = graph.add('root', print, writes=['posts', 'posts.root'])
+    chunk1 = graph.add('chunk', print, reads=['posts.root'], writes=['posts'], group='chunks')
+    chunk2 = graph.add('chunk', print, reads=['posts.root'], writes=['posts'], group='chunks')
+    feed = graph.add('feed', print, writes=['feed'])
+    helper = graph.add('helper', print, reads=['posts.root'], writes=['helper'])
+    notifs = graph.add('notifs', print, reads=['posts', 'feed'], writes=['notifs'])
+
+    assert graph.dependencies(root) == set()
+    assert graph.dependencies(chunk1) == {root}
+    assert graph.dependencies(chunk2) == {root}
+    assert graph.dependencies(feed) == set()
+    assert graph.dependencies(helper) == {root}
+    assert graph.dependencies(notifs) == {root, chunk1, chunk2, feed}
+
+def test_task_graph_run_order():
+    order = []
+    lock = threading.Lock()
+    def task(name):
+        with lock:
+            order.append(name)
+
+    graph = TaskGraph(3)
+    graph.add('a', task, ['a'], writes=['x'])
+    graph.add('b', task, ['b'], reads=['x'], writes=['y'], group='g')
+    graph.add('c', task, ['c'], reads=['x'], writes=['y'], group='g')
+    graph.add('d', task, ['d'], reads=['y'])
+
+    stats = {}
+    assert graph.run(lambda name, elapsed: stats.setdefault(name, elapsed)) == 4
+    assert order[0] == 'a'
+    assert set(order[1:3]) == {'b', 'c'}
+    assert order[3] == 'd'
+    assert set(stats) == {'a', 'b', 'c', 'd'}
+
+def test_task_graph_failure():
+    executed = []
+    def fail():
+        raise ValueError('boom')
+
+    graph = TaskGraph(2)
+    graph.add('fail', fail, writes=['x'])
+    graph.add('after', executed.append, ['after'], reads=['x'])
+    with pytest.raises(ValueError):
+        graph.run()
+    assert not executed